@@ -1,13 +1,23 @@
-from flask import Flask,request,jsonify
+from flask import Flask,request,jsonify,Response
 from flask_cors import CORS
 import psycopg2
 import psycopg2.extras # Needed for dictionary cursor
 import os
 from dotenv import load_dotenv
-import uuid
+import csv
+import io
+import json
+import time
+import threading
 # --- JWT Imports ---
 from flask_jwt_extended import create_access_token, jwt_required, JWTManager, get_jwt_identity
-from datetime import date # Import date for type checking
+from datetime import date, datetime, timedelta, timezone # Import date for type checking
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from db_pool import ConnectionPool, PoolTimeout
+from availability_index import AvailabilityIndex
+from report_views import ReportViewRefresher
+from report_jobs import ReportJobQueue, JobRejected
 
 load_dotenv()
 app=Flask(__name__)
@@ -19,19 +29,63 @@ if not app.config["JWT_SECRET_KEY"]:
 jwt = JWTManager(app)
 
 CORS(app)
-def get_db_connection():
+
+# --- Database Connection Pool ---
+# Connection settings are read once at startup; every route borrows a connection
+# from the process-wide pool instead of opening a new one per request.
+DB_CONFIG = {
+    "dbname": os.getenv("DB_NAME"),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "host": os.getenv("DB_HOST"),
+    "port": os.getenv("DB_PORT"),
+}
+
+def open_db_connection():
+    return psycopg2.connect(**DB_CONFIG)
+
+db_pool = ConnectionPool(
+    open_db_connection,
+    min_size=int(os.getenv("DB_POOL_MIN", 1)),
+    max_size=int(os.getenv("DB_POOL_MAX", 10)),
+    acquire_timeout=float(os.getenv("DB_POOL_TIMEOUT", 5)),
+    health_check_interval=float(os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", 30)),
+)
+
+# --- Availability Index ---
+# In-memory view of DRIVES and per-date RENT used by /api/cars/available.
+# AVAILABILITY_INDEX_MAX_AGE (seconds, 0 = never) forces a periodic rebuild so
+# writes made by other worker processes are picked up. At most
+# AVAILABILITY_INDEX_PAST_DATES dates before today are kept (least recently used).
+availability_index = AvailabilityIndex(
+    db_pool.connection,
+    max_age=float(os.getenv("AVAILABILITY_INDEX_MAX_AGE", 60)),
+    max_past_dates=int(os.getenv("AVAILABILITY_INDEX_PAST_DATES", 64)),
+)
+
+# --- Report Views ---
+# Materialized copies of the driver-stats, model-rents and brand-stats reports
+# (migration 0007), refreshed in the background every REPORT_VIEW_REFRESH_INTERVAL
+# seconds (0 = only on POST /api/managers/reports/refresh).
+report_views = ReportViewRefresher(
+    db_pool.connection,
+    interval=float(os.getenv("REPORT_VIEW_REFRESH_INTERVAL", 300)),
+)
+
+@contextmanager
+def db_connection():
+  """Borrow a pooled connection for the duration of a request; yields None if none is available."""
   try:
-      conn=psycopg2.connect(
-          dbname=os.getenv("DB_NAME"),
-          user=os.getenv("DB_USER"),
-          password=os.getenv("DB_PASSWORD"),
-          host=os.getenv("DB_HOST"),
-          port=os.getenv("DB_PORT")
-      )
-      return conn
+      conn = db_pool.getconn()
   except Exception as e:
       print(f"Error connecting to database: {e}")
-      return None
+      yield None
+      return
+  try:
+      yield conn
+  finally:
+      db_pool.putconn(conn)
+
 @app.route('/',methods=['GET'])
 def home():
   return "🚖 Taxi Rental API is live!"
@@ -52,32 +106,31 @@ def register_manager():
     if pincode != '1234':
         return jsonify({"error": "Invalid pincode for manager registration."}), 403 # Forbidden
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection Failed"}), 500
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection Failed"}), 500
 
-    cur = conn.cursor()
-    try:
+        cur = conn.cursor()
+        try:
         
-        # Check if SSN or Email already exists
-        cur.execute("SELECT SSN FROM MANAGER WHERE SSN=%s OR EMAIL=%s", (ssn, email))
-        existing_ssn_email = cur.fetchone()
-        if existing_ssn_email:
-            return jsonify({"error": "Manager with this SSN or Email already exists"}), 409
-
-        # Insert the new manager
-        cur.execute("INSERT INTO MANAGER (NAME, SSN, EMAIL) VALUES(%s, %s, %s)", (name, ssn, email))
-        conn.commit()
-        # General success message is appropriate
-        return jsonify({"message": "Manager registered successfully"}), 201
-
-    except Exception as e:
-        conn.rollback()
-        print(f"Error during manager registration: {e}")
-        return jsonify({"error": "Failed to register manager"}), 500
-    finally:
-        cur.close()
-        conn.close()
+            # Check if SSN or Email already exists
+            cur.execute("SELECT SSN FROM MANAGER WHERE SSN=%s OR EMAIL=%s", (ssn, email))
+            existing_ssn_email = cur.fetchone()
+            if existing_ssn_email:
+                return jsonify({"error": "Manager with this SSN or Email already exists"}), 409
+
+            # Insert the new manager
+            cur.execute("INSERT INTO MANAGER (NAME, SSN, EMAIL) VALUES(%s, %s, %s)", (name, ssn, email))
+            conn.commit()
+            # General success message is appropriate
+            return jsonify({"message": "Manager registered successfully"}), 201
+
+        except Exception as e:
+            conn.rollback()
+            print(f"Error during manager registration: {e}")
+            return jsonify({"error": "Failed to register manager"}), 500
+        finally:
+            cur.close()
 
 @app.route('/api/managers/login', methods=['POST'])
 def login_manager():
@@ -86,30 +139,100 @@ def login_manager():
    if not ssn:
       return jsonify({"error": "Missing required field ssn"}), 400
 
-   conn=get_db_connection()
-   if not conn:
-      return jsonify({"error": "Database connection failed"}), 500
-
-   cur=conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-
-   try:
-      # Use correct table (MANAGER) and column (SSN) names.
-      cur.execute("SELECT NAME AS name, SSN AS ssn, EMAIL AS email FROM MANAGER WHERE SSN=%s", (ssn,))
-      manager=cur.fetchone()
-      if manager:
-        manager_dict=dict(manager)
-        # --- Generate JWT Token --- Use SSN as the identity
-        access_token = create_access_token(identity=ssn)
-        return jsonify(access_token=access_token, manager=manager_dict, message="Login successful"), 200
-      else:
-         return jsonify({"error": "Invalid ssn"}), 401
-   except Exception as e:
-      print(f"Error in manager login: {e}")
-      return jsonify({"error": "Failed to process login"}), 500
-   finally:
-      cur.close()
-      conn.close()
+   with db_connection() as conn:
+       if not conn:
+          return jsonify({"error": "Database connection failed"}), 500
+
+       cur=conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+
+       try:
+          # Use correct table (MANAGER) and column (SSN) names.
+          cur.execute("SELECT NAME AS name, SSN AS ssn, EMAIL AS email FROM MANAGER WHERE SSN=%s", (ssn,))
+          manager=cur.fetchone()
+          if manager:
+            manager_dict=dict(manager)
+            # --- Generate JWT Token --- Use SSN as the identity
+            access_token = create_access_token(identity=ssn)
+            return jsonify(access_token=access_token, manager=manager_dict, message="Login successful"), 200
+          else:
+             return jsonify({"error": "Invalid ssn"}), 401
+       except Exception as e:
+          print(f"Error in manager login: {e}")
+          return jsonify({"error": "Failed to process login"}), 500
+       finally:
+          cur.close()
   ########################################################################
+# --- Bulk import helpers ---
+# Bulk endpoints take CSV (with a header row), NDJSON (one object per line) or a
+# JSON body. Rows are numbered from 1 in input order and per-row errors use
+# those numbers, so a caller can fix and resend only the rejected rows.
+BULK_IMPORT_MAX_ROWS = int(os.getenv("BULK_IMPORT_MAX_ROWS", 50000))
+
+def read_bulk_rows(json_key):
+    """Return the request rows as a list of dicts with lowercased keys (None for an unparseable NDJSON line).
+
+    The format comes from ?format=csv|ndjson|json or the Content-Type; a JSON body
+    is either a list or an object holding the list under json_key.
+    Raises ValueError if the body as a whole cannot be read.
+    """
+    fmt = (request.args.get('format') or request.mimetype or '').lower()
+    if 'csv' in fmt or 'ndjson' in fmt or 'jsonl' in fmt:
+        try:
+            body = request.get_data().decode('utf-8')
+        except UnicodeDecodeError as e:
+            raise ValueError(f"Body is not valid UTF-8: {e}")
+
+    if 'csv' in fmt:
+        try:
+            reader = csv.DictReader(io.StringIO(body))
+            if not reader.fieldnames:
+                raise ValueError("CSV body needs a header row")
+            return [{key.strip().lower(): value.strip() if isinstance(value, str) else value
+                     for key, value in row.items() if key} for row in reader]
+        except csv.Error as e:
+            raise ValueError(f"Invalid CSV body: {e}")
+
+    if 'ndjson' in fmt or 'jsonl' in fmt:
+        rows = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            rows.append({str(k).lower(): v for k, v in record.items()} if isinstance(record, dict) else None)
+        return rows
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get(json_key)
+    if not isinstance(data, list):
+        raise ValueError(f"Expected a JSON list (or {{\"{json_key}\": [...]}}), CSV or NDJSON body")
+    return [{str(k).lower(): v for k, v in record.items()} if isinstance(record, dict) else None
+            for record in data]
+
+def parse_optional_bool(value, field):
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ('true', 't', 'yes', 'y', '1'):
+        return True
+    if text in ('false', 'f', 'no', 'n', '0'):
+        return False
+    raise ValueError(f"Invalid {field} value '{value}', expected true/false")
+
+def required_text(record, field, max_length):
+    value = record.get(field)
+    value = str(value).strip() if value is not None else ''
+    if not value:
+        raise ValueError(f"Missing {field}")
+    if len(value) > max_length:
+        raise ValueError(f"{field} longer than {max_length} characters")
+    return value
+
 # --- Car Management Routes ---
 
 @app.route('/api/managers/cars', methods=['POST'])
@@ -130,45 +253,130 @@ def add_car():
     except ValueError:
         return jsonify({"error": "Invalid year format, must be a number"}), 400
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-
-    cur = conn.cursor()
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        cur = conn.cursor()
+        try:
+            # --- Insert CAR and its MODEL in one statement ---
+            # Ids come from sequences (migration 0006), so they are unique without probing
+            insert_car_query = """
+                WITH new_car AS (
+                    INSERT INTO CAR (CARID, MAKE, MODEL, YEAR) VALUES (next_car_id(), %s, %s, %s)
+                    RETURNING CARID
+                )
+                INSERT INTO MODEL (MODELID, CARID)
+                SELECT next_model_id(), CARID FROM new_car
+                RETURNING CARID, MODELID
+            """
+            cur.execute(insert_car_query, (make, model, year))
+            car_id, model_id = cur.fetchone()
+
+            conn.commit()
+            return jsonify({"message": "Car and associated model added successfully", "carId": car_id, "modelId": model_id}), 201
+
+        except Exception as e:
+            conn.rollback()
+            print(f"Error adding car/model: {e}")
+            if isinstance(e, psycopg2.errors.ForeignKeyViolation):
+                 return jsonify({"error": f"Failed to add model due to foreign key constraint: {e}"}), 400
+            return jsonify({"error": f"Failed to add car/model: {e}"}), 500
+        finally:
+            cur.close()
+
+def parse_car_import_row(record):
+    """Validate one fleet-import row; returns the staging values or raises ValueError."""
+    make = required_text(record, 'make', 100)
+    model = required_text(record, 'model', 100)
     try:
-        # --- Generate unique CARID --- 
-        while True:
-            car_id = uuid.uuid4().hex[:10].upper() # CARID is VARCHAR(10)
-            cur.execute("SELECT CARID FROM CAR WHERE CARID = %s", (car_id,))
-            if not cur.fetchone():
-                break # Found a unique ID
-
-        # --- Insert into CAR table --- 
-        insert_car_query = "INSERT INTO CAR (CARID, MAKE, MODEL, YEAR) VALUES (%s, %s, %s, %s)"
-        cur.execute(insert_car_query, (car_id, make, model, year))
-
-        while True:
-            model_id = uuid.uuid4().hex[:12].upper() # Generate a potential MODELID (adjust length if needed)
-            # Check if MODELID already exists (assuming MODELID is unique/primary key)
-            cur.execute("SELECT MODELID FROM MODEL WHERE MODELID = %s", (model_id,))
-            if not cur.fetchone():
-                break # Found unique MODELID
-        
-        insert_model_query = "INSERT INTO MODEL (MODELID, CARID) VALUES (%s, %s)" 
-        cur.execute(insert_model_query, (model_id, car_id))
-        
-        conn.commit()
-        return jsonify({"message": "Car and associated model added successfully", "carId": car_id, "modelId": model_id}), 201
-
-    except Exception as e:
-        conn.rollback()
-        print(f"Error adding car/model: {e}")
-        if isinstance(e, psycopg2.errors.ForeignKeyViolation):
-             return jsonify({"error": f"Failed to add model due to foreign key constraint: {e}"}), 400
-        return jsonify({"error": f"Failed to add car/model: {e}"}), 500
-    finally:
-        cur.close()
-        conn.close()
+        year = int(record.get('year'))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid year format, must be a number")
+    color = record.get('color') or None
+    if color is not None and len(str(color)) > 50:
+        raise ValueError("color longer than 50 characters")
+    construction_year = record.get('constructionyear')
+    if construction_year in (None, ''):
+        construction_year = None
+    else:
+        try:
+            construction_year = int(construction_year)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid constructionyear format, must be a number")
+    auto = parse_optional_bool(record.get('auto'), 'auto')
+    manual = parse_optional_bool(record.get('manual'), 'manual')
+    return make, model, year, color, construction_year, auto, manual
+
+# --- Bulk fleet import: CSV/NDJSON/JSON rows of make, model, year (+ color, constructionyear, auto, manual) ---
+@app.route('/api/managers/cars/import', methods=['POST'])
+@jwt_required()
+def import_cars():
+    try:
+        records = read_bulk_rows('cars')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not records:
+        return jsonify({"error": "No rows to import"}), 400
+    if len(records) > BULK_IMPORT_MAX_ROWS:
+        return jsonify({"error": f"Too many rows ({len(records)}), at most {BULK_IMPORT_MAX_ROWS} per request"}), 413
+
+    staged, errors = [], []
+    for row_no, record in enumerate(records, start=1):
+        if record is None:
+            errors.append({"row": row_no, "error": "Invalid JSON object"})
+            continue
+        try:
+            staged.append((row_no,) + parse_car_import_row(record))
+        except ValueError as e:
+            errors.append({"row": row_no, "error": str(e)})
+    if not staged:
+        return jsonify({"error": "No valid rows to import", "errors": errors}), 400
+
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        cur = conn.cursor()
+        try:
+            # --- Stage the valid rows with COPY, then insert CAR and MODEL set-based ---
+            cur.execute("""
+                CREATE TEMP TABLE car_import (
+                    ROWNO INT, MAKE VARCHAR(100), MODEL VARCHAR(100), YEAR INT,
+                    COLOR VARCHAR(50), CONSTRUCTIONYEAR INT, AUTO BOOLEAN, MANUAL BOOLEAN,
+                    CARID VARCHAR(10), MODELID VARCHAR(50)
+                ) ON COMMIT DROP
+            """)
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(staged)
+            buffer.seek(0)
+            cur.copy_expert(
+                "COPY car_import (ROWNO, MAKE, MODEL, YEAR, COLOR, CONSTRUCTIONYEAR, AUTO, MANUAL) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+            # Ids come from the same sequences as add_car (migration 0006)
+            cur.execute("UPDATE car_import SET CARID = next_car_id(), MODELID = next_model_id()")
+            cur.execute("INSERT INTO CAR (CARID, MAKE, MODEL, YEAR) SELECT CARID, MAKE, MODEL, YEAR FROM car_import")
+            cur.execute("""
+                INSERT INTO MODEL (COLOR, CONSTRUCTIONYEAR, AUTO, MANUAL, MODELID, CARID)
+                SELECT COLOR, CONSTRUCTIONYEAR, AUTO, MANUAL, MODELID, CARID FROM car_import
+            """)
+            cur.execute("SELECT ROWNO, CARID, MODELID FROM car_import ORDER BY ROWNO")
+            cars = [{"row": row_no, "carId": car_id, "modelId": model_id} for row_no, car_id, model_id in cur.fetchall()]
+            conn.commit()
+            return jsonify({
+                "message": f"Imported {len(cars)} cars",
+                "imported": len(cars),
+                "cars": cars,
+                "errors": errors,
+            }), 201
+
+        except Exception as e:
+            conn.rollback()
+            print(f"Error importing cars: {e}")
+            return jsonify({"error": f"Failed to import cars: {e}"}), 500
+        finally:
+            cur.close()
 
 @app.route('/api/managers/cars/remove', methods=['POST'])
 @jwt_required() # Protect this route
@@ -186,343 +394,960 @@ def remove_car():
     except ValueError:
         return jsonify({"error": "Invalid year format"}), 400
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
 
-    cur = conn.cursor()
-    try:
-        cur.execute(
-            "SELECT CARID FROM CAR WHERE MAKE = %s AND MODEL = %s AND YEAR = %s LIMIT 1",
-            (make, model, year)
-        )
-        car_to_delete = cur.fetchone()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                "SELECT CARID FROM CAR WHERE MAKE = %s AND MODEL = %s AND YEAR = %s LIMIT 1",
+                (make, model, year)
+            )
+            car_to_delete = cur.fetchone()
 
-        if not car_to_delete:
-            return jsonify({"error": "No car found matching the criteria"}), 404 # Not Found
+            if not car_to_delete:
+                return jsonify({"error": "No car found matching the criteria"}), 404 # Not Found
 
-        car_id_to_delete = car_to_delete[0]
-        # Check constraints that should prevent deletion (RENT)
-        cur.execute("SELECT 1 FROM RENT WHERE CARID = %s LIMIT 1", (car_id_to_delete,))
-        if cur.fetchone():
-            return jsonify({"error": "Cannot remove car: It is referenced in the RENT table. Remove associated rents first."}), 409 # Conflict
+            car_id_to_delete = car_to_delete[0]
+            # Check constraints that should prevent deletion (RENT)
+            cur.execute("SELECT 1 FROM RENT WHERE CARID = %s LIMIT 1", (car_id_to_delete,))
+            if cur.fetchone():
+                return jsonify({"error": "Cannot remove car: It is referenced in the RENT table. Remove associated rents first."}), 409 # Conflict
 
-        # Remove the check for DRIVES table
-        # cur.execute("SELECT 1 FROM DRIVES WHERE CARID = %s LIMIT 1", (car_id_to_delete,))
-        # if cur.fetchone():
-        #     return jsonify({"error": "Cannot remove car: It is referenced in the DRIVES table. Remove associated driver assignments first."}), 409 # Conflict
+            # Remove the check for DRIVES table
+            # cur.execute("SELECT 1 FROM DRIVES WHERE CARID = %s LIMIT 1", (car_id_to_delete,))
+            # if cur.fetchone():
+            #     return jsonify({"error": "Cannot remove car: It is referenced in the DRIVES table. Remove associated driver assignments first."}), 409 # Conflict
 
-        # --- Delete associated DRIVES records FIRST ---
-        cur.execute("DELETE FROM DRIVES WHERE CARID = %s", (car_id_to_delete,))
-        print(f"Deleted {cur.rowcount} associated drives for CARID {car_id_to_delete}") # Optional log
+            # --- Delete associated DRIVES records FIRST ---
+            cur.execute("DELETE FROM DRIVES WHERE CARID = %s", (car_id_to_delete,))
+            print(f"Deleted {cur.rowcount} associated drives for CARID {car_id_to_delete}") # Optional log
 
-        # --- Delete associated MODEL records SECOND ---
-        cur.execute("DELETE FROM MODEL WHERE CARID = %s", (car_id_to_delete,))
-        print(f"Deleted {cur.rowcount} associated models for CARID {car_id_to_delete}") # Optional: Log how many models were deleted
+            # --- Delete associated MODEL records SECOND ---
+            cur.execute("DELETE FROM MODEL WHERE CARID = %s", (car_id_to_delete,))
+            print(f"Deleted {cur.rowcount} associated models for CARID {car_id_to_delete}") # Optional: Log how many models were deleted
 
-        # --- Then delete the CAR record THIRD ---
-        cur.execute("DELETE FROM CAR WHERE CARID = %s", (car_id_to_delete,))
+            # --- Then delete the CAR record THIRD ---
+            cur.execute("DELETE FROM CAR WHERE CARID = %s", (car_id_to_delete,))
         
-        # Commit the transaction only after all deletions are successful
-        conn.commit()
-
-        if cur.rowcount > 0: # Check if the CAR record was deleted
-            return jsonify({"message": f"Car (CARID: {car_id_to_delete}), associated models, and driver assignments removed successfully"}), 200
-
-    except Exception as e:
-        conn.rollback()
-        print(f"Error removing car: {e}")
-        return jsonify({"error": f"Failed to remove car: {e}"}), 500
-    finally:
-        cur.close()
-        conn.close()
+            # Commit the transaction only after all deletions are successful
+            conn.commit()
+            availability_index.remove_car(car_id_to_delete)
+
+            if cur.rowcount > 0: # Check if the CAR record was deleted
+                return jsonify({"message": f"Car (CARID: {car_id_to_delete}), associated models, and driver assignments removed successfully"}), 200
+
+        except Exception as e:
+            conn.rollback()
+            print(f"Error removing car: {e}")
+            return jsonify({"error": f"Failed to remove car: {e}"}), 500
+        finally:
+            cur.close()
+
+# --- Bulk car removal: {"cars": ["CARID", {"car_id": ...} or {"make", "model", "year"}, ...]} ---
+@app.route('/api/managers/cars/bulk-remove', methods=['POST'])
+@jwt_required()
+def remove_cars_bulk():
+    data = request.get_json(silent=True)
+    cars = data.get('cars') if isinstance(data, dict) else None
+    if not isinstance(cars, list) or not cars:
+        return jsonify({"error": "cars must be a non-empty array"}), 400
+    if len(cars) > BULK_IMPORT_MAX_ROWS:
+        return jsonify({"error": f"Too many cars, at most {BULK_IMPORT_MAX_ROWS} per request"}), 413
+
+    # Parallel arrays for unnest(): a row is looked up by CARID, or else by make/model/year
+    rows, car_ids, makes, models, years = [], [], [], [], []
+    for row_no, car in enumerate(cars, start=1):
+        if isinstance(car, str):
+            car = {"car_id": car}
+        if not isinstance(car, dict):
+            return jsonify({"error": f"Invalid car entry at row {row_no}: {car}"}), 400
+        if car.get('car_id'):
+            key = (str(car['car_id']), None, None, None)
+        else:
+            if not car.get('make') or not car.get('model') or not car.get('year'):
+                return jsonify({"error": f"Row {row_no}: missing car_id or (make, model, year)"}), 400
+            try:
+                key = (None, car['make'], car['model'], int(car['year']))
+            except (TypeError, ValueError):
+                return jsonify({"error": f"Row {row_no}: invalid year format"}), 400
+        rows.append(row_no)
+        for values, value in zip((car_ids, makes, models, years), key):
+            values.append(value)
+
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        cur = conn.cursor()
+        try:
+            # --- Resolve every row and probe its blocking dependency (RENT) in one query ---
+            # make/model/year picks one matching car per row, like remove_car
+            cur.execute("""
+                WITH requested AS (
+                    SELECT *
+                    FROM unnest(%s::int[], %s::varchar[], %s::varchar[], %s::varchar[], %s::int[])
+                         AS r(ROWNO, CARID, MAKE, MODEL, YEAR)
+                ),
+                resolved AS (
+                    SELECT r.ROWNO,
+                           CASE WHEN r.CARID IS NOT NULL
+                                THEN (SELECT c.CARID FROM CAR c WHERE c.CARID = r.CARID)
+                                ELSE (SELECT c.CARID FROM CAR c
+                                      WHERE c.MAKE = r.MAKE AND c.MODEL = r.MODEL AND c.YEAR = r.YEAR
+                                      ORDER BY c.CARID LIMIT 1)
+                           END AS CARID
+                    FROM requested r
+                )
+                SELECT s.ROWNO, s.CARID,
+                       s.CARID IS NOT NULL AND EXISTS (SELECT 1 FROM RENT rt WHERE rt.CARID = s.CARID) AS in_rent
+                FROM resolved s
+                ORDER BY s.ROWNO
+            """, (rows, car_ids, makes, models, years))
+            probes = cur.fetchall()
+
+            removed, blocked, not_found = [], [], []
+            for row_no, car_id, in_rent in probes:
+                if car_id is None:
+                    not_found.append({"row": row_no, "error": "No car found matching the criteria"})
+                elif in_rent:
+                    blocked.append({"row": row_no, "carId": car_id, "reasons": ["RENT"],
+                                    "error": "Cannot remove car: It is referenced in the RENT table. Remove associated rents first."})
+                else:
+                    removed.append({"row": row_no, "carId": car_id})
+
+            # --- Delete the removable subset: DRIVES, MODEL, then CAR, in one statement ---
+            removable = sorted({entry["carId"] for entry in removed})
+            if removable:
+                cur.execute("""
+                    WITH deleted_drives AS (
+                        DELETE FROM DRIVES WHERE CARID = ANY(%(ids)s)
+                    ),
+                    deleted_models AS (
+                        DELETE FROM MODEL WHERE CARID = ANY(%(ids)s)
+                    )
+                    DELETE FROM CAR WHERE CARID = ANY(%(ids)s)
+                """, {"ids": removable})
+            conn.commit()
+
+        except psycopg2.errors.ForeignKeyViolation as e:
+            conn.rollback()
+            # A rent was booked for one of the cars between the probe and the delete
+            print(f"Foreign key violation removing cars: {e}")
+            return jsonify({"error": "Cars were booked while being removed, nothing was removed. Please retry."}), 409
+        except Exception as e:
+            conn.rollback()
+            print(f"Error removing cars: {e}")
+            return jsonify({"error": f"Failed to remove cars: {e}"}), 500
+        finally:
+            cur.close()
+
+    for car_id in removable:
+        availability_index.remove_car(car_id)
+    return jsonify({"removed": removed, "blocked": blocked, "not_found": not_found}), 200
 
 # --- Endpoint to get all car models ---
 @app.route('/api/cars/models', methods=['GET'])
 @jwt_required() # Protect route
 def get_all_car_models():
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    try:
-        # Query to get all car details, order them for consistency
-        query = """
-            SELECT CARID as id, MAKE as make, MODEL as model, YEAR as year 
-            FROM CAR 
-            ORDER BY MAKE, MODEL, YEAR;
-        """
-        cur.execute(query)
-        cars = cur.fetchall()
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        try:
+            # Query to get all car details, order them for consistency
+            query = """
+                SELECT CARID as id, MAKE as make, MODEL as model, YEAR as year 
+                FROM CAR 
+                ORDER BY MAKE, MODEL, YEAR;
+            """
+            cur.execute(query)
+            cars = cur.fetchall()
         
-        cars_list = [dict(car) for car in cars]
+            cars_list = [dict(car) for car in cars]
         
-        return jsonify({"cars": cars_list}), 200
+            return jsonify({"cars": cars_list}), 200
 
+        except Exception as e:
+            print(f"Error fetching all car models: {e}")
+            return jsonify({"error": f"Failed to fetch car models: {e}"}), 500
+        finally:
+            cur.close()
+
+# --- Endpoint to rebuild the in-memory availability index from the database ---
+@app.route('/api/managers/availability-index/rebuild', methods=['POST'])
+@jwt_required()
+def rebuild_availability_index():
+    try:
+        availability_index.rebuild()
+        return jsonify({"message": "Availability index rebuilt", "index": availability_index.stats()}), 200
     except Exception as e:
-        print(f"Error fetching all car models: {e}")
-        return jsonify({"error": f"Failed to fetch car models: {e}"}), 500
-    finally:
-        cur.close()
-        conn.close()
+        print(f"Error rebuilding availability index: {e}")
+        return jsonify({"error": f"Failed to rebuild availability index: {e}"}), 500
+
+# --- Rent history export ---
+# Rows are read through a named (server-side) cursor, EXPORT_ITERSIZE rows per
+# network fetch, and written out in chunks as they arrive, so memory use does
+# not depend on the size of RENT.
+EXPORT_ITERSIZE = int(os.getenv("EXPORT_ITERSIZE", 2000))
+RENT_EXPORT_COLUMNS = ["rentid", "date", "driver", "email", "carid", "modelid", "make", "model", "year"]
+
+def encode_rows(rows, columns, fmt):
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+    return "".join(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows)
+
+def stream_rows(cur, columns, fmt):
+    """Rows of an executed named cursor as CSV (header first) or NDJSON, EXPORT_ITERSIZE rows per chunk."""
+    if fmt == 'csv':
+        yield ",".join(columns) + "\n"
+    chunk = []
+    for row in cur:
+        chunk.append(row)
+        if len(chunk) >= EXPORT_ITERSIZE:
+            yield encode_rows(chunk, columns, fmt)
+            chunk = []
+    if chunk:
+        yield encode_rows(chunk, columns, fmt)
+
+def streamed_query_response(run_query, cursor_name, columns, fmt, label, headers=None):
+    """Response streaming the rows of run_query(cursor) as CSV or NDJSON from a named cursor.
+
+    The pooled connection is taken here, where a failure can still be a 500, and
+    is held until the response is closed: after the last row, when the client
+    disconnects, or without the body ever being read (HEAD).
+    """
+    try:
+        conn = db_pool.getconn()
+    except Exception as e:
+        print(f"Error connecting to database: {e}")
+        return jsonify({"error": "Database connection failed"}), 500
+    cursors = []
+
+    def generate():
+        cur = conn.cursor(name=cursor_name)
+        cursors.append(cur)
+        cur.itersize = EXPORT_ITERSIZE
+        try:
+            run_query(cur)
+            yield from stream_rows(cur, columns, fmt)
+        except Exception as e:
+            # Headers are already sent; the truncated body is the only signal left
+            print(f"Error streaming {label}: {e}")
+            raise
+
+    def release():
+        for cur in cursors:
+            if not cur.closed:
+                try:
+                    cur.close()
+                except psycopg2.Error:
+                    pass
+        db_pool.putconn(conn)  # rolls back the read-only transaction
+
+    response = Response(generate(), mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson', headers=headers)
+    response.call_on_close(release)
+    return response
+
+@app.route('/api/managers/rents/export', methods=['GET'])
+@jwt_required()
+def export_rents():
+    fmt = request.args.get('format', 'csv').lower()
+    from_str = request.args.get('from') # Optional date range (inclusive)
+    to_str = request.args.get('to')
+
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({"error": "format must be 'csv' or 'ndjson'"}), 400
+    try:
+        date_from = date.fromisoformat(from_str) if from_str else None
+        date_to = date.fromisoformat(to_str) if to_str else None
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Please use YYYY-MM-DD."}), 400
+
+    def export_query(cur):
+        cur.execute("""
+            SELECT r.RENTID, r.DATE, r.NAME, r.EMAIL, r.CARID, r.MODELID, c.MAKE, c.MODEL, c.YEAR
+            FROM RENT r
+            JOIN CAR c ON r.CARID = c.CARID
+            WHERE (%(from)s::date IS NULL OR r.DATE >= %(from)s)
+              AND (%(to)s::date IS NULL OR r.DATE <= %(to)s)
+            ORDER BY r.RENTID
+        """, {"from": date_from, "to": date_to})
+
+    extension = 'csv' if fmt == 'csv' else 'ndjson'
+    return streamed_query_response(
+        export_query, "rent_export", RENT_EXPORT_COLUMNS, fmt, "rents",
+        headers={"Content-Disposition": f"attachment; filename=rents.{extension}"},
+    )
 
 # --- Reports Routes --- (Protected Route)
+# Each report is a parse function (query parameters -> params, raises ValueError)
+# and a run function (cursor, params -> JSON payload), registered in REPORTS, so
+# the GET endpoints and the report job queue run exactly the same code.
+
+def parse_freshness(args):
+    """?freshness=cached (default), live, or a max view age in seconds; raises ValueError."""
+    value = str(args.get('freshness') or 'cached').strip().lower()
+    if value in ('cached', 'live'):
+        return value
+    try:
+        max_age = int(value)
+        if max_age < 0:
+            raise ValueError()
+    except ValueError:
+        raise ValueError("Invalid value for 'freshness', use 'cached', 'live' or a max age in seconds")
+    return max_age
 
-@app.route('/api/managers/reports/top-clients', methods=['GET'])
-@jwt_required()
+def view_refreshed_at(cur, view, freshness):
+    """When a report may be read from its materialized view, the time the view was refreshed; else None.
 
-######
-# --- Driver Management Routes ---
-def get_top_k_clients():
-    k_str = request.args.get('k') # Get k from query parameters (?k=...) 
+    None means the live query: asked for with ?freshness=live, the view is older
+    than the requested max age, or it was never recorded as refreshed.
+    """
+    report_views.start()
+    if freshness == 'live':
+        return None
+    cur.execute(
+        "SELECT REFRESHED_AT, EXTRACT(EPOCH FROM now() - REFRESHED_AT) FROM REPORT_VIEW_REFRESH WHERE VIEW_NAME = %s",
+        (view,)
+    )
+    row = cur.fetchone()
+    if row is None or (freshness != 'cached' and row[1] > freshness):
+        return None
+    return row[0]
+
+def report_response(name, args):
+    """Run a registered report for a GET endpoint: 400 on bad parameters, 500 on failure."""
+    parse, run, label = REPORTS[name]
+    try:
+        params = parse(args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        try:
+            return jsonify(run(cur, params)), 200
+        except Exception as e:
+            print(f"Error fetching {label}: {e}")
+            return jsonify({"error": f"Failed to fetch {label}: {e}"}), 500
+        finally:
+            cur.close()
+
+def parse_top_clients_params(args):
+    k_str = args.get('k') # Get k from query parameters (?k=...)
 
     if not k_str:
-        return jsonify({"error": "Missing query parameter 'k'"}), 400
-    
+        raise ValueError("Missing query parameter 'k'")
     try:
         k = int(k_str)
         if k <= 0:
              raise ValueError("k must be positive")
     except ValueError:
-        return jsonify({"error": "Invalid value for 'k', must be a positive integer"}), 400
-
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
+        raise ValueError("Invalid value for 'k', must be a positive integer")
 
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+    from_str = args.get('from') # Optional rent date window (inclusive)
+    to_str = args.get('to')
     try:
-        # Query to count rents per client, order by count descending, limit by k
-        # Joining RENT and CLIENT tables on EMAIL
+        date_from = date.fromisoformat(str(from_str)) if from_str else None
+        date_to = date.fromisoformat(str(to_str)) if to_str else None
+    except ValueError:
+        raise ValueError("Invalid date format. Please use YYYY-MM-DD.")
+    return {"k": k, "from": date_from, "to": date_to}
+
+def top_clients_report(cur, params):
+    if params["from"] is None and params["to"] is None:
+        # Trigger-maintained rent count per client (migration 0008):
+        # the first k entries of the count index, then k CLIENT lookups
         query = """
-            SELECT c.NAME AS name, c.EMAIL AS email, COUNT(r.RENTID) AS rent_count
-            FROM CLIENT c
-            JOIN RENT r ON c.EMAIL = r.EMAIL
-            GROUP BY c.NAME, c.EMAIL
-            ORDER BY rent_count DESC
+            SELECT c.NAME AS name, c.EMAIL AS email, crc.RENT_COUNT AS rent_count
+            FROM CLIENT_RENT_COUNT crc
+            JOIN CLIENT c ON c.EMAIL = crc.EMAIL
+            ORDER BY crc.RENT_COUNT DESC, crc.EMAIL
             LIMIT %s;
         """
-        cur.execute(query, (k,))
-        top_clients = cur.fetchall()
-
-        # Convert Row objects to simple dictionaries
-        clients_list = [dict(client) for client in top_clients]
+        cur.execute(query, (params["k"],))
+    else:
+        # Per-day counters of the days in the window, summed per client
+        window_query = """
+            SELECT c.NAME AS name, c.EMAIL AS email, w.rent_count
+            FROM (
+                SELECT EMAIL, SUM(RENT_COUNT)::BIGINT AS rent_count
+                FROM CLIENT_DAILY_RENT_COUNT
+                WHERE DATE >= COALESCE(%s::DATE, '-infinity') AND DATE <= COALESCE(%s::DATE, 'infinity')
+                GROUP BY EMAIL
+                ORDER BY rent_count DESC, EMAIL
+                LIMIT %s
+            ) w
+            JOIN CLIENT c ON c.EMAIL = w.EMAIL
+            ORDER BY w.rent_count DESC, w.EMAIL;
+        """
+        cur.execute(window_query, (params["from"], params["to"], params["k"]))
+    top_clients = cur.fetchall()
+
+    # Convert Row objects to simple dictionaries
+    return {"clients": [dict(client) for client in top_clients]}
+
+def parse_view_report_params(args):
+    return {"freshness": parse_freshness(args)}
+
+def model_rents_report(cur, params):
+    # Query to count rents per car model (Make, Model, Year)
+    query = """
+        SELECT
+            c.MAKE AS make,
+            c.MODEL AS model,
+            c.YEAR AS year,
+            COUNT(r.RENTID) AS rent_count
+        FROM CAR c
+        LEFT JOIN RENT r ON c.CARID = r.CARID
+        GROUP BY c.MAKE, c.MODEL, c.YEAR
+        ORDER BY c.MAKE, c.MODEL, c.YEAR;
+    """
+    refreshed_at = view_refreshed_at(cur, 'report_model_rents', params["freshness"])
+    if refreshed_at:
+        cur.execute("SELECT * FROM REPORT_MODEL_RENTS ORDER BY make, model, year;")
+        source = {"source": "view", "refreshed_at": refreshed_at.isoformat()}
+    else:
+        cur.execute(query)
+        source = {"source": "live"}
+    model_counts = cur.fetchall()
+    return {"model_rent_report": [dict(model) for model in model_counts], "freshness": source}
 
-        return jsonify({"clients": clients_list}), 200
+def parse_clients_by_city_params(args):
+    city1 = args.get('city1')
+    city2 = args.get('city2')
 
-    except Exception as e:
-        print(f"Error fetching top clients: {e}")
-        return jsonify({"error": f"Failed to fetch top clients: {e}"}), 500
-    finally:
-        cur.close()
-        conn.close()
+    if not city1 or not city2:
+        raise ValueError("Missing required query parameters: 'city1' and 'city2'")
+    return {"city1": city1, "city2": city2}
+
+def clients_by_city_report(cur, params):
+    # Query to find clients living in city1 who rented with a driver from city2
+    query = """
+        SELECT DISTINCT c.NAME AS name, c.EMAIL AS email
+        FROM CLIENT c
+        WHERE
+            EXISTS (
+                SELECT 1
+                FROM LIVES l
+                WHERE l.EMAIL = c.EMAIL AND l.CITY = %s
+            )
+            AND EXISTS (
+                SELECT 1
+                FROM RENT r
+                JOIN DRIVER d ON r.NAME = d.NAME
+                WHERE r.EMAIL = c.EMAIL AND d.CITY = %s
+            )
+        ORDER BY c.NAME;
+    """
+    cur.execute(query, (params["city1"], params["city2"]))
+    clients = cur.fetchall()
 
-@app.route('/api/managers/reports/model-rents', methods=['GET'])
-@jwt_required()
-def get_model_rent_counts():
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
+    # Convert Row objects to simple dictionaries
+    return {"clients": [dict(client) for client in clients]}
 
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+def parse_problematic_drivers_params(args):
+    city = str(args.get('city') or 'Chicago').strip() # Defaults are the original hardcoded criteria
     try:
-        # Query to count rents per car model (Make, Model, Year)
-        query = """
-            SELECT 
-                c.MAKE AS make, 
-                c.MODEL AS model, 
-                c.YEAR AS year, 
+        rating_threshold = float(args.get('threshold', 2.5))
+        min_rents = int(args.get('min_rents', 2))
+        min_clients = int(args.get('min_clients', 2))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid criteria: threshold must be a number, min_rents and min_clients integers")
+    if not 0 < rating_threshold <= 5 or min_rents < 1 or min_clients < 1:
+        raise ValueError("Invalid criteria: threshold must be in (0, 5], min_rents and min_clients at least 1")
+    return {"city": city, "threshold": rating_threshold, "min_rents": min_rents, "min_clients": min_clients,
+            "freshness": parse_freshness(args)}
+
+# Results per criteria tuple, reused for PROBLEMATIC_DRIVERS_CACHE_TTL seconds
+# (?freshness=live recomputes, ?freshness=<seconds> bounds the age of the data)
+PROBLEMATIC_DRIVERS_CACHE_TTL = float(os.getenv("PROBLEMATIC_DRIVERS_CACHE_TTL", 300))
+PROBLEMATIC_DRIVERS_CACHE_SIZE = 256
+problematic_drivers_cache = {} # (city, threshold, min_rents, min_clients) -> (cached_at, data_as_of, names, source)
+problematic_drivers_cache_lock = threading.Lock()
+
+def problematic_drivers_report(cur, params):
+    criteria = (params["city"], params["threshold"], params["min_rents"], params["min_clients"])
+    freshness = params["freshness"]
+    report_views.start()
+
+    with problematic_drivers_cache_lock:
+        cached = problematic_drivers_cache.get(criteria)
+    now = time.time()
+    if (cached is not None and freshness != 'live' and now - cached[0] <= PROBLEMATIC_DRIVERS_CACHE_TTL
+            and (freshness == 'cached' or now - cached[1] <= freshness)):
+        cached_at, _, driver_names, source = cached
+        source = dict(source, source="cache", cached_at=datetime.fromtimestamp(cached_at, timezone.utc).isoformat())
+    else:
+        driver_names, source, data_as_of = None, None, now
+        refreshed_at = view_refreshed_at(cur, 'report_driver_local_rents', freshness)
+        if refreshed_at:
+            # Rent and client counts by clients of the driver's city are precomputed
+            # by the view; the rating comes from the trigger-maintained DRIVER_RATING.
+            view_query = """
+                SELECT v.name
+                FROM REPORT_DRIVER_LOCAL_RENTS v
+                JOIN DRIVER_RATING dra ON dra.NAME = v.name
+                WHERE
+                    v.city = %s -- Driver's address is in the target city
+                    AND dra.AVG_RATING < %s -- Average rating is below threshold
+                    AND v.rent_count >= %s -- At least min_rents rents for target city clients
+                    AND v.client_count >= %s -- At least min_clients distinct target city clients
+                ORDER BY v.name;
+            """
+            cur.execute(view_query, (params["city"], params["threshold"], params["min_rents"], params["min_clients"]))
+            driver_names = [driver['name'] for driver in cur.fetchall()]
+            source, data_as_of = {"source": "view", "refreshed_at": refreshed_at.isoformat()}, refreshed_at.timestamp()
+        if driver_names is None:
+            # Drivers of the city rated below the threshold, with their rents by clients living
+            # in the city counted in one pass. The LIVES semi-join counts a client with several
+            # addresses in the city once, so COUNT(*) is the number of distinct rents.
+            live_query = """
+                SELECT r.NAME AS name
+                FROM DRIVER d
+                JOIN DRIVER_RATING dra ON d.NAME = dra.NAME -- Trigger-maintained average rating
+                JOIN RENT r ON r.NAME = d.NAME
+                WHERE
+                    d.CITY = %s -- Driver's address is in the target city
+                    AND dra.AVG_RATING < %s -- Average rating is below threshold
+                    AND EXISTS ( -- Client of the rent lives in the target city
+                        SELECT 1 FROM LIVES l WHERE l.EMAIL = r.EMAIL AND l.CITY = %s
+                    )
+                GROUP BY r.NAME
+                HAVING
+                    COUNT(*) >= %s -- At least min_rents rents for target city clients
+                    AND COUNT(DISTINCT r.EMAIL) >= %s -- At least min_clients distinct target city clients
+                ORDER BY r.NAME;
+            """
+            cur.execute(live_query, (params["city"], params["threshold"], params["city"], params["min_rents"], params["min_clients"]))
+            driver_names = [driver['name'] for driver in cur.fetchall()]
+            source = {"source": "live"}
+        with problematic_drivers_cache_lock:
+            problematic_drivers_cache.pop(criteria, None)
+            problematic_drivers_cache[criteria] = (now, data_as_of, driver_names, source)
+            while len(problematic_drivers_cache) > PROBLEMATIC_DRIVERS_CACHE_SIZE:
+                del problematic_drivers_cache[next(iter(problematic_drivers_cache))] # Oldest entry first
+
+    return {
+        "problematic_drivers": driver_names,
+        "criteria": {"city": criteria[0], "threshold": criteria[1], "min_rents": criteria[2], "min_clients": criteria[3]},
+        "freshness": source,
+    }
+
+def brand_stats_report(cur, params):
+    # Query using CTEs to calculate brand stats
+    query = """
+        WITH BrandDriverNames AS (
+            -- Find distinct pairs of (brand, driver_name) for drivers who can drive that brand
+            SELECT DISTINCT
+                c.MAKE AS brand,
+                d.NAME AS driver_name
+            FROM CAR c
+            JOIN MODEL m ON c.CARID = m.CARID
+            JOIN DRIVES dr ON m.MODELID = dr.MODELID AND m.CARID = dr.CARID
+            JOIN DRIVER d ON dr.NAME = d.NAME
+        ),
+        BrandAvgDriverRating AS (
+            -- Average of all reviews of the brand's drivers, from the per-driver rating sums
+            SELECT
+                bdn.brand,
+                SUM(dra.RATING_SUM)::NUMERIC / NULLIF(SUM(dra.RATING_COUNT), 0) AS avg_rating
+            FROM BrandDriverNames bdn
+            JOIN DRIVER_RATING dra ON bdn.driver_name = dra.NAME
+            GROUP BY bdn.brand
+        ),
+        BrandRentCount AS (
+            -- Count the number of rents for each brand
+            SELECT
+                c.MAKE AS brand,
                 COUNT(r.RENTID) AS rent_count
             FROM CAR c
-            LEFT JOIN RENT r ON c.CARID = r.CARID
-            GROUP BY c.MAKE, c.MODEL, c.YEAR
-            ORDER BY c.MAKE, c.MODEL, c.YEAR; 
-        """
+            JOIN MODEL m ON c.CARID = m.CARID
+            JOIN RENT r ON m.MODELID = r.MODELID AND m.CARID = r.CARID
+            GROUP BY c.MAKE
+        )
+        -- Final query to combine results for all distinct brands
+        SELECT
+            all_brands.brand,
+            COALESCE(badr.avg_rating, 0.0) AS average_driver_rating,
+            COALESCE(brc.rent_count, 0) AS total_rents
+        FROM (
+            SELECT DISTINCT MAKE AS brand FROM CAR
+        ) AS all_brands
+        LEFT JOIN BrandAvgDriverRating badr ON all_brands.brand = badr.brand
+        LEFT JOIN BrandRentCount brc ON all_brands.brand = brc.brand
+        ORDER BY all_brands.brand;
+    """
+    refreshed_at = view_refreshed_at(cur, 'report_brand_stats', params["freshness"])
+    if refreshed_at:
+        cur.execute("SELECT * FROM REPORT_BRAND_STATS ORDER BY brand;")
+        source = {"source": "view", "refreshed_at": refreshed_at.isoformat()}
+    else:
+        cur.execute(query)
+        source = {"source": "live"}
+    brand_stats = cur.fetchall()
+
+    # Convert Row objects to simple dictionaries
+    return {"brand_stats_report": [dict(brand) for brand in brand_stats], "freshness": source}
+
+def driver_stats_report(cur, params):
+    # Query to get driver name, total rents, and average rating
+    # Using LEFT JOINs to include drivers with no rents or no reviews
+    # Ratings come from the trigger-maintained DRIVER_RATING summary; rents are
+    # counted per driver before joining so reviews don't multiply the rent rows
+    query = """
+        SELECT
+            d.NAME AS name,
+            COALESCE(rc.total_rents, 0) AS total_rents,
+            COALESCE(dra.AVG_RATING, 0.0) AS average_rating
+        FROM DRIVER d
+        LEFT JOIN (
+            SELECT NAME, COUNT(*) AS total_rents
+            FROM RENT
+            GROUP BY NAME
+        ) rc ON d.NAME = rc.NAME
+        LEFT JOIN DRIVER_RATING dra ON d.NAME = dra.NAME
+        ORDER BY d.NAME;
+    """
+    # COALESCE is used to return 0 instead of NULL if a driver has no rents or reviews
+    # AVG returns a numeric type, COALESCE ensures it's float 0.0 for consistency
+    refreshed_at = view_refreshed_at(cur, 'report_driver_stats', params["freshness"])
+    if refreshed_at:
+        cur.execute("SELECT * FROM REPORT_DRIVER_STATS ORDER BY name;")
+        source = {"source": "view", "refreshed_at": refreshed_at.isoformat()}
+    else:
         cur.execute(query)
-        model_counts = cur.fetchall()
+        source = {"source": "live"}
+    driver_stats = cur.fetchall()
+
+    # Convert Row objects to simple dictionaries
+    return {"driver_stats_report": [dict(driver) for driver in driver_stats], "freshness": source}
+
+# report name -> (parse params, run, label used in error messages)
+REPORTS = {
+    'top-clients': (parse_top_clients_params, top_clients_report, "top clients"),
+    'model-rents': (parse_view_report_params, model_rents_report, "model rent counts"),
+    'clients-by-city': (parse_clients_by_city_params, clients_by_city_report, "clients by city criteria"),
+    'problematic-drivers': (parse_problematic_drivers_params, problematic_drivers_report, "problematic drivers"),
+    'brand-stats': (parse_view_report_params, brand_stats_report, "brand stats report"),
+    'driver-stats': (parse_view_report_params, driver_stats_report, "driver stats report"),
+}
+
+def run_report(name, params):
+    """Run a registered report on its own pooled connection; used by the report job workers."""
+    _, run, _ = REPORTS[name]
+    with db_pool.connection() as conn:
+        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        try:
+            return run(cur, params)
+        finally:
+            cur.close()
+
+# --- Report Jobs ---
+# Reports submitted to /api/managers/reports/jobs run on a bounded background pool;
+# finished results are kept for REPORT_JOB_TTL seconds.
+report_jobs = ReportJobQueue(
+    run_report,
+    workers=int(os.getenv("REPORT_JOB_WORKERS", 2)),
+    per_owner=int(os.getenv("REPORT_JOB_PER_MANAGER", 2)),
+    max_pending=int(os.getenv("REPORT_JOB_MAX_PENDING", 50)),
+    ttl=float(os.getenv("REPORT_JOB_TTL", 600)),
+)
+REPORT_JOB_MAX_WAIT = float(os.getenv("REPORT_JOB_MAX_WAIT", 30)) # longest long-poll, in seconds
 
-        report_list = [dict(model) for model in model_counts]
+@app.route('/api/managers/reports/top-clients', methods=['GET'])
+@jwt_required()
 
-        return jsonify({"model_rent_report": report_list}), 200
+######
+# --- Driver Management Routes ---
+def get_top_k_clients():
+    return report_response('top-clients', request.args)
 
-    except Exception as e:
-        print(f"Error fetching model rent counts: {e}")
-        return jsonify({"error": f"Failed to fetch model rent counts: {e}"}), 500
-    finally:
-        cur.close()
-        conn.close()
+@app.route('/api/managers/reports/model-rents', methods=['GET'])
+@jwt_required()
+def get_model_rent_counts():
+    return report_response('model-rents', request.args)
 
 @app.route('/api/managers/reports/clients-by-city-criteria', methods=['GET'])
 @jwt_required()
 def get_clients_by_city_criteria():
-    city1 = request.args.get('city1')
-    city2 = request.args.get('city2')
-
-    if not city1 or not city2:
-        return jsonify({"error": "Missing required query parameters: 'city1' and 'city2'"}), 400
-
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+    return report_response('clients-by-city', request.args)
+
+def parse_city_list(value, name):
+    """Comma-separated cities, or None for 'all'; raises ValueError."""
+    if value is None or not value.strip():
+        raise ValueError(f"Missing required query parameter: '{name}' (comma-separated cities or 'all')")
+    if value.strip().lower() == 'all':
+        return None
+    cities = sorted({city.strip() for city in value.split(',') if city.strip()})
+    if not cities:
+        raise ValueError(f"Invalid value for '{name}', use comma-separated cities or 'all'")
+    return cities
+
+CITY_MATRIX_COLUMNS = {
+    'clients': ["client_city", "driver_city", "name", "email"],
+    'counts': ["client_city", "driver_city", "clients"],
+}
+
+@app.route('/api/managers/reports/clients-by-city-matrix', methods=['GET'])
+@jwt_required()
+def get_clients_by_city_matrix():
+    # Every (client city, driver city) pair of clients-by-city-criteria in one pass:
+    # clients living in the client city who rented with a driver from the driver city
+    fmt = request.args.get('format', 'ndjson').lower()
+    mode = request.args.get('mode', 'clients').lower()
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({"error": "format must be 'csv' or 'ndjson'"}), 400
+    if mode not in CITY_MATRIX_COLUMNS:
+        return jsonify({"error": "mode must be 'clients' or 'counts'"}), 400
     try:
-        # Query to find clients living in city1 who rented with a driver from city2
-        query = """
-            SELECT DISTINCT c.NAME AS name, c.EMAIL AS email
-            FROM CLIENT c
-            WHERE
-                EXISTS (
-                    SELECT 1
-                    FROM LIVES l
-                    WHERE l.EMAIL = c.EMAIL AND l.CITY = %s 
-                )
-                AND EXISTS (
-                    SELECT 1
-                    FROM RENT r
-                    JOIN DRIVER d ON r.NAME = d.NAME
-                    WHERE r.EMAIL = c.EMAIL AND d.CITY = %s 
-                )
-            ORDER BY c.NAME;
-        """
-        cur.execute(query, (city1, city2))
-        clients = cur.fetchall()
-
-        # Convert Row objects to simple dictionaries
-        clients_list = [dict(client) for client in clients]
-
-        return jsonify({"clients": clients_list}), 200
-
-    except Exception as e:
-        print(f"Error fetching clients by city criteria: {e}")
-        return jsonify({"error": f"Failed to fetch clients by city criteria: {e}"}), 500
-    finally:
-        cur.close()
-        conn.close()
+        client_cities = parse_city_list(request.args.get('client_cities'), 'client_cities')
+        driver_cities = parse_city_list(request.args.get('driver_cities'), 'driver_cities')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    params = {"client_cities": client_cities, "driver_cities": driver_cities}
+
+    def matrix_query(cur):
+        # RENT⋈DRIVER is read once for all pairs and reduced to distinct (client, driver
+        # city) before LIVES is joined, so a client counts once per pair however many
+        # rents or addresses in the city they have. Pairs without clients have no rows.
+        if mode == 'clients':
+            cur.execute("""
+                SELECT p.client_city, p.driver_city, c.NAME AS name, c.EMAIL AS email
+                FROM (
+                    SELECT DISTINCT l.CITY AS client_city, rd.driver_city, rd.EMAIL AS email
+                    FROM (
+                        SELECT DISTINCT r.EMAIL, d.CITY AS driver_city
+                        FROM RENT r
+                        JOIN DRIVER d ON d.NAME = r.NAME
+                        WHERE %(driver_cities)s::varchar[] IS NULL OR d.CITY = ANY(%(driver_cities)s)
+                    ) rd
+                    JOIN LIVES l ON l.EMAIL = rd.EMAIL
+                    WHERE %(client_cities)s::varchar[] IS NULL OR l.CITY = ANY(%(client_cities)s)
+                ) p
+                JOIN CLIENT c ON c.EMAIL = p.email
+                ORDER BY p.client_city, p.driver_city, c.NAME, c.EMAIL
+            """, params)
+        else:
+            cur.execute("""
+                SELECT p.client_city, p.driver_city, COUNT(*) AS clients
+                FROM (
+                    SELECT DISTINCT l.CITY AS client_city, rd.driver_city, rd.EMAIL AS email
+                    FROM (
+                        SELECT DISTINCT r.EMAIL, d.CITY AS driver_city
+                        FROM RENT r
+                        JOIN DRIVER d ON d.NAME = r.NAME
+                        WHERE %(driver_cities)s::varchar[] IS NULL OR d.CITY = ANY(%(driver_cities)s)
+                    ) rd
+                    JOIN LIVES l ON l.EMAIL = rd.EMAIL
+                    WHERE %(client_cities)s::varchar[] IS NULL OR l.CITY = ANY(%(client_cities)s)
+                ) p
+                GROUP BY p.client_city, p.driver_city
+                ORDER BY p.client_city, p.driver_city
+            """, params)
+
+    return streamed_query_response(matrix_query, "clients_by_city_matrix", CITY_MATRIX_COLUMNS[mode], fmt,
+                                   "clients by city matrix")
 
 @app.route('/api/managers/reports/problematic-drivers', methods=['GET'])
 @jwt_required()
 def get_problematic_drivers():
-    target_city = 'Chicago' # Define the target city
-    rating_threshold = 2.5  # Define the rating threshold
-    min_rents = 2           # Define minimum distinct rents
-    min_clients = 2         # Define minimum distinct clients
+    return report_response('problematic-drivers', request.args)
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
+@app.route('/api/managers/reports/brand-stats', methods=['GET'])
+@jwt_required()
+def get_brand_stats_report():
+    return report_response('brand-stats', request.args)
 
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+@app.route('/api/managers/reports/jobs', methods=['POST'])
+@jwt_required()
+def submit_report_job():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object with 'report' and optional 'params'"}), 400
+    name = data.get('report')
+    if name not in REPORTS:
+        return jsonify({"error": f"Unknown report '{name}', expected one of: {', '.join(REPORTS)}"}), 400
+    raw_params = data.get('params') or {}
+    if not isinstance(raw_params, dict):
+        return jsonify({"error": "params must be an object"}), 400
+
+    parse, _, _ = REPORTS[name]
     try:
-        # Query to find problematic drivers based on the specified criteria
-        query = """
-            SELECT d.NAME AS name
-            FROM DRIVER d
-            LEFT JOIN ( -- Subquery to calculate average rating
-                SELECT NAME, AVG(RATING) as avg_rating
-                FROM REVIEW
-                GROUP BY NAME
-            ) AS avg_ratings ON d.NAME = avg_ratings.NAME
-            WHERE
-                d.CITY = %s -- Driver's address is in the target city
-                AND avg_ratings.avg_rating < %s -- Average rating is below threshold
-                AND EXISTS ( -- Subquery to check rent/client criteria
-                    SELECT 1
-                    FROM RENT r
-                    JOIN CLIENT c ON r.EMAIL = c.EMAIL
-                    JOIN LIVES l ON c.EMAIL = l.EMAIL
-                    WHERE
-                        r.NAME = d.NAME -- Rent associated with the current driver
-                        AND l.CITY = %s -- Client associated with the rent lives in the target city
-                    GROUP BY r.NAME -- Group by driver to apply HAVING clause correctly
-                    HAVING
-                        COUNT(DISTINCT r.RENTID) >= %s -- At least min_rents distinct rents for target city clients
-                        AND COUNT(DISTINCT c.EMAIL) >= %s -- At least min_clients distinct target city clients involved
-                )
-            ORDER BY d.NAME;
-        """
-        cur.execute(query, (target_city, rating_threshold, target_city, min_rents, min_clients))
-        drivers = cur.fetchall()
+        params = parse(raw_params)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        # Extract just the names
-        driver_names = [driver['name'] for driver in drivers]
+    try:
+        # Equal parsed parameters of one manager share a job while it is pending or its result is kept
+        job, created = report_jobs.submit(get_jwt_identity(), name, params, json.dumps(params, sort_keys=True, default=str))
+    except JobRejected as e:
+        return jsonify({"error": str(e)}), e.status
 
-        return jsonify({"problematic_drivers": driver_names}), 200
+    job["status_url"] = f"/api/managers/reports/jobs/{job['job_id']}"
+    job["result_url"] = f"/api/managers/reports/jobs/{job['job_id']}/result"
+    return jsonify(job), 202 if created else 200
 
-    except Exception as e:
-        print(f"Error fetching problematic drivers: {e}")
-        return jsonify({"error": f"Failed to fetch problematic drivers: {e}"}), 500
-    finally:
-        cur.close()
-        conn.close()
+def parse_job_wait():
+    """?wait=seconds to long-poll until the job finishes, capped at REPORT_JOB_MAX_WAIT."""
+    try:
+        wait = float(request.args.get('wait', 0))
+    except ValueError:
+        raise ValueError("Invalid value for 'wait', must be a number of seconds")
+    return min(max(wait, 0.0), REPORT_JOB_MAX_WAIT)
 
-@app.route('/api/managers/reports/brand-stats', methods=['GET'])
+@app.route('/api/managers/reports/jobs/<string:job_id>', methods=['GET'])
 @jwt_required()
-def get_brand_stats_report():
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+def get_report_job(job_id):
     try:
-        # Query using CTEs to calculate brand stats
-        query = """
-            WITH BrandDriverNames AS (
-                -- Find distinct pairs of (brand, driver_name) for drivers who can drive that brand
-                SELECT DISTINCT
-                    c.MAKE AS brand,
-                    d.NAME AS driver_name
-                FROM CAR c
-                JOIN MODEL m ON c.CARID = m.CARID
-                JOIN DRIVES dr ON m.MODELID = dr.MODELID AND m.CARID = dr.CARID
-                JOIN DRIVER d ON dr.NAME = d.NAME
-            ),
-            BrandAvgDriverRating AS (
-                -- Calculate the average rating for each brand based on drivers associated with it
-                SELECT
-                    bdn.brand,
-                    AVG(r.RATING) AS avg_rating
-                FROM BrandDriverNames bdn
-                JOIN REVIEW r ON bdn.driver_name = r.NAME
-                GROUP BY bdn.brand
-            ),
-            BrandRentCount AS (
-                -- Count the number of rents for each brand
-                SELECT
-                    c.MAKE AS brand,
-                    COUNT(r.RENTID) AS rent_count
-                FROM CAR c
-                JOIN MODEL m ON c.CARID = m.CARID
-                JOIN RENT r ON m.MODELID = r.MODELID AND m.CARID = r.CARID
-                GROUP BY c.MAKE
-            )
-            -- Final query to combine results for all distinct brands
-            SELECT
-                all_brands.brand,
-                COALESCE(badr.avg_rating, 0.0) AS average_driver_rating,
-                COALESCE(brc.rent_count, 0) AS total_rents
-            FROM (
-                SELECT DISTINCT MAKE AS brand FROM CAR
-            ) AS all_brands
-            LEFT JOIN BrandAvgDriverRating badr ON all_brands.brand = badr.brand
-            LEFT JOIN BrandRentCount brc ON all_brands.brand = brc.brand
-            ORDER BY all_brands.brand;
-        """
-        cur.execute(query)
-        brand_stats = cur.fetchall()
+        wait = parse_job_wait()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    job = report_jobs.get(get_jwt_identity(), job_id, wait)
+    if job is None:
+        return jsonify({"error": "Report job not found (unknown or expired)"}), 404
+    return jsonify(job), 200
+
+@app.route('/api/managers/reports/jobs/<string:job_id>/result', methods=['GET'])
+@jwt_required()
+def get_report_job_result(job_id):
+    try:
+        wait = parse_job_wait()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if wait:
+        report_jobs.get(get_jwt_identity(), job_id, wait)
+    job, result = report_jobs.result(get_jwt_identity(), job_id)
+    if job is None:
+        return jsonify({"error": "Report job not found (unknown or expired)"}), 404
+    if job["status"] == 'failed':
+        return jsonify({"job": job, "error": f"Report job failed: {job['error']}"}), 500
+    if job["status"] != 'done':
+        return jsonify({"job": job}), 202 # Not finished yet, poll again
+    return jsonify({"job": job, "result": result}), 200
+
+# --- Manager Dashboard: several reports at once, on one snapshot ---
+DASHBOARD_REPORTS = ('top-clients', 'model-rents', 'driver-stats', 'problematic-drivers', 'brand-stats')
+DASHBOARD_MAX_PARALLEL = int(os.getenv("DASHBOARD_MAX_PARALLEL", 4)) # connections used by one dashboard request
+
+def run_report_in_snapshot(name, params, snapshot_id):
+    """Run a report on a second pooled connection that imports an exported snapshot.
+
+    Raises PoolTimeout at once if no connection is free; the caller then runs the
+    report on its own connection, which holds the same snapshot.
+    """
+    _, run, _ = REPORTS[name]
+    conn = db_pool.getconn(timeout=0)
+    try:
+        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        try:
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+            cur.execute("SET TRANSACTION SNAPSHOT %s", (snapshot_id,))
+            began = time.perf_counter()
+            return run(cur, params), time.perf_counter() - began
+        finally:
+            cur.close()
+    finally:
+        db_pool.putconn(conn)  # rolls back the read-only transaction
 
-        # Convert Row objects to simple dictionaries
-        report_list = [dict(brand) for brand in brand_stats]
+@app.route('/api/managers/dashboard', methods=['GET'])
+@jwt_required()
+def get_manager_dashboard():
+    names = [name.strip() for name in (request.args.get('reports') or ','.join(DASHBOARD_REPORTS)).split(',') if name.strip()]
+    unknown = [name for name in names if name not in REPORTS]
+    if not names or unknown:
+        return jsonify({"error": f"Unknown report(s) {', '.join(unknown) or '(none)'}, expected some of: {', '.join(REPORTS)}"}), 400
+
+    # Report parameters are shared query parameters. Reports are computed live by default,
+    # because materialized views are refreshed at different times and would not agree.
+    args = request.args.to_dict()
+    args.setdefault('freshness', 'live')
+    args.setdefault('k', '5')
+    params = {}
+    for name in dict.fromkeys(names):
+        try:
+            params[name] = REPORTS[name][0](args)
+        except ValueError as e:
+            return jsonify({"error": f"{name}: {e}"}), 400
+
+    began = time.perf_counter()
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        try:
+            # This transaction exports its snapshot and stays open until every report has
+            # imported it, so all reports see exactly the same committed data
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+            cur.execute("SELECT pg_export_snapshot() AS snapshot_id, now() AS taken_at")
+            snapshot = cur.fetchone()
+
+            reports, errors, timings = {}, {}, {}
+            own, others = list(params)[:1], list(params)[1:]
+            with ThreadPoolExecutor(max_workers=max(1, min(len(others), DASHBOARD_MAX_PARALLEL - 1))) as executor:
+                futures = {name: executor.submit(run_report_in_snapshot, name, params[name], snapshot['snapshot_id'])
+                           for name in others}
+
+                def run_here(name):
+                    # A savepoint keeps the snapshot usable if this report fails
+                    cur.execute("SAVEPOINT dashboard_report")
+                    started = time.perf_counter()
+                    try:
+                        reports[name] = REPORTS[name][1](cur, params[name])
+                        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+                    except Exception as e:
+                        cur.execute("ROLLBACK TO SAVEPOINT dashboard_report")
+                        print(f"Error fetching {REPORTS[name][2]} for dashboard: {e}")
+                        errors[name] = f"Failed to fetch {REPORTS[name][2]}: {e}"
+
+                for name in own:
+                    run_here(name)
+                for name, future in futures.items():
+                    try:
+                        reports[name], elapsed = future.result()
+                        timings[name] = round(elapsed * 1000, 1)
+                    except PoolTimeout:
+                        run_here(name) # No spare connection: run it here, in the same snapshot
+                    except Exception as e:
+                        print(f"Error fetching {REPORTS[name][2]} for dashboard: {e}")
+                        errors[name] = f"Failed to fetch {REPORTS[name][2]}: {e}"
+
+            body = {
+                "reports": reports,
+                "snapshot": {"isolation": "repeatable read", "taken_at": snapshot['taken_at'].isoformat()},
+                "timings_ms": timings,
+                "wall_ms": round((time.perf_counter() - began) * 1000, 1),
+            }
+            if errors:
+                body["errors"] = errors
+            return jsonify(body), 200 if reports else 500
 
-        return jsonify({"brand_stats_report": report_list}), 200
+        except Exception as e:
+            print(f"Error building manager dashboard: {e}")
+            return jsonify({"error": f"Failed to build dashboard: {e}"}), 500
+        finally:
+            cur.close()
 
+@app.route('/api/managers/reports/refresh', methods=['POST'])
+@jwt_required()
+def refresh_report_views():
+    # Refresh every materialized report view now instead of waiting for the scheduler
+    try:
+        refreshed = report_views.refresh_all(force=True)
+        return jsonify({"message": "Report views refreshed", "refreshed": refreshed, "views": report_views.status()}), 200
     except Exception as e:
-        print(f"Error fetching brand stats report: {e}")
-        return jsonify({"error": f"Failed to fetch brand stats report: {e}"}), 500
-    finally:
-        cur.close()
-        conn.close()
+        print(f"Error refreshing report views: {e}")
+        return jsonify({"error": f"Failed to refresh report views: {e}"}), 500
 
 @app.route('/api/managers/drivers', methods=['POST'])
 @jwt_required()
@@ -538,49 +1363,135 @@ def add_driver():
         # Zipcode might be optional depending on needs, but let's require it here
         return jsonify({"error": "Missing required fields (name, roadname, number, city, zipcode)"}), 400
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error":"Database connection faild"}), 500 #internal server error
-
-    cur = conn.cursor()
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error":"Database connection faild"}), 500 #internal server error
+
+        cur = conn.cursor()
+        try:
+            # Step 1: Upsert Address (Insert if not exists, do nothing if exists)
+            # Use the correct ON CONFLICT clause based on the primary key (ROADNAME, NUMBER, CITY)
+            address_upsert_query = """
+                INSERT INTO ADDRESS (ROADNAME, NUMBER, CITY, ZIPCODE)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (ROADNAME, NUMBER, CITY) DO NOTHING;
+            """
+            cur.execute(address_upsert_query, (roadname, number, city, zipcode))
+
+            # Step 2: Insert Driver (Corrected INSERT statement)
+            driver_insert_query = """
+                INSERT INTO DRIVER (NAME, ROADNAME, NUMBER, CITY)
+                VALUES (%s, %s, %s, %s);
+            """
+            cur.execute(driver_insert_query, (name, roadname, number, city))
+
+            conn.commit()
+            return jsonify({"message": "Driver added successfully"}), 201
+
+        except psycopg2.errors.UniqueViolation as e:
+            conn.rollback()
+            # Check if it's a violation on the DRIVER table (name)
+            # Use the clearer error message from previous version
+            if 'driver_pkey' in str(e).lower() or 'driver_name_key' in str(e).lower():
+                 return jsonify({"error": f"Driver with name '{name}' already exists"}), 409
+            else:
+                 print(f"Unique violation error adding driver: {e}")
+                 return jsonify({"error": f"Failed to add driver due to unique constraint: {e}"}), 409
+
+        except Exception as e:
+            conn.rollback()
+            # Use the clearer error message from previous version
+            print(f"Error adding driver: {e}")
+            return jsonify({"error": f"Failed to add driver: {e}"}), 500
+        finally:
+            cur.close()
+
+# --- Bulk driver onboarding: rows of name, roadname, number, city (+ zipcode) ---
+@app.route('/api/managers/drivers/import', methods=['POST'])
+@jwt_required()
+def import_drivers():
     try:
-        # Step 1: Upsert Address (Insert if not exists, do nothing if exists)
-        # Use the correct ON CONFLICT clause based on the primary key (ROADNAME, NUMBER, CITY)
-        address_upsert_query = """
-            INSERT INTO ADDRESS (ROADNAME, NUMBER, CITY, ZIPCODE)
-            VALUES (%s, %s, %s, %s)
-            ON CONFLICT (ROADNAME, NUMBER, CITY) DO NOTHING;
-        """
-        cur.execute(address_upsert_query, (roadname, number, city, zipcode))
-
-        # Step 2: Insert Driver (Corrected INSERT statement)
-        driver_insert_query = """
-            INSERT INTO DRIVER (NAME, ROADNAME, NUMBER, CITY)
-            VALUES (%s, %s, %s, %s);
-        """
-        cur.execute(driver_insert_query, (name, roadname, number, city))
-
-        conn.commit()
-        return jsonify({"message": "Driver added successfully"}), 201
-
-    except psycopg2.errors.UniqueViolation as e:
-        conn.rollback()
-        # Check if it's a violation on the DRIVER table (name)
-        # Use the clearer error message from previous version
-        if 'driver_pkey' in str(e).lower() or 'driver_name_key' in str(e).lower():
-             return jsonify({"error": f"Driver with name '{name}' already exists"}), 409
+        records = read_bulk_rows('drivers')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not records:
+        return jsonify({"error": "No rows to import"}), 400
+    if len(records) > BULK_IMPORT_MAX_ROWS:
+        return jsonify({"error": f"Too many rows ({len(records)}), at most {BULK_IMPORT_MAX_ROWS} per request"}), 413
+
+    # --- Validate, and dedupe names and addresses in Python ---
+    drivers, errors = {}, []  # name -> (row, roadname, number, city)
+    addresses = {}  # (roadname, number, city) -> zipcode
+    for row_no, record in enumerate(records, start=1):
+        if record is None:
+            errors.append({"row": row_no, "status": 400, "error": "Invalid JSON object"})
+            continue
+        try:
+            name = required_text(record, 'name', 100)
+            roadname = required_text(record, 'roadname', 100)
+            number = required_text(record, 'number', 10)
+            city = required_text(record, 'city', 100)
+            zipcode = str(record.get('zipcode') or '').strip() or None
+            if zipcode is not None and len(zipcode) > 10:
+                raise ValueError("zipcode longer than 10 characters")
+        except ValueError as e:
+            errors.append({"row": row_no, "status": 400, "error": str(e)})
+            continue
+        if name in drivers:
+            errors.append({"row": row_no, "name": name, "status": 409,
+                           "error": f"Driver with name '{name}' already exists (row {drivers[name][0]})"})
+            continue
+        drivers[name] = (row_no, roadname, number, city)
+        if addresses.get((roadname, number, city)) is None:
+            addresses[(roadname, number, city)] = zipcode
+
+    if not drivers:
+        return jsonify({"error": "No valid rows to import", "errors": errors}), 400
+
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        cur = conn.cursor()
+        try:
+            # One statement per table, whatever the number of drivers
+            psycopg2.extras.execute_values(cur, """
+                INSERT INTO ADDRESS (ROADNAME, NUMBER, CITY, ZIPCODE) VALUES %s
+                ON CONFLICT (ROADNAME, NUMBER, CITY) DO NOTHING
+            """, [key + (zipcode,) for key, zipcode in addresses.items()], page_size=len(addresses))
+            inserted = psycopg2.extras.execute_values(cur, """
+                INSERT INTO DRIVER (NAME, ROADNAME, NUMBER, CITY) VALUES %s
+                ON CONFLICT (NAME) DO NOTHING
+                RETURNING NAME
+            """, [(name,) + values[1:] for name, values in drivers.items()], page_size=len(drivers), fetch=True)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"Error importing drivers: {e}")
+            return jsonify({"error": f"Failed to import drivers: {e}"}), 500
+        finally:
+            cur.close()
+
+    created_names = {name for (name,) in inserted}
+    created = []
+    for name, (row_no, _, _, _) in drivers.items():
+        if name in created_names:
+            created.append({"row": row_no, "name": name})
         else:
-             print(f"Unique violation error adding driver: {e}")
-             return jsonify({"error": f"Failed to add driver due to unique constraint: {e}"}), 409
-
-    except Exception as e:
-        conn.rollback()
-        # Use the clearer error message from previous version
-        print(f"Error adding driver: {e}")
-        return jsonify({"error": f"Failed to add driver: {e}"}), 500
-    finally:
-        cur.close()
-        conn.close()
+            errors.append({"row": row_no, "name": name, "status": 409, "error": f"Driver with name '{name}' already exists"})
+    errors.sort(key=lambda error: error["row"])
+
+    if created:
+        status = 201
+    elif any(error["status"] == 409 for error in errors):
+        status = 409
+    else:
+        status = 400
+    return jsonify({
+        "message": f"Added {len(created)} drivers",
+        "created": created,
+        "errors": errors,
+    }), status
 
 @app.route('/api/managers/drivers/remove', methods=['POST'])
 @jwt_required()
@@ -591,91 +1502,114 @@ def remove_driver():
     if not name:
         return jsonify({"error": "Missing required field (name)"}), 400
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-
-    cur = conn.cursor()
-    try:
-        # Check if driver exists first (Corrected error message)
-        cur.execute("SELECT 1 FROM DRIVER WHERE NAME = %s", (name,))
-        if not cur.fetchone():
-            return jsonify({"error": f"Driver with name '{name}' not found"}), 404
-
-        # Check Foreign Key constraints before deleting
-        # Check RENT table (Corrected SQL syntax)
-        cur.execute("SELECT 1 FROM RENT WHERE NAME = %s LIMIT 1", (name,))
-        if cur.fetchone():
-            return jsonify({"error": "Cannot remove driver: Referenced in RENT table."}), 409
-
-        # Check REVIEW table (Added back the check)
-        cur.execute("SELECT 1 FROM REVIEW WHERE NAME = %s LIMIT 1", (name,))
-        if cur.fetchone():
-            return jsonify({"error": "Cannot remove driver: Referenced in REVIEW table."}), 409
-
-        # Check DRIVES table
-        cur.execute("SELECT 1 FROM DRIVES WHERE NAME = %s LIMIT 1", (name,))
-        if cur.fetchone():
-            return jsonify({"error": "Cannot remove driver: Referenced in DRIVES table."}), 409
-
-        # If no constraints, delete the driver
-        cur.execute("DELETE FROM DRIVER WHERE NAME = %s", (name,))
-        conn.commit()
-
-        # Use clearer messages
-        if cur.rowcount > 0:
-            return jsonify({"message": f"Driver '{name}' removed successfully"}), 200
-        else:
-            return jsonify({"error": f"Driver '{name}' not found (post-check)"}), 404
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
 
-    except Exception as e:
-        conn.rollback()
-        # Use clearer messages
-        print(f"Error removing driver: {e}")
-        return jsonify({"error": f"Failed to remove driver: {e}"}), 500
-    finally:
-        cur.close()
-        conn.close()
+        cur = conn.cursor()
+        try:
+            # Check if driver exists first (Corrected error message)
+            cur.execute("SELECT 1 FROM DRIVER WHERE NAME = %s", (name,))
+            if not cur.fetchone():
+                return jsonify({"error": f"Driver with name '{name}' not found"}), 404
+
+            # Check Foreign Key constraints before deleting
+            # Check RENT table (Corrected SQL syntax)
+            cur.execute("SELECT 1 FROM RENT WHERE NAME = %s LIMIT 1", (name,))
+            if cur.fetchone():
+                return jsonify({"error": "Cannot remove driver: Referenced in RENT table."}), 409
+
+            # Check REVIEW table (Added back the check)
+            cur.execute("SELECT 1 FROM REVIEW WHERE NAME = %s LIMIT 1", (name,))
+            if cur.fetchone():
+                return jsonify({"error": "Cannot remove driver: Referenced in REVIEW table."}), 409
+
+            # Check DRIVES table
+            cur.execute("SELECT 1 FROM DRIVES WHERE NAME = %s LIMIT 1", (name,))
+            if cur.fetchone():
+                return jsonify({"error": "Cannot remove driver: Referenced in DRIVES table."}), 409
+
+            # If no constraints, delete the driver
+            cur.execute("DELETE FROM DRIVER WHERE NAME = %s", (name,))
+            conn.commit()
+
+            # Use clearer messages
+            if cur.rowcount > 0:
+                return jsonify({"message": f"Driver '{name}' removed successfully"}), 200
+            else:
+                return jsonify({"error": f"Driver '{name}' not found (post-check)"}), 404
+
+        except Exception as e:
+            conn.rollback()
+            # Use clearer messages
+            print(f"Error removing driver: {e}")
+            return jsonify({"error": f"Failed to remove driver: {e}"}), 500
+        finally:
+            cur.close()
+
+# --- Bulk driver removal: {"names": [...]} ---
+@app.route('/api/managers/drivers/bulk-remove', methods=['POST'])
+@jwt_required()
+def remove_drivers_bulk():
+    data = request.get_json(silent=True)
+    names = data.get('names') if isinstance(data, dict) else None
+    if not isinstance(names, list) or not names or not all(isinstance(name, str) and name for name in names):
+        return jsonify({"error": "names must be a non-empty array of driver names"}), 400
+    if len(names) > BULK_IMPORT_MAX_ROWS:
+        return jsonify({"error": f"Too many names, at most {BULK_IMPORT_MAX_ROWS} per request"}), 413
+    names = list(dict.fromkeys(names))
+
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        cur = conn.cursor()
+        try:
+            # --- Existence and every blocking reference (RENT, REVIEW, DRIVES) in one query ---
+            cur.execute("""
+                SELECT n.NAME,
+                       EXISTS (SELECT 1 FROM DRIVER d WHERE d.NAME = n.NAME) AS known,
+                       EXISTS (SELECT 1 FROM RENT r WHERE r.NAME = n.NAME) AS in_rent,
+                       EXISTS (SELECT 1 FROM REVIEW rv WHERE rv.NAME = n.NAME) AS in_review,
+                       EXISTS (SELECT 1 FROM DRIVES dr WHERE dr.NAME = n.NAME) AS in_drives
+                FROM unnest(%s::varchar[]) AS n(NAME)
+            """, (names,))
+            probes = {row[0]: row[1:] for row in cur.fetchall()}
+
+            removed, blocked, not_found = [], [], []
+            for name in names:
+                known, *references = probes[name]
+                reasons = [table for table, referenced in zip(("RENT", "REVIEW", "DRIVES"), references) if referenced]
+                if not known:
+                    not_found.append(name)
+                elif reasons:
+                    blocked.append({"name": name, "reasons": reasons,
+                                    "error": f"Cannot remove driver: Referenced in {', '.join(reasons)} table{'s' if len(reasons) > 1 else ''}."})
+                else:
+                    removed.append(name)
+
+            if removed:
+                cur.execute("DELETE FROM DRIVER WHERE NAME = ANY(%s)", (removed,))
+            conn.commit()
+
+        except psycopg2.errors.ForeignKeyViolation as e:
+            conn.rollback()
+            # A rent, review or drivable model was added for one of the drivers meanwhile
+            print(f"Foreign key violation removing drivers: {e}")
+            return jsonify({"error": "Drivers were referenced while being removed, nothing was removed. Please retry."}), 409
+        except Exception as e:
+            conn.rollback()
+            print(f"Error removing drivers: {e}")
+            return jsonify({"error": f"Failed to remove drivers: {e}"}), 500
+        finally:
+            cur.close()
+
+    return jsonify({"removed": removed, "blocked": blocked, "not_found": not_found}), 200
 
 @app.route('/api/managers/reports/driver-stats', methods=['GET'])
 @jwt_required()
 def get_driver_stats_report():
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    try:
-        # Query to get driver name, total rents, and average rating
-        # Using LEFT JOINs to include drivers with no rents or no reviews
-        query = """
-            SELECT 
-                d.NAME AS name,
-                COALESCE(COUNT(DISTINCT r.RENTID), 0) AS total_rents, 
-                COALESCE(AVG(v.RATING), 0.0) AS average_rating
-            FROM DRIVER d
-            LEFT JOIN RENT r ON d.NAME = r.NAME
-            LEFT JOIN REVIEW v ON d.NAME = v.NAME
-            GROUP BY d.NAME
-            ORDER BY d.NAME;
-        """
-        # COALESCE is used to return 0 instead of NULL if a driver has no rents or reviews
-        # AVG returns a numeric type, COALESCE ensures it's float 0.0 for consistency
-        
-        cur.execute(query)
-        driver_stats = cur.fetchall()
-
-        # Convert Row objects to simple dictionaries
-        report_list = [dict(driver) for driver in driver_stats]
-
-        return jsonify({"driver_stats_report": report_list}), 200
-
-    except Exception as e:
-        print(f"Error fetching driver stats report: {e}")
-        return jsonify({"error": f"Failed to fetch driver stats report: {e}"}), 500
-    finally:
-        cur.close()
-        conn.close()
+    return report_response('driver-stats', request.args)
 
 ########################################################################
 
@@ -689,37 +1623,36 @@ def login_driver():
     if not name:
        return jsonify({"error": "Missing required field name"}), 400
 
-    conn=get_db_connection()
-    if not conn:
-       return jsonify({"error": "Database connection failed"}), 500
-
-    cur=conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-
-    try:
-       # Fetch driver name and their full address details
-       # Join DRIVER and ADDRESS tables
-       query = """
-            SELECT d.NAME as name, a.ROADNAME as roadname, a.NUMBER as number, a.CITY as city, a.ZIPCODE as zipcode
-            FROM DRIVER d
-            JOIN ADDRESS a ON d.ROADNAME = a.ROADNAME AND d.NUMBER = a.NUMBER AND d.CITY = a.CITY
-            WHERE d.NAME = %s
-       """
-       cur.execute(query, (name,))
-       driver=cur.fetchone()
+    with db_connection() as conn:
+        if not conn:
+           return jsonify({"error": "Database connection failed"}), 500
+
+        cur=conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+
+        try:
+           # Fetch driver name and their full address details
+           # Join DRIVER and ADDRESS tables
+           query = """
+                SELECT d.NAME as name, a.ROADNAME as roadname, a.NUMBER as number, a.CITY as city, a.ZIPCODE as zipcode
+                FROM DRIVER d
+                JOIN ADDRESS a ON d.ROADNAME = a.ROADNAME AND d.NUMBER = a.NUMBER AND d.CITY = a.CITY
+                WHERE d.NAME = %s
+           """
+           cur.execute(query, (name,))
+           driver=cur.fetchone()
        
-       if driver:
-         driver_dict = dict(driver)
-         # Use driver name as the identity for the token
-         access_token = create_access_token(identity=name, additional_claims={"user_type": "driver"})
-         return jsonify(access_token=access_token, driver=driver_dict, message="Login successful"), 200
-       else:
-          return jsonify({"error": "Invalid driver name"}), 401 # Unauthorized
-    except Exception as e:
-       print(f"Error in driver login: {e}")
-       return jsonify({"error": "Failed to process login"}), 500
-    finally:
-       cur.close()
-       conn.close()
+           if driver:
+             driver_dict = dict(driver)
+             # Use driver name as the identity for the token
+             access_token = create_access_token(identity=name, additional_claims={"user_type": "driver"})
+             return jsonify(access_token=access_token, driver=driver_dict, message="Login successful"), 200
+           else:
+              return jsonify({"error": "Invalid driver name"}), 401 # Unauthorized
+        except Exception as e:
+           print(f"Error in driver login: {e}")
+           return jsonify({"error": "Failed to process login"}), 500
+        finally:
+           cur.close()
 
 @app.route('/api/drivers/address', methods=['PUT']) # Use PUT for update
 @jwt_required()
@@ -735,47 +1668,46 @@ def update_driver_address():
     if not new_roadname or not new_number or not new_city or not new_zipcode:
         return jsonify({"error": "Missing required address fields (roadname, number, city, zipcode)"}), 400
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-
-    cur = conn.cursor()
-    try:
-        # Step 1: Upsert the new address into the ADDRESS table
-        # ON CONFLICT targets the primary key of ADDRESS
-        upsert_address_query = """
-            INSERT INTO ADDRESS (ROADNAME, NUMBER, CITY, ZIPCODE)
-            VALUES (%s, %s, %s, %s)
-            ON CONFLICT (ROADNAME, NUMBER, CITY) DO NOTHING;
-        """
-        cur.execute(upsert_address_query, (new_roadname, new_number, new_city, new_zipcode))
-
-        # Step 2: Update the DRIVER table to reference the new address
-        update_driver_query = """
-            UPDATE DRIVER
-            SET ROADNAME = %s, NUMBER = %s, CITY = %s
-            WHERE NAME = %s;
-        """
-        cur.execute(update_driver_query, (new_roadname, new_number, new_city, driver_name))
-
-        conn.commit()
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        cur = conn.cursor()
+        try:
+            # Step 1: Upsert the new address into the ADDRESS table
+            # ON CONFLICT targets the primary key of ADDRESS
+            upsert_address_query = """
+                INSERT INTO ADDRESS (ROADNAME, NUMBER, CITY, ZIPCODE)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (ROADNAME, NUMBER, CITY) DO NOTHING;
+            """
+            cur.execute(upsert_address_query, (new_roadname, new_number, new_city, new_zipcode))
+
+            # Step 2: Update the DRIVER table to reference the new address
+            update_driver_query = """
+                UPDATE DRIVER
+                SET ROADNAME = %s, NUMBER = %s, CITY = %s
+                WHERE NAME = %s;
+            """
+            cur.execute(update_driver_query, (new_roadname, new_number, new_city, driver_name))
+
+            conn.commit()
+
+            # Optionally, return the updated address details
+            updated_address = {
+                "roadname": new_roadname,
+                "number": new_number,
+                "city": new_city,
+                "zipcode": new_zipcode
+            }
+            return jsonify({"message": "Address updated successfully", "address": updated_address}), 200
 
-        # Optionally, return the updated address details
-        updated_address = {
-            "roadname": new_roadname,
-            "number": new_number,
-            "city": new_city,
-            "zipcode": new_zipcode
-        }
-        return jsonify({"message": "Address updated successfully", "address": updated_address}), 200
-
-    except Exception as e:
-        conn.rollback()
-        print(f"Error updating driver address for {driver_name}: {e}")
-        return jsonify({"error": f"Failed to update address: {e}"}), 500
-    finally:
-        cur.close()
-        conn.close()
+        except Exception as e:
+            conn.rollback()
+            print(f"Error updating driver address for {driver_name}: {e}")
+            return jsonify({"error": f"Failed to update address: {e}"}), 500
+        finally:
+            cur.close()
 
 @app.route('/api/drivers/drivable-models', methods=['POST'])
 @jwt_required()
@@ -787,58 +1719,65 @@ def declare_drivable_model():
     if not car_id:
         return jsonify({"error": "Missing required field: car_id"}), 400
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-
-    cur = conn.cursor()
-    try:
-        # Step 1: Find the MODELID associated with the CARID
-        # Assuming there's a direct mapping or a default MODELID per CARID in MODEL table
-        cur.execute("SELECT MODELID FROM MODEL WHERE CARID = %s LIMIT 1", (car_id,))
-        model_result = cur.fetchone()
-
-        if not model_result:
-            # If no model found for this car, maybe the car hasn't been fully setup in MODEL table?
-            return jsonify({"error": f"No model details found for CARID {car_id}"}), 404
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        cur = conn.cursor()
+        try:
+            # Step 1: Find the MODELID associated with the CARID
+            # Assuming there's a direct mapping or a default MODELID per CARID in MODEL table
+            # Car details are fetched in the same query so the availability index can be updated
+            cur.execute("""
+                SELECT m.MODELID, c.MAKE, c.MODEL, c.YEAR
+                FROM MODEL m
+                JOIN CAR c ON m.CARID = c.CARID
+                WHERE m.CARID = %s
+                LIMIT 1
+            """, (car_id,))
+            model_result = cur.fetchone()
+
+            if not model_result:
+                # If no model found for this car, maybe the car hasn't been fully setup in MODEL table?
+                return jsonify({"error": f"No model details found for CARID {car_id}"}), 404
         
-        model_id = model_result[0] # Extract MODELID
-
-        # --- Add check for NULL model_id --- 
-        if model_id is None:
-            conn.rollback() # Rollback since we cannot proceed
-            print(f"Error declaring drivable model: MODELID is NULL in MODEL table for CARID {car_id}")
-            # Return a specific error message
-            return jsonify({"error": f"Cannot declare drivable: Model details (MODELID) are missing for CARID {car_id} in the database."}), 500 # Internal Server Error might be appropriate
-
-        # Step 2: Insert into DRIVES table
-        insert_drives_query = """
-            INSERT INTO DRIVES (NAME, MODELID, CARID)
-            VALUES (%s, %s, %s);
-        """
-        cur.execute(insert_drives_query, (driver_name, model_id, car_id))
-        conn.commit()
+            model_id = model_result[0] # Extract MODELID
+
+            # --- Add check for NULL model_id --- 
+            if model_id is None:
+                conn.rollback() # Rollback since we cannot proceed
+                print(f"Error declaring drivable model: MODELID is NULL in MODEL table for CARID {car_id}")
+                # Return a specific error message
+                return jsonify({"error": f"Cannot declare drivable: Model details (MODELID) are missing for CARID {car_id} in the database."}), 500 # Internal Server Error might be appropriate
+
+            # Step 2: Insert into DRIVES table
+            insert_drives_query = """
+                INSERT INTO DRIVES (NAME, MODELID, CARID)
+                VALUES (%s, %s, %s);
+            """
+            cur.execute(insert_drives_query, (driver_name, model_id, car_id))
+            conn.commit()
+            availability_index.add_drives(driver_name, model_id, car_id, *model_result[1:])
         
-        return jsonify({"message": f"Model {car_id} declared as drivable successfully"}), 201
-
-    except psycopg2.errors.UniqueViolation:
-        conn.rollback() # Important to rollback after error
-        # This means the driver already declared this model
-        return jsonify({"error": f"Model {car_id} is already declared as drivable for this driver"}), 409 # Conflict
-
-    except psycopg2.errors.ForeignKeyViolation as e:
-        conn.rollback()
-        # Could happen if driver_name or model_id/car_id doesn't exist (though JWT/previous check should prevent this)
-        print(f"Foreign key violation declaring drivable model: {e}")
-        return jsonify({"error": f"Invalid driver or model details: {e}"}), 400
-
-    except Exception as e:
-        conn.rollback()
-        print(f"Error declaring drivable model for {driver_name}: {e}")
-        return jsonify({"error": f"Failed to declare drivable model: {e}"}), 500
-    finally:
-        cur.close()
-        conn.close()
+            return jsonify({"message": f"Model {car_id} declared as drivable successfully"}), 201
+
+        except psycopg2.errors.UniqueViolation:
+            conn.rollback() # Important to rollback after error
+            # This means the driver already declared this model
+            return jsonify({"error": f"Model {car_id} is already declared as drivable for this driver"}), 409 # Conflict
+
+        except psycopg2.errors.ForeignKeyViolation as e:
+            conn.rollback()
+            # Could happen if driver_name or model_id/car_id doesn't exist (though JWT/previous check should prevent this)
+            print(f"Foreign key violation declaring drivable model: {e}")
+            return jsonify({"error": f"Invalid driver or model details: {e}"}), 400
+
+        except Exception as e:
+            conn.rollback()
+            print(f"Error declaring drivable model for {driver_name}: {e}")
+            return jsonify({"error": f"Failed to declare drivable model: {e}"}), 500
+        finally:
+            cur.close()
 
 # --- Endpoint for a driver to get their own drivable models --- 
 @app.route('/api/drivers/me/drivable-models', methods=['GET'])
@@ -846,42 +1785,41 @@ def declare_drivable_model():
 def get_my_drivable_models():
     driver_name = get_jwt_identity() # Get driver name from JWT
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    try:
-        # Query to get details of cars the logged-in driver can drive
-        query = """
-            SELECT DISTINCT
-                d.CARID AS "carId", -- Alias to match frontend expectations often
-                c.MAKE AS make,
-                c.MODEL AS model_name, -- Alias if 'model' conflicts
-                c.YEAR AS year
-                -- Optionally include d.MODELID if needed by frontend
-                -- d.MODELID AS "modelId"
-            FROM DRIVES d
-            JOIN CAR c ON d.CARID = c.CARID
-            -- Optional: JOIN MODEL m ON d.MODELID = m.MODELID AND d.CARID = m.CARID (if you need model details like color)
-            WHERE d.NAME = %s
-            ORDER BY make, model_name, year;
-        """
-        cur.execute(query, (driver_name,))
-        drivable_cars = cur.fetchall()
-
-        # Convert Row objects to simple dictionaries
-        drivable_list = [dict(car) for car in drivable_cars]
-
-        # Return the list, perhaps under a key like 'drivable_models'
-        return jsonify({"drivable_models": drivable_list}), 200
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
 
-    except Exception as e:
-        print(f"Error fetching drivable models for driver {driver_name}: {e}")
-        return jsonify({"error": f"Failed to fetch drivable models: {e}"}), 500
-    finally:
-        cur.close()
-        conn.close()
+        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        try:
+            # Query to get details of cars the logged-in driver can drive
+            query = """
+                SELECT DISTINCT
+                    d.CARID AS "carId", -- Alias to match frontend expectations often
+                    c.MAKE AS make,
+                    c.MODEL AS model_name, -- Alias if 'model' conflicts
+                    c.YEAR AS year
+                    -- Optionally include d.MODELID if needed by frontend
+                    -- d.MODELID AS "modelId"
+                FROM DRIVES d
+                JOIN CAR c ON d.CARID = c.CARID
+                -- Optional: JOIN MODEL m ON d.MODELID = m.MODELID AND d.CARID = m.CARID (if you need model details like color)
+                WHERE d.NAME = %s
+                ORDER BY make, model_name, year;
+            """
+            cur.execute(query, (driver_name,))
+            drivable_cars = cur.fetchall()
+
+            # Convert Row objects to simple dictionaries
+            drivable_list = [dict(car) for car in drivable_cars]
+
+            # Return the list, perhaps under a key like 'drivable_models'
+            return jsonify({"drivable_models": drivable_list}), 200
+
+        except Exception as e:
+            print(f"Error fetching drivable models for driver {driver_name}: {e}")
+            return jsonify({"error": f"Failed to fetch drivable models: {e}"}), 500
+        finally:
+            cur.close()
 
 # --- Endpoint for a driver to remove a model from their drivable list ---
 @app.route('/api/drivers/me/drivable-models/<string:car_id_to_remove>', methods=['DELETE'])
@@ -892,41 +1830,158 @@ def remove_my_drivable_model(car_id_to_remove):
     if not car_id_to_remove:
          return jsonify({"error": "Missing car ID in URL"}), 400
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-
-    cur = conn.cursor()
-    try:
-        # Delete the specific entry from DRIVES table for this driver and car
-        # Note: This doesn't require MODELID, as CARID and NAME are sufficient keys in DRIVES 
-        # if we assume a driver declares the CAR, not specific MODELIDs separately.
-        # If the PK of DRIVES is (NAME, MODELID, CARID), we might need MODELID too, 
-        # but the declare function currently only associates with one MODELID per CARID.
-        delete_query = """
-            DELETE FROM DRIVES 
-            WHERE NAME = %s AND CARID = %s;
-        """
-        cur.execute(delete_query, (driver_name, car_id_to_remove))
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        cur = conn.cursor()
+        try:
+            # Delete the specific entry from DRIVES table for this driver and car
+            # Note: This doesn't require MODELID, as CARID and NAME are sufficient keys in DRIVES 
+            # if we assume a driver declares the CAR, not specific MODELIDs separately.
+            # If the PK of DRIVES is (NAME, MODELID, CARID), we might need MODELID too, 
+            # but the declare function currently only associates with one MODELID per CARID.
+            delete_query = """
+                DELETE FROM DRIVES 
+                WHERE NAME = %s AND CARID = %s;
+            """
+            cur.execute(delete_query, (driver_name, car_id_to_remove))
         
-        # Check if any row was actually deleted
-        if cur.rowcount == 0:
-            conn.rollback() # No changes needed
-            # It's possible the driver didn't have this car declared, or car_id was wrong
-            return jsonify({"error": "Model not found in drivable list or already removed"}), 404
+            # Check if any row was actually deleted
+            if cur.rowcount == 0:
+                conn.rollback() # No changes needed
+                # It's possible the driver didn't have this car declared, or car_id was wrong
+                return jsonify({"error": "Model not found in drivable list or already removed"}), 404
         
-        conn.commit() # Commit the deletion
-        # Return 204 No Content or a success message
-        # return jsonify({"message": "Model removed from drivable list successfully"}), 200
-        return '', 204 # Standard practice for successful DELETE with no body
-
-    except Exception as e:
-        conn.rollback()
-        print(f"Error removing drivable model {car_id_to_remove} for driver {driver_name}: {e}")
-        return jsonify({"error": f"Failed to remove drivable model: {e}"}), 500
-    finally:
-        cur.close()
-        conn.close()
+            conn.commit() # Commit the deletion
+            availability_index.remove_drives(driver_name, car_id_to_remove)
+            # Return 204 No Content or a success message
+            # return jsonify({"message": "Model removed from drivable list successfully"}), 200
+            return '', 204 # Standard practice for successful DELETE with no body
+
+        except Exception as e:
+            conn.rollback()
+            print(f"Error removing drivable model {car_id_to_remove} for driver {driver_name}: {e}")
+            return jsonify({"error": f"Failed to remove drivable model: {e}"}), 500
+        finally:
+            cur.close()
+
+def read_car_id_list(data):
+    """Return the de-duplicated car_ids list of a bulk request (input order kept), or raise ValueError."""
+    car_ids = data.get('car_ids') if isinstance(data, dict) else None
+    if not isinstance(car_ids, list) or not car_ids:
+        raise ValueError("car_ids must be a non-empty array")
+    if not all(isinstance(car_id, str) and car_id for car_id in car_ids):
+        raise ValueError("car_ids must contain non-empty strings")
+    if len(car_ids) > BULK_IMPORT_MAX_ROWS:
+        raise ValueError(f"Too many car_ids, at most {BULK_IMPORT_MAX_ROWS} per request")
+    return list(dict.fromkeys(car_ids))
+
+# --- Endpoint for a driver to declare several cars as drivable at once ---
+@app.route('/api/drivers/me/drivable-models/bulk', methods=['POST'])
+@jwt_required()
+def declare_drivable_models_bulk():
+    driver_name = get_jwt_identity()
+    try:
+        car_ids = read_car_id_list(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        cur = conn.cursor()
+        try:
+            # One MODELID per car, as in declare_drivable_model, with the car details for the availability index
+            cur.execute("""
+                SELECT DISTINCT ON (m.CARID) m.CARID, m.MODELID, c.MAKE, c.MODEL, c.YEAR
+                FROM MODEL m
+                JOIN CAR c ON m.CARID = c.CARID
+                WHERE m.CARID = ANY(%s)
+                ORDER BY m.CARID, m.MODELID
+            """, (car_ids,))
+            models = {row[0]: row[1:] for row in cur.fetchall()}
+
+            added = set()
+            if models:
+                inserted = psycopg2.extras.execute_values(cur, """
+                    INSERT INTO DRIVES (NAME, MODELID, CARID) VALUES %s
+                    ON CONFLICT DO NOTHING
+                    RETURNING CARID
+                """, [(driver_name, model[0], car_id) for car_id, model in models.items()],
+                    page_size=len(models), fetch=True)
+                added = {car_id for (car_id,) in inserted}
+            conn.commit()
+
+        except psycopg2.errors.ForeignKeyViolation as e:
+            conn.rollback()
+            print(f"Foreign key violation declaring drivable models: {e}")
+            return jsonify({"error": f"Invalid driver or model details: {e}"}), 400
+        except Exception as e:
+            conn.rollback()
+            print(f"Error declaring drivable models for {driver_name}: {e}")
+            return jsonify({"error": f"Failed to declare drivable models: {e}"}), 500
+        finally:
+            cur.close()
+
+    for car_id in added:
+        availability_index.add_drives(driver_name, models[car_id][0], car_id, *models[car_id][1:])
+    return jsonify({
+        "added": [car_id for car_id in car_ids if car_id in added],
+        "skipped": [car_id for car_id in car_ids if car_id in models and car_id not in added],  # already declared
+        "unknown": [car_id for car_id in car_ids if car_id not in models],
+    }), 201 if added else 200
+
+# --- Endpoint for a driver to remove several cars from their drivable list at once ---
+@app.route('/api/drivers/me/drivable-models/bulk-remove', methods=['POST'])
+@jwt_required()
+def remove_my_drivable_models_bulk():
+    driver_name = get_jwt_identity()
+    try:
+        car_ids = read_car_id_list(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        cur = conn.cursor()
+        try:
+            # Delete and classify every requested car in one statement
+            cur.execute("""
+                WITH requested AS (
+                    SELECT unnest(%(car_ids)s::varchar[]) AS CARID
+                ),
+                deleted AS (
+                    DELETE FROM DRIVES
+                    WHERE NAME = %(name)s AND CARID = ANY(%(car_ids)s)
+                    RETURNING CARID
+                )
+                SELECT r.CARID,
+                       EXISTS (SELECT 1 FROM deleted d WHERE d.CARID = r.CARID) AS removed,
+                       EXISTS (SELECT 1 FROM CAR c WHERE c.CARID = r.CARID) AS known
+                FROM requested r
+            """, {"car_ids": car_ids, "name": driver_name})
+            outcome = {car_id: (removed, known) for car_id, removed, known in cur.fetchall()}
+            conn.commit()
+
+        except Exception as e:
+            conn.rollback()
+            print(f"Error removing drivable models for driver {driver_name}: {e}")
+            return jsonify({"error": f"Failed to remove drivable models: {e}"}), 500
+        finally:
+            cur.close()
+
+    removed = [car_id for car_id in car_ids if outcome[car_id][0]]
+    for car_id in removed:
+        availability_index.remove_drives(driver_name, car_id)
+    return jsonify({
+        "removed": removed,
+        "skipped": [car_id for car_id in car_ids if outcome[car_id] == (False, True)],  # not in the drivable list
+        "unknown": [car_id for car_id in car_ids if not outcome[car_id][1]],
+    }), 200
 
 ###################################################################
 #Client API
@@ -936,6 +1991,54 @@ def remove_my_drivable_model(car_id_to_remove):
 @app.route('/api/clients/register', methods=['POST'])
 def register_client():
     data = request.get_json()
+    try:
+        client = parse_client_registration(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection Failed"}), 500
+
+        cur = conn.cursor()
+        try:
+            # CLIENT, ADDRESS, LIVES and CREDITCARD rows in one statement each,
+            # however many addresses and cards the client has
+            created = insert_clients(cur, [client])
+            if not created:
+                conn.rollback()
+                return jsonify({"error": "Client with this Email already exists"}), 409 # Conflict
+
+            # --- Commit Transaction ---
+            conn.commit()
+            # Removed clientId from response
+            return jsonify({"message": "Client registered successfully"}), 201
+
+        except psycopg2.Error as db_err: # Catch specific database errors
+            conn.rollback() # Rollback in case of any error
+            print(f"Database error during client registration: {db_err}")
+            # Provide more specific feedback if possible
+            if 'duplicate key value violates unique constraint "client_pkey"' in str(db_err):
+                return jsonify({"error": "Client with this Email already exists"}), 409
+            if 'duplicate key value violates unique constraint "creditcard_pkey"' in str(db_err):
+                # Consider if this should update or be an error
+                return jsonify({"error": "Credit card number already exists."}), 409
+            return jsonify({"error": f"Database error during registration: {db_err}"}), 500
+        except Exception as e:
+            conn.rollback()
+            print(f"Error during client registration: {e}")
+            return jsonify({"error": f"Failed to register client: {e}"}), 500
+        finally:
+            cur.close()
+
+def parse_client_registration(data):
+    """Validate a registration payload; returns (name, email, addresses, card_numbers) or raises ValueError.
+
+    Addresses are (roadname, number, city, zipcode) tuples. The first address is
+    the billing address of every card.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
     name = data.get('name')
     email = data.get('email')
     addresses = data.get('addresses') # Expecting an array of address objects
@@ -943,111 +2046,141 @@ def register_client():
 
     # --- Basic Validation ---
     if not name or not email:
-        return jsonify({"error": "Missing required fields (name, email)"}), 400
+        raise ValueError("Missing required fields (name, email)")
     if not isinstance(addresses, list) or not addresses:
-        return jsonify({"error": "Addresses field must be a non-empty array"}), 400
+        raise ValueError("Addresses field must be a non-empty array")
     if not isinstance(credit_cards, list) or not credit_cards:
-        return jsonify({"error": "CreditCards field must be a non-empty array"}), 400
+        raise ValueError("CreditCards field must be a non-empty array")
 
-    # --- Deeper Validation (Example: Check address/card structure) ---
+    # --- Deeper Validation (Check address/card structure) ---
     for addr in addresses:
         # Use correct keys from frontend ('street', 'city', 'zip')
-        if not all(k in addr for k in ('street', 'city', 'zip')):
-             return jsonify({"error": f"Invalid address object structure: {addr}"}), 400
+        if not isinstance(addr, dict) or not all(k in addr for k in ('street', 'city', 'zip')):
+            raise ValueError(f"Invalid address object structure: {addr}")
     for card in credit_cards:
-         # Ensure billingAddress is present, even if other fields are simplified in frontend
-         # Use correct keys from frontend ('number', 'expiry', 'cvv', 'billingAddress')
-         if not all(k in card for k in ('number', 'expiry', 'cvv', 'billingAddress')):
-             return jsonify({"error": f"Invalid credit card object structure: {card}"}), 400
+        # Ensure billingAddress is present, even if other fields are simplified in frontend
+        # Use correct keys from frontend ('number', 'expiry', 'cvv', 'billingAddress')
+        if not isinstance(card, dict) or not all(k in card for k in ('number', 'expiry', 'cvv', 'billingAddress')):
+            raise ValueError(f"Invalid credit card object structure: {card}")
 
+    # ADDRESS is a shared table keyed by (ROADNAME, NUMBER, CITY); a missing house number is stored as 'N/A'
+    address_rows = [(addr['street'], addr.get('number', 'N/A'), addr['city'], addr['zip']) for addr in addresses]
+    return name, email, address_rows, [card['number'] for card in credit_cards]
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection Failed"}), 500
+def insert_clients(cur, clients):
+    """Insert validated registrations with one multi-row statement per table.
 
-    cur = conn.cursor()
+    Clients whose email already exists are skipped together with their addresses
+    links and cards; returns the set of emails that were created.
+    """
+    created = {email for (email,) in psycopg2.extras.execute_values(
+        cur,
+        "INSERT INTO CLIENT (NAME, EMAIL) VALUES %s ON CONFLICT (EMAIL) DO NOTHING RETURNING EMAIL",
+        [(name, email) for name, email, _, _ in clients],
+        page_size=len(clients), fetch=True,
+    )}
+    if not created:
+        return created
+
+    addresses, lives, cards = {}, {}, {}
+    for name, email, address_rows, card_numbers in clients:
+        if email not in created:
+            continue
+        for roadname, number, city, zipcode in address_rows:
+            addresses.setdefault((roadname, number, city), zipcode)
+            lives[(email, roadname, number, city)] = None
+        # The first address is the billing address; a card number given twice keeps its last owner
+        for card_number in card_numbers:
+            cards[card_number] = (email,) + address_rows[0][:3]
+
+    psycopg2.extras.execute_values(
+        cur,
+        "INSERT INTO ADDRESS (ROADNAME, NUMBER, CITY, ZIPCODE) VALUES %s ON CONFLICT (ROADNAME, NUMBER, CITY) DO NOTHING",
+        [key + (zipcode,) for key, zipcode in addresses.items()], page_size=len(addresses),
+    )
+    psycopg2.extras.execute_values(
+        cur,
+        "INSERT INTO LIVES (EMAIL, ROADNAME, NUMBER, CITY) VALUES %s ON CONFLICT DO NOTHING",
+        list(lives), page_size=len(lives),
+    )
+    psycopg2.extras.execute_values(
+        cur,
+        "INSERT INTO CREDITCARD (CARDNUMBER, EMAIL, ROADNAME, NUMBER, CITY) VALUES %s "
+        "ON CONFLICT (CARDNUMBER) DO UPDATE SET EMAIL=EXCLUDED.EMAIL, ROADNAME=EXCLUDED.ROADNAME, NUMBER=EXCLUDED.NUMBER, CITY=EXCLUDED.CITY",
+        [(card_number,) + owner for card_number, owner in cards.items()], page_size=len(cards),
+    )
+    return created
+
+# --- Bulk client registration (migrating client bases): JSON list or NDJSON of registration objects ---
+@app.route('/api/managers/clients/import', methods=['POST'])
+@jwt_required()
+def import_clients():
+    if 'csv' in (request.args.get('format') or request.mimetype or '').lower():
+        return jsonify({"error": "CSV is not supported for clients (nested addresses and cards), use JSON or NDJSON"}), 400
     try:
-        # --- Check if Email already exists ---
-        # Use EMAIL as the primary key for CLIENT table check
-        cur.execute("SELECT 1 FROM CLIENT WHERE EMAIL = %s", (email,))
-        if cur.fetchone():
-            return jsonify({"error": "Client with this Email already exists"}), 409 # Conflict
-
-        # --- Removed CLIENTID generation ---
-        # while True:
-        #     client_id = str(uuid.uuid4()) # Assuming CLIENTID is UUID or VARCHAR large enough
-        #     cur.execute("SELECT CLIENTID FROM CLIENT WHERE CLIENTID = %s", (client_id,))
-        #     if not cur.fetchone():
-        #         break
-
-        # --- Insert Client (only NAME and EMAIL) ---
-        cur.execute("INSERT INTO CLIENT (NAME, EMAIL) VALUES (%s, %s)",
-                    (name, email))
-
-        # --- Insert Addresses (using EMAIL as FK) ---
-        for addr in addresses:
-            # ADDRESS table uses ROADNAME, NUMBER, CITY as PK, need to check if address itself exists?
-            # Let's assume ADDRESS can be duplicated but link it to the client via LIVES
-            # First insert into ADDRESS if it doesn't exist
-            # NOTE: This assumes ADDRESS is a shared table. If each client *must* have unique address text,
-            # the schema/logic needs adjustment. This example assumes ADDRESSES can be shared.
-            cur.execute(
-                "INSERT INTO ADDRESS (ROADNAME, NUMBER, CITY, ZIPCODE) VALUES (%s, %s, %s, %s) ON CONFLICT (ROADNAME, NUMBER, CITY) DO NOTHING",
-                (addr['street'], addr.get('number', 'N/A'), addr['city'], addr['zip']) # Handle potentially missing 'number'
-            )
-            # Then link client to the address via LIVES table
-            cur.execute(
-                "INSERT INTO LIVES (EMAIL, ROADNAME, NUMBER, CITY) VALUES (%s, %s, %s, %s) ON CONFLICT DO NOTHING",
-                (email, addr['street'], addr.get('number', 'N/A'), addr['city'])
-            )
-
-        # --- Insert Credit Cards (using EMAIL as FK) ---
-        for card in credit_cards:
-            # CREDITCARD table PK is CARDNUMBER, uses EMAIL as FK to CLIENT
-            # TODO: Consider encrypting card number and CVV before storing
-            # Use correct column name from schema: BILLING_ADDRESS? No, schema has FK to ADDRESS
-            # The schema seems to link CREDITCARD to ADDRESS via (ROADNAME, NUMBER, CITY), not a BILLING_ADDRESS text field.
-            # We need the address PK used for billing. Let's assume the *first* address added is the billing address for simplicity.
-            # A better approach would be to let the user select the billing address.
-            if not addresses: # Should not happen due to validation, but safety check
-                 conn.rollback()
-                 return jsonify({"error": "Cannot add credit card without an address"}), 400
-
-            billing_addr = addresses[0] # Assume first address is billing address
-            # Ensure the billing address exists in ADDRESS table first (might have been inserted above)
-            cur.execute(
-                "INSERT INTO ADDRESS (ROADNAME, NUMBER, CITY, ZIPCODE) VALUES (%s, %s, %s, %s) ON CONFLICT (ROADNAME, NUMBER, CITY) DO NOTHING",
-                (billing_addr['street'], billing_addr.get('number', 'N/A'), billing_addr['city'], billing_addr['zip'])
-            )
-            # Now insert the credit card, linking to the client's EMAIL and the billing address PK
-            cur.execute(
-                "INSERT INTO CREDITCARD (CARDNUMBER, EMAIL, ROADNAME, NUMBER, CITY) VALUES (%s, %s, %s, %s, %s) ON CONFLICT (CARDNUMBER) DO UPDATE SET EMAIL=EXCLUDED.EMAIL, ROADNAME=EXCLUDED.ROADNAME, NUMBER=EXCLUDED.NUMBER, CITY=EXCLUDED.CITY",
-                (card['number'], email, billing_addr['street'], billing_addr.get('number', 'N/A'), billing_addr['city'])
-                # Added ON CONFLICT to handle potential card number duplicates
-            )
-
-        # --- Commit Transaction ---
-        conn.commit()
-        # Removed clientId from response
-        return jsonify({"message": "Client registered successfully"}), 201
-
-    except psycopg2.Error as db_err: # Catch specific database errors
-        conn.rollback() # Rollback in case of any error
-        print(f"Database error during client registration: {db_err}")
-        # Provide more specific feedback if possible
-        if 'duplicate key value violates unique constraint "client_pkey"' in str(db_err):
-            return jsonify({"error": "Client with this Email already exists"}), 409
-        if 'duplicate key value violates unique constraint "creditcard_pkey"' in str(db_err):
-            # Consider if this should update or be an error
-            return jsonify({"error": "Credit card number already exists."}), 409
-        return jsonify({"error": f"Database error during registration: {db_err}"}), 500
-    except Exception as e:
-        conn.rollback()
-        print(f"Error during client registration: {e}")
-        return jsonify({"error": f"Failed to register client: {e}"}), 500
-    finally:
-        cur.close()
-        conn.close()
+        records = read_bulk_rows('clients')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not records:
+        return jsonify({"error": "No rows to import"}), 400
+    if len(records) > BULK_IMPORT_MAX_ROWS:
+        return jsonify({"error": f"Too many rows ({len(records)}), at most {BULK_IMPORT_MAX_ROWS} per request"}), 413
+
+    clients, rows, errors = [], {}, []  # rows: email -> row number
+    for row_no, record in enumerate(records, start=1):
+        try:
+            if record is None:
+                raise ValueError("Invalid JSON object")
+            # read_bulk_rows lowercases keys; registration payloads use creditCards
+            if 'creditcards' in record:
+                record['creditCards'] = record.pop('creditcards')
+            client = parse_client_registration(record)
+        except ValueError as e:
+            errors.append({"row": row_no, "status": 400, "error": str(e)})
+            continue
+        email = client[1]
+        if email in rows:
+            errors.append({"row": row_no, "email": email, "status": 409,
+                           "error": f"Client with this Email already exists (row {rows[email]})"})
+            continue
+        rows[email] = row_no
+        clients.append(client)
+
+    if not clients:
+        return jsonify({"error": "No valid rows to import", "errors": errors}), 400
+
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection Failed"}), 500
+
+        cur = conn.cursor()
+        try:
+            created = insert_clients(cur, clients)
+            conn.commit()
+        except psycopg2.Error as db_err:
+            conn.rollback()
+            print(f"Database error during client import: {db_err}")
+            return jsonify({"error": f"Database error during client import: {db_err}"}), 500
+        finally:
+            cur.close()
+
+    for email, row_no in rows.items():
+        if email not in created:
+            errors.append({"row": row_no, "email": email, "status": 409, "error": "Client with this Email already exists"})
+    errors.sort(key=lambda error: error["row"])
+    registered = [{"row": rows[email], "email": email} for email in rows if email in created]
+
+    if registered:
+        status = 201
+    elif any(error["status"] == 409 for error in errors):
+        status = 409
+    else:
+        status = 400
+    return jsonify({
+        "message": f"Registered {len(registered)} clients",
+        "registered": registered,
+        "errors": errors,
+    }), status
 
 
 @app.route('/api/clients/login', methods=['POST'])
@@ -1059,38 +2192,37 @@ def login_client():
     if not email: # or not password:
         return jsonify({"error": "Missing required fields (email)"}), 400
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    try:
-        # Fetch client by email (PK)
-        # cur.execute("SELECT CLIENTID, NAME, EMAIL, PASSWORD_HASH FROM CLIENT WHERE EMAIL = %s", (email,))
-        cur.execute("SELECT NAME, EMAIL FROM CLIENT WHERE EMAIL = %s", (email,)) # Select based on EMAIL PK
-        client = cur.fetchone()
-
-        # if client and check_password_hash(client['password_hash'], password):
-        if client:
-            client_data = dict(client)
-            # Use EMAIL as the identity for the JWT token
-            access_token = create_access_token(identity=client_data['email'])
-            # Return token and client info (no clientId needed)
-            client_info_for_frontend = {
-                # "clientId": client_data["clientid"],
-                "name": client_data["name"],
-                "email": client_data["email"]
-            }
-            return jsonify(access_token=access_token, client=client_info_for_frontend, message="Login successful"), 200
-        else:
-            return jsonify({"error": "Invalid email or password"}), 401
-
-    except Exception as e:
-        print(f"Error during client login: {e}")
-        return jsonify({"error": "Failed to process login"}), 500
-    finally:
-        cur.close()
-        conn.close()
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        try:
+            # Fetch client by email (PK)
+            # cur.execute("SELECT CLIENTID, NAME, EMAIL, PASSWORD_HASH FROM CLIENT WHERE EMAIL = %s", (email,))
+            cur.execute("SELECT NAME, EMAIL FROM CLIENT WHERE EMAIL = %s", (email,)) # Select based on EMAIL PK
+            client = cur.fetchone()
+
+            # if client and check_password_hash(client['password_hash'], password):
+            if client:
+                client_data = dict(client)
+                # Use EMAIL as the identity for the JWT token
+                access_token = create_access_token(identity=client_data['email'])
+                # Return token and client info (no clientId needed)
+                client_info_for_frontend = {
+                    # "clientId": client_data["clientid"],
+                    "name": client_data["name"],
+                    "email": client_data["email"]
+                }
+                return jsonify(access_token=access_token, client=client_info_for_frontend, message="Login successful"), 200
+            else:
+                return jsonify({"error": "Invalid email or password"}), 401
+
+        except Exception as e:
+            print(f"Error during client login: {e}")
+            return jsonify({"error": "Failed to process login"}), 500
+        finally:
+            cur.close()
 
 # --- Car Availability and Booking Routes ---
 
@@ -1108,64 +2240,9 @@ def get_available_cars():
     except ValueError:
         return jsonify({"error": "Invalid date format. Please use YYYY-MM-DD."}), 400
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
     try:
-        print(f"--- Checking availability for date: {target_date} ---") # Log target date
-
-        # --- Log rented MODELIDs on target date ---
-        cur.execute("SELECT MODELID FROM RENT WHERE DATE = %s", (target_date,))
-        rented_modelids = [row['modelid'] for row in cur.fetchall()]
-        print(f"Rented MODELIDs on {target_date}: {rented_modelids}")
-
-        # --- Log busy DRIVERs on target date ---
-        cur.execute("SELECT NAME FROM RENT WHERE DATE = %s", (target_date,))
-        busy_drivers = [row['name'] for row in cur.fetchall()]
-        print(f"Busy drivers on {target_date}: {busy_drivers}")
-
-        # Query to find available car models based on the criteria
-        # Removed DISTINCT for debugging, added DRIVER NAME
-        query = """
-            SELECT 
-                c.CARID AS id,
-                c.MAKE AS make,
-                c.MODEL AS model_name,
-                c.YEAR AS year,
-                d.MODELID AS modelId,
-                d.NAME as driver_name
-            FROM DRIVES d
-            JOIN MODEL m ON d.MODELID = m.MODELID AND d.CARID = m.CARID
-            JOIN CAR c ON d.CARID = c.CARID
-            WHERE
-                d.MODELID NOT IN (
-                    SELECT MODELID FROM RENT WHERE DATE = %s
-                )
-                AND d.NAME NOT IN (
-                    SELECT NAME FROM RENT WHERE DATE = %s
-                );
-        """
-        print("Executing availability query...") # Log before query
-        cur.execute(query, (target_date, target_date))
-        available_cars_raw = cur.fetchall() # Fetch raw rows
-        print(f"Query returned {len(available_cars_raw)} raw rows.") # Log row count
-
-        # --- Logging Raw Results --- 
-        print("--- Raw available cars data (after query) ---")
-        for i, row in enumerate(available_cars_raw):
-            print(f"Row {i}: {dict(row)}") # Print as dictionary for clarity
-            print(f"  -> modelId type: {type(row.get('modelid'))}, value: {row.get('modelid')}")
-        print("-------------------------------------------")
-        
-        # Convert Row objects to simple dictionaries
-        available_models_list = [dict(car) for car in available_cars_raw] # Use the raw data
-
-        # --- Logging Final List (before sending) --- 
-        print("--- Dict available cars data (before sending) ---")
-        print(available_models_list)
-        print("-----------------------------------------------")
+        # Answered from the in-memory availability index (no database round trip once loaded)
+        available_models_list = availability_index.available(target_date)
 
         # Return in the structure expected by frontend { available_models: [...] }
         return jsonify({"available_models": available_models_list}), 200
@@ -1173,9 +2250,149 @@ def get_available_cars():
     except Exception as e:
         print(f"Error fetching available cars for date {target_date_str}: {e}")
         return jsonify({"error": f"Failed to fetch available cars: {e}"}), 500
-    finally:
-        cur.close()
-        conn.close()
+
+# Largest date window answered by one calendar request; longer ranges are paged via next_start
+CALENDAR_MAX_DAYS = 90
+
+@app.route('/api/cars/availability-calendar', methods=['GET'])
+def get_availability_calendar():
+    start_str = request.args.get('start')
+    end_str = request.args.get('end')
+    make = request.args.get('make') # Optional filters
+    model = request.args.get('model')
+
+    if not start_str or not end_str:
+        return jsonify({"error": "Missing required query parameters: start and end"}), 400
+
+    try:
+        start_date = date.fromisoformat(start_str)
+        end_date = date.fromisoformat(end_str)
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Please use YYYY-MM-DD."}), 400
+
+    if end_date < start_date:
+        return jsonify({"error": "'end' must not be before 'start'"}), 400
+
+    # --- Cap the window so every request stays a single bounded query ---
+    window_end = min(end_date, start_date + timedelta(days=CALENDAR_MAX_DAYS - 1))
+    next_start = window_end + timedelta(days=1) if window_end < end_date else None
+
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        try:
+            # One set-based pass: every (model, day) pair in the window, with the number
+            # of its drivers that are still free that day. A model is available on a day
+            # if it is not rented and at least one of its drivers is free.
+            query = """
+                WITH days AS (
+                    SELECT d::date AS day
+                    FROM generate_series(%(start)s::date, %(end)s::date, interval '1 day') AS d
+                ),
+                models AS (
+                    SELECT m.MODELID, m.CARID, c.MAKE, c.MODEL, c.YEAR
+                    FROM MODEL m
+                    JOIN CAR c ON m.CARID = c.CARID
+                    WHERE (%(make)s::varchar IS NULL OR c.MAKE = %(make)s)
+                      AND (%(model)s::varchar IS NULL OR c.MODEL = %(model)s)
+                      AND EXISTS (
+                          SELECT 1 FROM DRIVES dr
+                          WHERE dr.MODELID = m.MODELID AND dr.CARID = m.CARID
+                      )
+                ),
+                window_rents AS (
+                    SELECT DATE, MODELID, NAME
+                    FROM RENT
+                    WHERE DATE BETWEEN %(start)s AND %(end)s
+                ),
+                free_drivers AS (
+                    SELECT dr.MODELID, dr.CARID, days.day, COUNT(*) AS free_count
+                    FROM models mo
+                    JOIN DRIVES dr ON dr.MODELID = mo.MODELID AND dr.CARID = mo.CARID
+                    CROSS JOIN days
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM window_rents wr
+                        WHERE wr.NAME = dr.NAME AND wr.DATE = days.day
+                    )
+                    GROUP BY dr.MODELID, dr.CARID, days.day
+                )
+                SELECT
+                    mo.MODELID AS modelid,
+                    mo.CARID AS id,
+                    mo.MAKE AS make,
+                    mo.MODEL AS model_name,
+                    mo.YEAR AS year,
+                    days.day,
+                    COALESCE(f.free_count, 0) AS free_drivers,
+                    NOT EXISTS (
+                        SELECT 1 FROM window_rents wr
+                        WHERE wr.MODELID = mo.MODELID AND wr.DATE = days.day
+                    ) AND COALESCE(f.free_count, 0) > 0 AS available
+                FROM models mo
+                CROSS JOIN days
+                LEFT JOIN free_drivers f
+                    ON f.MODELID = mo.MODELID AND f.CARID = mo.CARID AND f.day = days.day
+                ORDER BY mo.MAKE, mo.MODEL, mo.YEAR, mo.MODELID, mo.CARID, days.day;
+            """
+            cur.execute(query, {"start": start_date, "end": window_end, "make": make, "model": model})
+
+            # --- Pivot rows into one entry per model with a value per date ---
+            dates = [(start_date + timedelta(days=i)).isoformat() for i in range((window_end - start_date).days + 1)]
+            models_list = []
+            for row in cur:
+                key = (row['modelid'], row['id'])
+                if not models_list or models_list[-1]['_key'] != key:
+                    models_list.append({
+                        "_key": key,
+                        "modelid": row['modelid'],
+                        "id": row['id'],
+                        "make": row['make'],
+                        "model_name": row['model_name'],
+                        "year": row['year'],
+                        "available": [],
+                        "free_drivers": [],
+                    })
+                models_list[-1]['available'].append(row['available'])
+                models_list[-1]['free_drivers'].append(row['free_drivers'])
+            for entry in models_list:
+                del entry['_key']
+
+            return jsonify({
+                "start": start_date.isoformat(),
+                "end": window_end.isoformat(),
+                "next_start": next_start.isoformat() if next_start else None,
+                "dates": dates,
+                "models": models_list,
+            }), 200
+
+        except Exception as e:
+            print(f"Error fetching availability calendar for {start_str}..{end_str}: {e}")
+            return jsonify({"error": f"Failed to fetch availability calendar: {e}"}), 500
+        finally:
+            cur.close()
+
+# --- Booking helper ---
+# The whole booking decision runs server-side in book_rent() from
+# migrations/0002_book_rent_function.sql: one round trip per booking. It relies on the
+# RENT unique constraints from 0001 and retries with the next eligible driver on conflict.
+BOOKING_MAX_ATTEMPTS = int(os.getenv("BOOKING_MAX_ATTEMPTS", 3))
+
+BOOKING_FAILURES = {
+    'invalid_model': ("Invalid model specified", 404),
+    'model_booked': ("This car model is already booked for the selected date", 409),
+    'no_driver': ("No available driver found for this model on the selected date", 409),
+    'contention': ("Drivers for this model are being booked concurrently, please try again", 409),
+}
+
+def call_book_rent(cur, model_id, rent_date, client_email, best_driver):
+    """Run the book_rent() function; returns a row with status, rent_id, driver_name, driver_rating."""
+    cur.execute(
+        "SELECT status, rent_id, driver_name, driver_rating FROM book_rent(%s, %s, %s, %s, %s)",
+        (model_id, rent_date, client_email, best_driver, BOOKING_MAX_ATTEMPTS)
+    )
+    return cur.fetchone()
 
 @app.route('/api/clients/rents', methods=['POST'])
 @jwt_required()
@@ -1195,72 +2412,35 @@ def book_rent():
     except ValueError:
         return jsonify({"error": "Invalid date format. Please use YYYY-MM-DD."}), 400
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
 
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    try:
-        # --- Start Transaction ---
-        # --- Step 1: Verify Model Exists and Get CARID ---
-        cur.execute("SELECT CARID FROM MODEL WHERE MODELID = %s", (model_id,))
-        model_info = cur.fetchone()
-        if not model_info:
-            return jsonify({"error": "Invalid model specified"}), 404
-        car_id = model_info['carid']
-
-        # --- Step 2: Verify Model is NOT already Rented on this Date ---
-        cur.execute("SELECT 1 FROM RENT WHERE MODELID = %s AND DATE = %s", (model_id, rent_date))
-        if cur.fetchone():
-            return jsonify({"error": "This car model is already booked for the selected date"}), 409
-
-        # --- Step 3: Find ONE Available Driver for this Model on this Date ---
-        find_driver_query = """
-            SELECT dr.NAME
-            FROM DRIVER dr
-            JOIN DRIVES d ON dr.NAME = d.NAME
-            WHERE
-                d.MODELID = %s
-                AND d.CARID = %s
-                AND dr.NAME NOT IN (
-                    SELECT NAME FROM RENT WHERE DATE = %s
-                )
-            LIMIT 1;
-        """
-        cur.execute(find_driver_query, (model_id, car_id, rent_date))
-        available_driver = cur.fetchone()
+        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        try:
+            # --- Verify model, check availability, pick a driver and insert in one call ---
+            result = call_book_rent(cur, model_id, rent_date, client_email, best_driver=False)
+            if result['status'] != 'booked':
+                conn.rollback()
+                message, status = BOOKING_FAILURES[result['status']]
+                return jsonify({"error": message}), status
 
-        if not available_driver:
-            return jsonify({"error": "No available driver found for this model on the selected date"}), 409
+            rent_id = result['rent_id']
+            driver_name = result['driver_name']
 
-        driver_name = available_driver['name']
+            # --- Commit Transaction ---
+            conn.commit()
+            availability_index.record_rent(rent_date, model_id, driver_name)
 
-        # --- Step 4: Generate unique RENTID (Schema uses INT, assuming SERIAL/auto-increment) ---
-        # If RENTID is not auto-incrementing, we need to generate it (e.g., using uuid)
-        # rent_id = str(uuid.uuid4())
+            return jsonify({ "message": f"Rent booked successfully! Rent ID: {rent_id}, Driver: {driver_name}" }), 201
 
-        # --- Step 5: Insert the Rent Record (using EMAIL for client FK) ---
-        # Adjust column names (EMAIL instead of CLIENTID)
-        insert_rent_query = """
-            INSERT INTO RENT (DATE, NAME, EMAIL, CARID, MODELID) -- Assuming RENTID auto-gen
-            VALUES (%s, %s, %s, %s, %s) RETURNING RENTID -- Get the generated RENTID
-        """
-        cur.execute(insert_rent_query, (rent_date, driver_name, client_email, car_id, model_id))
-        rent_id = cur.fetchone()['rentid'] # Fetch the returned RENTID
-
-        # --- Commit Transaction ---
-        conn.commit()
-
-        return jsonify({ "message": f"Rent booked successfully! Rent ID: {rent_id}, Driver: {driver_name}" }), 201
-
-    except Exception as e:
-        conn.rollback()
-        # Use client_email in log message
-        print(f"Error during booking by client {client_email}: {e}")
-        return jsonify({"error": f"Failed to book rent due to an internal error: {e}"}), 500
-    finally:
-        cur.close()
-        conn.close()
+        except Exception as e:
+            conn.rollback()
+            # Use client_email in log message
+            print(f"Error during booking by client {client_email}: {e}")
+            return jsonify({"error": f"Failed to book rent due to an internal error: {e}"}), 500
+        finally:
+            cur.close()
 
 @app.route('/api/clients/rents', methods=['GET'])
 @jwt_required()
@@ -1268,42 +2448,41 @@ def get_client_rents():
     # Use EMAIL from JWT token
     client_email = get_jwt_identity()
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
 
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    try:
-        # Query using EMAIL as the key for client
-        query = """
-            SELECT
-                r.RENTID AS "rentId",
-                r.DATE AS date,
-                r.NAME AS driver,
-                CONCAT(c.YEAR, ' ', c.MAKE, ' ', c.MODEL) AS model
-            FROM RENT r
-            JOIN MODEL m ON r.MODELID = m.MODELID AND r.CARID = m.CARID
-            JOIN CAR c ON m.CARID = c.CARID
-            WHERE r.EMAIL = %s -- Filter by client EMAIL
-            ORDER BY r.DATE DESC;
-        """
-        cur.execute(query, (client_email,))
-        rents = cur.fetchall()
-
-        rents_list = [dict(rent) for rent in rents]
-        for rent_item in rents_list:
-            if isinstance(rent_item['date'], date):
-                rent_item['date'] = rent_item['date'].isoformat()
-
-        return jsonify({"rents": rents_list}), 200
-
-    except Exception as e:
-        # Use client_email in log message
-        print(f"Error fetching rents for client {client_email}: {e}")
-        return jsonify({"error": f"Failed to fetch rents: {e}"}), 500
-    finally:
-        cur.close()
-        conn.close()
+        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        try:
+            # Query using EMAIL as the key for client
+            query = """
+                SELECT
+                    r.RENTID AS "rentId",
+                    r.DATE AS date,
+                    r.NAME AS driver,
+                    CONCAT(c.YEAR, ' ', c.MAKE, ' ', c.MODEL) AS model
+                FROM RENT r
+                JOIN MODEL m ON r.MODELID = m.MODELID AND r.CARID = m.CARID
+                JOIN CAR c ON m.CARID = c.CARID
+                WHERE r.EMAIL = %s -- Filter by client EMAIL
+                ORDER BY r.DATE DESC;
+            """
+            cur.execute(query, (client_email,))
+            rents = cur.fetchall()
+
+            rents_list = [dict(rent) for rent in rents]
+            for rent_item in rents_list:
+                if isinstance(rent_item['date'], date):
+                    rent_item['date'] = rent_item['date'].isoformat()
+
+            return jsonify({"rents": rents_list}), 200
+
+        except Exception as e:
+            # Use client_email in log message
+            print(f"Error fetching rents for client {client_email}: {e}")
+            return jsonify({"error": f"Failed to fetch rents: {e}"}), 500
+        finally:
+            cur.close()
 
 ########################################################################
 # --- Client Review Route ---
@@ -1332,48 +2511,47 @@ def submit_review():
     except (ValueError, TypeError):
          return jsonify({"error": "Invalid rating. Must be an integer between 1 and 5."}), 400
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-
-    cur = conn.cursor()
-    try:
-        # --- Step 1: Check if Driver Exists ---
-        cur.execute("SELECT 1 FROM DRIVER WHERE NAME = %s", (driver_name,))
-        if not cur.fetchone():
-            return jsonify({"error": f"Driver '{driver_name}' not found."}), 404
-
-        # --- Step 2: Check if Client actually rented with this Driver ---
-        # Use EMAIL for client check
-        cur.execute(
-            "SELECT 1 FROM RENT WHERE EMAIL = %s AND NAME = %s LIMIT 1",
-            (client_email, driver_name)
-        )
-        if not cur.fetchone():
-            return jsonify({"error": "Forbidden: You cannot review a driver you have not rented with."}), 403
-
-        # --- Step 3: Generate REVIEWID (Schema uses INT, assuming SERIAL/auto-increment) and Insert Review ---
-        # Use EMAIL for client FK, MESSAGE for comment text
-        insert_review_query = """
-            INSERT INTO REVIEW (EMAIL, NAME, RATING, MESSAGE) -- Assuming REVIEWID auto-gen
-            VALUES (%s, %s, %s, %s) RETURNING REVIEWID
-        """
-        cur.execute(insert_review_query, (client_email, driver_name, rating_int, comment))
-        review_id = cur.fetchone()[0] # Get generated REVIEWID
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
 
-        # --- Commit Transaction ---
-        conn.commit()
-
-        return jsonify({"message": "Review submitted successfully!"}), 201
+        cur = conn.cursor()
+        try:
+            # --- Step 1: Check if Driver Exists ---
+            cur.execute("SELECT 1 FROM DRIVER WHERE NAME = %s", (driver_name,))
+            if not cur.fetchone():
+                return jsonify({"error": f"Driver '{driver_name}' not found."}), 404
 
-    except Exception as e:
-        conn.rollback()
-        # Use client_email in log message
-        print(f"Error submitting review by client {client_email} for driver {driver_name}: {e}")
-        return jsonify({"error": f"Failed to submit review due to an internal error: {e}"}), 500
-    finally:
-        cur.close()
-        conn.close()
+            # --- Step 2: Check if Client actually rented with this Driver ---
+            # Use EMAIL for client check
+            cur.execute(
+                "SELECT 1 FROM RENT WHERE EMAIL = %s AND NAME = %s LIMIT 1",
+                (client_email, driver_name)
+            )
+            if not cur.fetchone():
+                return jsonify({"error": "Forbidden: You cannot review a driver you have not rented with."}), 403
+
+            # --- Step 3: Generate REVIEWID (Schema uses INT, assuming SERIAL/auto-increment) and Insert Review ---
+            # Use EMAIL for client FK, MESSAGE for comment text
+            insert_review_query = """
+                INSERT INTO REVIEW (EMAIL, NAME, RATING, MESSAGE) -- REVIEWID is an identity column (migration 0005)
+                VALUES (%s, %s, %s, %s) RETURNING REVIEWID
+            """
+            cur.execute(insert_review_query, (client_email, driver_name, rating_int, comment))
+            review_id = cur.fetchone()[0] # Get generated REVIEWID
+
+            # --- Commit Transaction ---
+            conn.commit()
+
+            return jsonify({"message": "Review submitted successfully!"}), 201
+
+        except Exception as e:
+            conn.rollback()
+            # Use client_email in log message
+            print(f"Error submitting review by client {client_email} for driver {driver_name}: {e}")
+            return jsonify({"error": f"Failed to submit review due to an internal error: {e}"}), 500
+        finally:
+            cur.close()
 
 @app.route('/api/clients/rents/best-driver', methods=['POST'])
 @jwt_required()
@@ -1393,76 +2571,37 @@ def book_rent_with_best_driver():
     except ValueError:
         return jsonify({"error": "Invalid date format. Please use YYYY-MM-DD."}), 400
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
-
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    try:
-        # --- Start Transaction ---
-        # --- Step 1: Verify Model Exists and Get CARID ---
-        cur.execute("SELECT CARID FROM MODEL WHERE MODELID = %s", (model_id,))
-        model_info = cur.fetchone()
-        if not model_info:
-            return jsonify({"error": "Invalid model specified"}), 404
-        car_id = model_info['carid']
-
-        # --- Step 2: Verify Model is NOT already Rented on this Date ---
-        cur.execute("SELECT 1 FROM RENT WHERE MODELID = %s AND DATE = %s", (model_id, rent_date))
-        if cur.fetchone():
-            return jsonify({"error": "This car model is already booked for the selected date"}), 409
-
-        # --- Step 3: Find the Available Driver with the HIGHEST Average Rating ---
-        find_best_driver_query = """
-            SELECT
-                dr.NAME,
-                COALESCE(AVG(rev.RATING), 0.0) AS avg_rating
-            FROM DRIVER dr
-            JOIN DRIVES d ON dr.NAME = d.NAME
-            LEFT JOIN REVIEW rev ON dr.NAME = rev.NAME
-            WHERE
-                d.MODELID = %s
-                AND d.CARID = %s
-                AND dr.NAME NOT IN (
-                    SELECT NAME FROM RENT WHERE DATE = %s
-                )
-            GROUP BY dr.NAME
-            ORDER BY avg_rating DESC, dr.NAME
-            LIMIT 1;
-        """
-        cur.execute(find_best_driver_query, (model_id, car_id, rent_date))
-        best_driver = cur.fetchone()
-
-        if not best_driver:
-            return jsonify({"error": "No available driver found for this model on the selected date"}), 409
-
-        driver_name = best_driver['name']
-        driver_rating = best_driver['avg_rating']
-
-        # --- Step 4: Generate unique RENTID (Assuming SERIAL/auto-increment) ---
-
-        # --- Step 5: Insert the Rent Record (using EMAIL for client FK) ---
-        insert_rent_query = """
-            INSERT INTO RENT (DATE, NAME, EMAIL, CARID, MODELID) -- Assuming RENTID auto-gen
-            VALUES (%s, %s, %s, %s, %s) RETURNING RENTID
-        """
-        cur.execute(insert_rent_query, (rent_date, driver_name, client_email, car_id, model_id))
-        rent_id = cur.fetchone()['rentid'] # Get generated RENTID
-
-        conn.commit()
-
-        return jsonify({ 
-            "message": f"Rent booked successfully with best driver ({driver_name}, Rating: {driver_rating:.2f})! Rent ID: {rent_id}"
-        }), 201
-
-    except Exception as e:
-        conn.rollback()
-        # Use client_email in log message
-        print(f"Error during booking with best driver by client {client_email}: {e}")
-        return jsonify({"error": f"Failed to book rent with best driver due to an internal error: {e}"}), 500
-    finally:
-        cur.close()
-        conn.close()
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
+
+        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        try:
+            # --- Same single call, picking the free driver with the HIGHEST Average Rating ---
+            result = call_book_rent(cur, model_id, rent_date, client_email, best_driver=True)
+            if result['status'] != 'booked':
+                conn.rollback()
+                message, status = BOOKING_FAILURES[result['status']]
+                return jsonify({"error": message}), status
+
+            rent_id = result['rent_id']
+            driver_name = result['driver_name']
+            driver_rating = result['driver_rating']
+
+            conn.commit()
+            availability_index.record_rent(rent_date, model_id, driver_name)
+
+            return jsonify({ 
+                "message": f"Rent booked successfully with best driver ({driver_name}, Rating: {driver_rating:.2f})! Rent ID: {rent_id}"
+            }), 201
+
+        except Exception as e:
+            conn.rollback()
+            # Use client_email in log message
+            print(f"Error during booking with best driver by client {client_email}: {e}")
+            return jsonify({"error": f"Failed to book rent with best driver due to an internal error: {e}"}), 500
+        finally:
+            cur.close()
 
 # ================= DEBUG ENDPOINT =================
 @app.route('/api/debug/availability-details', methods=['GET'])
@@ -1480,40 +2619,47 @@ def debug_availability_details():
     except ValueError:
         return jsonify({"error": "Invalid date format. Please use YYYY-MM-DD."}), 400
 
-    conn = get_db_connection()
-    if not conn:
-        return jsonify({"error": "Database connection failed"}), 500
+    with db_connection() as conn:
+        if not conn:
+            return jsonify({"error": "Database connection failed"}), 500
 
-    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-    debug_info = []
-    try:
-        # Query to get comprehensive details
-        query = """
-            SELECT
-                c.CARID, c.MAKE, c.MODEL AS CAR_MODEL, c.YEAR,
-                m.MODELID, m.COLOR,
-                d.NAME AS DRIVER_NAME,
-                r_model.DATE AS MODEL_RENT_DATE, -- Check if this specific MODELID is rented
-                r_driver.DATE AS DRIVER_RENT_DATE -- Check if this DRIVER is rented (for any car)
-            FROM CAR c
-            LEFT JOIN MODEL m ON c.CARID = m.CARID
-            LEFT JOIN DRIVES d ON m.MODELID = d.MODELID AND m.CARID = d.CARID
-            LEFT JOIN RENT r_model ON m.MODELID = r_model.MODELID AND r_model.DATE = %s
-            LEFT JOIN RENT r_driver ON d.NAME = r_driver.NAME AND r_driver.DATE = %s
-            ORDER BY c.MAKE, c.MODEL, c.YEAR, m.MODELID, d.NAME;
-        """
-        cur.execute(query, (target_date, target_date))
-        results = cur.fetchall()
-        debug_info = [dict(row) for row in results]
-
-        return jsonify({"debug_availability_details": debug_info}), 200
-
-    except Exception as e:
-        print(f"Error fetching debug availability details for date {target_date_str}: {e}")
-        return jsonify({"error": f"Failed to fetch debug details: {e}"}), 500
-    finally:
-        cur.close()
-        conn.close()
+        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        debug_info = []
+        try:
+            # Query to get comprehensive details
+            query = """
+                SELECT
+                    c.CARID, c.MAKE, c.MODEL AS CAR_MODEL, c.YEAR,
+                    m.MODELID, m.COLOR,
+                    d.NAME AS DRIVER_NAME,
+                    r_model.DATE AS MODEL_RENT_DATE, -- Check if this specific MODELID is rented
+                    r_driver.DATE AS DRIVER_RENT_DATE -- Check if this DRIVER is rented (for any car)
+                FROM CAR c
+                LEFT JOIN MODEL m ON c.CARID = m.CARID
+                LEFT JOIN DRIVES d ON m.MODELID = d.MODELID AND m.CARID = d.CARID
+                LEFT JOIN RENT r_model ON m.MODELID = r_model.MODELID AND r_model.DATE = %s
+                LEFT JOIN RENT r_driver ON d.NAME = r_driver.NAME AND r_driver.DATE = %s
+                ORDER BY c.MAKE, c.MODEL, c.YEAR, m.MODELID, d.NAME;
+            """
+            cur.execute(query, (target_date, target_date))
+            results = cur.fetchall()
+            debug_info = [dict(row) for row in results]
+
+            return jsonify({"debug_availability_details": debug_info}), 200
+
+        except Exception as e:
+            print(f"Error fetching debug availability details for date {target_date_str}: {e}")
+            return jsonify({"error": f"Failed to fetch debug details: {e}"}), 500
+        finally:
+            cur.close()
+
+@app.route('/api/debug/pool-stats', methods=['GET'])
+def debug_pool_stats():
+    """
+    DEBUGGING Endpoint: Returns the database connection pool counters
+    (checkouts, waits, timeouts, broken-connection evictions, current size).
+    """
+    return jsonify({"pool_stats": db_pool.stats()}), 200
 # ================= END DEBUG ENDPOINT =================
 
 if __name__ == '__main__':
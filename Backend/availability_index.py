@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class AvailabilityIndex:
+    """
+    In-process index answering "which (model, driver) pairs are free on a date"
+    without querying the database.
+
+    It holds a static map of every model to the drivers who declared it drivable
+    (DRIVES joined with MODEL and CAR) plus, per date, the sets of rented
+    MODELIDs and busy driver NAMEs. Dates from today onward are loaded on
+    rebuild; older dates are loaded on lookup and the max_past_dates most
+    recently used ones are kept. Booking and DRIVES
+    write paths update the index incrementally after they commit.
+
+    The index only sees writes made by this process, so with several worker
+    processes set max_age to bound how stale it can get (0 disables expiry).
+    """
+
+    def __init__(self, connection_factory, max_age=60.0, max_past_dates=64):
+        self._connection_factory = connection_factory
+        self.max_age = max_age
+        self.max_past_dates = max_past_dates
+        self._lock = threading.RLock()
+        self._built_at = None
+        self._models = {}          # (modelid, carid) -> car details
+        self._eligible = {}        # (modelid, carid) -> set of driver names
+        self._busy_models = {}     # date -> set of rented MODELIDs
+        self._busy_drivers = {}    # date -> set of busy driver NAMEs
+        self._past_dates = OrderedDict()  # loaded dates before _loaded_from, least recently used first
+
+    # --- Loading ---
+
+    def rebuild(self):
+        """Reload the whole index from the database."""
+        with self._lock:
+            with self._connection_factory() as conn:
+                cur = conn.cursor()
+                try:
+                    cur.execute("""
+                        SELECT m.MODELID, m.CARID, c.MAKE, c.MODEL, c.YEAR, d.NAME
+                        FROM MODEL m
+                        JOIN CAR c ON m.CARID = c.CARID
+                        LEFT JOIN DRIVES d ON d.MODELID = m.MODELID AND d.CARID = m.CARID
+                    """)
+                    models, eligible = {}, {}
+                    for model_id, car_id, make, model_name, year, driver in cur:
+                        key = (model_id, car_id)
+                        models[key] = {"id": car_id, "make": make, "model_name": model_name, "year": year}
+                        drivers = eligible.setdefault(key, set())
+                        if driver is not None:
+                            drivers.add(driver)
+
+                    cur.execute("SELECT DATE, MODELID, NAME FROM RENT WHERE DATE >= CURRENT_DATE")
+                    busy_models, busy_drivers = {}, {}
+                    for rent_date, model_id, driver in cur:
+                        busy_models.setdefault(rent_date, set()).add(model_id)
+                        busy_drivers.setdefault(rent_date, set()).add(driver)
+                    # Dates from today on are fully known, even the ones with no rents yet
+                    cur.execute("SELECT CURRENT_DATE")
+                    self._loaded_from = cur.fetchone()[0]
+                    conn.commit()
+                finally:
+                    cur.close()
+
+            self._models, self._eligible = models, eligible
+            self._busy_models, self._busy_drivers = busy_models, busy_drivers
+            self._past_dates = OrderedDict()
+            self._built_at = time.monotonic()
+
+    def _ensure_loaded(self, target_date):
+        if self._built_at is None or (self.max_age and time.monotonic() - self._built_at > self.max_age):
+            self.rebuild()
+        if target_date >= self._loaded_from:
+            return
+        if target_date in self._past_dates:
+            self._past_dates.move_to_end(target_date)
+            return
+        with self._connection_factory() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT MODELID, NAME FROM RENT WHERE DATE = %s", (target_date,))
+                rows = cur.fetchall()
+                conn.commit()
+            finally:
+                cur.close()
+        self._busy_models[target_date] = {row[0] for row in rows}
+        self._busy_drivers[target_date] = {row[1] for row in rows}
+        self._past_dates[target_date] = None
+        while len(self._past_dates) > self.max_past_dates:
+            evicted, _ = self._past_dates.popitem(last=False)
+            self._busy_models.pop(evicted, None)
+            self._busy_drivers.pop(evicted, None)
+
+    # --- Queries ---
+
+    def available(self, target_date):
+        """Return one row per free (model, driver) pair, shaped like the /api/cars/available response."""
+        with self._lock:
+            self._ensure_loaded(target_date)
+            busy_models = self._busy_models.get(target_date, ())
+            busy_drivers = self._busy_drivers.get(target_date, ())
+            result = []
+            for key, drivers in self._eligible.items():
+                model_id = key[0]
+                if model_id in busy_models:
+                    continue
+                car = self._models[key]
+                for driver in drivers:
+                    if driver not in busy_drivers:
+                        result.append({**car, "modelid": model_id, "driver_name": driver})
+        result.sort(key=lambda row: (row["make"] or "", row["model_name"] or "", row["year"] or 0, row["modelid"], row["driver_name"]))
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "built": self._built_at is not None,
+                "age_seconds": None if self._built_at is None else round(time.monotonic() - self._built_at, 1),
+                "models": len(self._models),
+                "drives": sum(len(drivers) for drivers in self._eligible.values()),
+                "dates_loaded": len(self._busy_models),
+            }
+
+    # --- Incremental maintenance (call after the write has committed) ---
+
+    def record_rent(self, rent_date, model_id, driver_name):
+        with self._lock:
+            if self._built_at is None:
+                return
+            if rent_date < self._loaded_from and rent_date not in self._past_dates:
+                return  # will be loaded from the database on first lookup
+            self._busy_models.setdefault(rent_date, set()).add(model_id)
+            self._busy_drivers.setdefault(rent_date, set()).add(driver_name)
+
+    def add_drives(self, driver_name, model_id, car_id, make, model_name, year):
+        with self._lock:
+            if self._built_at is None:
+                return
+            key = (model_id, car_id)
+            self._models.setdefault(key, {"id": car_id, "make": make, "model_name": model_name, "year": year})
+            self._eligible.setdefault(key, set()).add(driver_name)
+
+    def remove_drives(self, driver_name, car_id):
+        with self._lock:
+            for key, drivers in self._eligible.items():
+                if key[1] == car_id:
+                    drivers.discard(driver_name)
+
+    def remove_car(self, car_id):
+        with self._lock:
+            for key in [key for key in self._models if key[1] == car_id]:
+                del self._models[key]
+                self._eligible.pop(key, None)
+
+    def invalidate(self):
+        """Drop everything; the next lookup rebuilds from the database."""
+        with self._lock:
+            self._built_at = None
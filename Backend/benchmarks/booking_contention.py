@@ -0,0 +1,153 @@
+"""
+Booking contention benchmark.
+
+N clients race to book the same model on the same date through the real
+booking routes (Flask test client, one thread per client) against the
+database configured in .env. Each round should yield exactly one 201 and
+N-1 409s, never a 500 or a double booking, and throughput should not
+collapse as N grows.
+
+Requires migrations/0001_rent_booking_constraints.sql to be applied.
+Fixture rows are created with a unique prefix and removed afterwards.
+
+    cd Backend
+    python benchmarks/booking_contention.py --clients 100 --rounds 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Race N clients for the same model and date")
+    parser.add_argument("--clients", type=int, default=100, help="concurrent clients per round")
+    parser.add_argument("--rounds", type=int, default=5, help="rounds, each on a new date")
+    parser.add_argument("--drivers", type=int, default=5, help="drivers able to drive the contended model")
+    parser.add_argument("--endpoint", choices=["rents", "best-driver"], default="rents")
+    return parser.parse_args()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    args = parse_args()
+    # Every racing thread needs its own connection
+    os.environ.setdefault("DB_POOL_MAX", str(args.clients + 5))
+
+    import app as backend
+    from flask_jwt_extended import create_access_token
+
+    prefix = "bench" + uuid.uuid4().hex[:5]
+    car_id = prefix.upper()[:10]
+    model_id = prefix + "-model"
+    drivers = [f"{prefix}-driver-{i}" for i in range(args.drivers)]
+    clients = [f"{prefix}-client-{i}@example.com" for i in range(args.clients)]
+
+    with backend.db_pool.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("INSERT INTO ADDRESS (ROADNAME, NUMBER, CITY, ZIPCODE) VALUES (%s, '1', 'Chicago', '60601')", (prefix,))
+        cur.execute("INSERT INTO CAR (CARID, MAKE, MODEL, YEAR) VALUES (%s, 'Bench', %s, 2024)", (car_id, prefix))
+        cur.execute("INSERT INTO MODEL (MODELID, CARID) VALUES (%s, %s)", (model_id, car_id))
+        for name in drivers:
+            cur.execute("INSERT INTO DRIVER (NAME, ROADNAME, NUMBER, CITY) VALUES (%s, %s, '1', 'Chicago')", (name, prefix))
+            cur.execute("INSERT INTO DRIVES (NAME, MODELID, CARID) VALUES (%s, %s, %s)", (name, model_id, car_id))
+        for email in clients:
+            cur.execute("INSERT INTO CLIENT (EMAIL, NAME) VALUES (%s, %s)", (email, email))
+        conn.commit()
+        cur.close()
+
+    with backend.app.app_context():
+        tokens = [create_access_token(identity=email) for email in clients]
+
+    url = "/api/clients/rents" if args.endpoint == "rents" else "/api/clients/rents/best-driver"
+    start_date = date.today() + timedelta(days=365)
+    statuses = Counter()
+    latencies = []
+    round_times = []
+    lock = threading.Lock()
+
+    try:
+        for round_no in range(args.rounds):
+            rent_date = (start_date + timedelta(days=round_no)).isoformat()
+            barrier = threading.Barrier(args.clients)
+
+            def book(token):
+                client = backend.app.test_client()
+                barrier.wait()
+                began = time.perf_counter()
+                response = client.post(url, json={"modelid": model_id, "date": rent_date},
+                                       headers={"Authorization": f"Bearer {token}"})
+                elapsed = time.perf_counter() - began
+                with lock:
+                    statuses[response.status_code] += 1
+                    latencies.append(elapsed)
+
+            threads = [threading.Thread(target=book, args=(token,)) for token in tokens]
+            began = time.perf_counter()
+            with redirect_stdout(StringIO()):  # the routes print on every request
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            round_times.append(time.perf_counter() - began)
+
+        # --- Verify: no model or driver booked twice on the same date ---
+        with backend.db_pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT COUNT(*) FROM (
+                    SELECT MODELID, DATE FROM RENT WHERE CARID = %s GROUP BY MODELID, DATE HAVING COUNT(*) > 1
+                ) dup
+            """, (car_id,))
+            model_doubles = cur.fetchone()[0]
+            cur.execute("""
+                SELECT COUNT(*) FROM (
+                    SELECT NAME, DATE FROM RENT WHERE NAME = ANY(%s) GROUP BY NAME, DATE HAVING COUNT(*) > 1
+                ) dup
+            """, (drivers,))
+            driver_doubles = cur.fetchone()[0]
+            cur.execute("SELECT COUNT(*) FROM RENT WHERE CARID = %s", (car_id,))
+            booked = cur.fetchone()[0]
+            cur.close()
+    finally:
+        with backend.db_pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM RENT WHERE CARID = %s", (car_id,))
+            cur.execute("DELETE FROM DRIVES WHERE CARID = %s", (car_id,))
+            cur.execute("DELETE FROM MODEL WHERE CARID = %s", (car_id,))
+            cur.execute("DELETE FROM CAR WHERE CARID = %s", (car_id,))
+            cur.execute("DELETE FROM DRIVER WHERE NAME = ANY(%s)", (drivers,))
+            cur.execute("DELETE FROM CLIENT WHERE EMAIL = ANY(%s)", (clients,))
+            cur.execute("DELETE FROM ADDRESS WHERE ROADNAME = %s", (prefix,))
+            conn.commit()
+            cur.close()
+
+    total = args.clients * args.rounds
+    print(f"endpoint: {url}   clients/round: {args.clients}   rounds: {args.rounds}   drivers: {args.drivers}")
+    print(f"status codes: {dict(sorted(statuses.items()))}")
+    print(f"requests/s:   {total / sum(round_times):.1f}")
+    print(f"latency ms:   p50={percentile(latencies, 50) * 1000:.1f}  p95={percentile(latencies, 95) * 1000:.1f}  "
+          f"p99={percentile(latencies, 99) * 1000:.1f}  mean={statistics.mean(latencies) * 1000:.1f}")
+    print(f"round wall s: {', '.join(f'{t:.2f}' for t in round_times)}")
+    print(f"rents booked: {booked} (expected {args.rounds})   double bookings: model={model_doubles} driver={driver_doubles}")
+
+    ok = booked == args.rounds and model_doubles == 0 and driver_doubles == 0 and statuses.get(500, 0) == 0
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
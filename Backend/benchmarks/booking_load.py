@@ -0,0 +1,307 @@
+"""
+Booking load harness.
+
+Simulates client sessions against the real routes (Flask test client, one
+thread per concurrent session) and the database configured in .env. Each
+session logs in, checks availability for a date, books one of the free
+models (plain or best-driver), lists its rents and sometimes reviews a
+driver it rented with.
+
+Dates are drawn from a window of --days future dates with a Zipf(--skew)
+distribution, so a few hot dates take most of the traffic (--skew 0 is
+uniform). With --rate, sessions arrive as a Poisson process at that many
+per second (open loop; "start lag" shows how far arrivals fall behind when
+the workers saturate); without it every worker starts its next session as
+soon as the previous one ends (closed loop).
+
+Reports throughput, status codes per step (409 conflicts vs 5xx errors)
+and latency percentiles, then checks that no model or driver was booked
+twice on the same date and that every 201 left exactly one rent.
+
+Fixture rows are created with a unique prefix and removed afterwards.
+
+    cd Backend
+    python benchmarks/booking_load.py --concurrency 32 --sessions 3000 --skew 1.2
+    python benchmarks/booking_load.py --concurrency 64 --rate 200 --duration 30
+"""
+import argparse
+import os
+import queue
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STEPS = ("login", "availability", "book", "book best-driver", "list rents", "review")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Drive concurrent client booking sessions")
+    parser.add_argument("--concurrency", type=int, default=32, help="sessions running at the same time")
+    parser.add_argument("--sessions", type=int, default=2000, help="sessions to run (ignored with --duration)")
+    parser.add_argument("--duration", type=float, help="run for this many seconds instead of --sessions")
+    parser.add_argument("--rate", type=float, default=0, help="session arrivals per second (0 = closed loop)")
+    parser.add_argument("--models", type=int, default=20, help="bookable models")
+    parser.add_argument("--drivers", type=int, default=15, help="drivers")
+    parser.add_argument("--drives-per-driver", type=int, default=5, help="models each driver can drive")
+    parser.add_argument("--clients", type=int, default=500, help="distinct client accounts")
+    parser.add_argument("--days", type=int, default=60, help="dates clients book on")
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of date popularity (0 = uniform)")
+    parser.add_argument("--best-driver-share", type=float, default=0.3, help="share of bookings via best-driver")
+    parser.add_argument("--review-rate", type=float, default=0.2, help="share of sessions that review a driver")
+    parser.add_argument("--seed", type=int, default=1, help="seed for fixture data and session choices")
+    return parser.parse_args()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Recorder:
+    """Latencies and status codes per step, shared by all session threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.start_lags = []
+        self.sold_out = 0
+
+    def call(self, client, step, method, url, **kwargs):
+        began = time.perf_counter()
+        response = client.open(url, method=method, **kwargs)
+        elapsed = time.perf_counter() - began
+        with self.lock:
+            self.latencies[step].append(elapsed)
+            self.statuses[step][response.status_code] += 1
+        return response
+
+
+def run_session(backend, recorder, rng, fixture, date_weights):
+    client = backend.app.test_client()
+    email = rng.choice(fixture["clients"])
+    response = recorder.call(client, "login", "POST", "/api/clients/login", json={"email": email})
+    if response.status_code != 200:
+        return
+    auth = {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+
+    rent_date = rng.choices(fixture["dates"], cum_weights=date_weights)[0].isoformat()
+    response = recorder.call(client, "availability", "GET", f"/api/cars/available?date={rent_date}")
+    if response.status_code == 200:
+        free = sorted({row["modelid"] for row in response.get_json()["available_models"]
+                       if row["modelid"] in fixture["model_set"]})
+        if free:
+            if rng.random() < fixture["best_driver_share"]:
+                step, url = "book best-driver", "/api/clients/rents/best-driver"
+            else:
+                step, url = "book", "/api/clients/rents"
+            recorder.call(client, step, "POST", url, json={"modelid": rng.choice(free), "date": rent_date}, headers=auth)
+        else:
+            with recorder.lock:
+                recorder.sold_out += 1
+
+    response = recorder.call(client, "list rents", "GET", "/api/clients/rents", headers=auth)
+    rents = response.get_json().get("rents", []) if response.status_code == 200 else []
+    if rents and rng.random() < fixture["review_rate"]:
+        recorder.call(client, "review", "POST", "/api/clients/reviews", headers=auth,
+                      json={"driverName": rng.choice(rents)["driver"], "rating": rng.randint(1, 5), "comment": "load test"})
+
+
+def create_fixture(backend, args, prefix):
+    rng = random.Random(args.seed)
+    car_ids = [f"{prefix.upper()}{i:03d}" for i in range(args.models)]
+    model_ids = [f"{prefix}-model-{i}" for i in range(args.models)]
+    drivers = [f"{prefix}-driver-{i}" for i in range(args.drivers)]
+    clients = [f"{prefix}-client-{i}@example.com" for i in range(args.clients)]
+
+    with backend.db_pool.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("INSERT INTO ADDRESS (ROADNAME, NUMBER, CITY, ZIPCODE) VALUES (%s, '1', 'Chicago', '60601')", (prefix,))
+        for car_id, model_id in zip(car_ids, model_ids):
+            cur.execute("INSERT INTO CAR (CARID, MAKE, MODEL, YEAR) VALUES (%s, 'Load', %s, 2024)", (car_id, model_id))
+            cur.execute("INSERT INTO MODEL (MODELID, CARID) VALUES (%s, %s)", (model_id, car_id))
+        for name in drivers:
+            cur.execute("INSERT INTO DRIVER (NAME, ROADNAME, NUMBER, CITY) VALUES (%s, %s, '1', 'Chicago')", (name, prefix))
+            for i in rng.sample(range(args.models), min(args.drives_per_driver, args.models)):
+                cur.execute("INSERT INTO DRIVES (NAME, MODELID, CARID) VALUES (%s, %s, %s)", (name, model_ids[i], car_ids[i]))
+        for email in clients:
+            cur.execute("INSERT INTO CLIENT (EMAIL, NAME) VALUES (%s, %s)", (email, email))
+        conn.commit()
+        cur.close()
+    # The new DRIVES rows are not in the availability index yet
+    backend.availability_index.invalidate()
+
+    first = date.today() + timedelta(days=730)
+    return {
+        "car_ids": car_ids,
+        "model_set": set(model_ids),
+        "drivers": drivers,
+        "clients": clients,
+        "dates": [first + timedelta(days=i) for i in range(args.days)],
+        "best_driver_share": args.best_driver_share,
+        "review_rate": args.review_rate,
+    }
+
+
+def remove_fixture(backend, fixture, prefix):
+    with backend.db_pool.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM REVIEW WHERE EMAIL = ANY(%s)", (fixture["clients"],))
+        cur.execute("DELETE FROM RENT WHERE CARID = ANY(%s)", (fixture["car_ids"],))
+        cur.execute("DELETE FROM DRIVES WHERE CARID = ANY(%s)", (fixture["car_ids"],))
+        cur.execute("DELETE FROM MODEL WHERE CARID = ANY(%s)", (fixture["car_ids"],))
+        cur.execute("DELETE FROM CAR WHERE CARID = ANY(%s)", (fixture["car_ids"],))
+        cur.execute("DELETE FROM DRIVER WHERE NAME = ANY(%s)", (fixture["drivers"],))
+        cur.execute("DELETE FROM CLIENT WHERE EMAIL = ANY(%s)", (fixture["clients"],))
+        cur.execute("DELETE FROM ADDRESS WHERE ROADNAME = %s", (prefix,))
+        conn.commit()
+        cur.close()
+    backend.availability_index.invalidate()
+
+
+def verify(backend, fixture):
+    """Double bookings per model/date and driver/date, and the number of fixture rents."""
+    with backend.db_pool.connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT COUNT(*) FROM (
+                SELECT MODELID, CARID, DATE FROM RENT WHERE CARID = ANY(%s) GROUP BY MODELID, CARID, DATE HAVING COUNT(*) > 1
+            ) dup
+        """, (fixture["car_ids"],))
+        model_doubles = cur.fetchone()[0]
+        cur.execute("""
+            SELECT COUNT(*) FROM (
+                SELECT NAME, DATE FROM RENT WHERE NAME = ANY(%s) GROUP BY NAME, DATE HAVING COUNT(*) > 1
+            ) dup
+        """, (fixture["drivers"],))
+        driver_doubles = cur.fetchone()[0]
+        cur.execute("SELECT COUNT(*) FROM RENT WHERE CARID = ANY(%s)", (fixture["car_ids"],))
+        rents = cur.fetchone()[0]
+        cur.close()
+    return model_doubles, driver_doubles, rents
+
+
+def main():
+    args = parse_args()
+    # One connection per concurrent session, plus headroom for setup and verification
+    os.environ.setdefault("DB_POOL_MAX", str(args.concurrency + 5))
+
+    import app as backend
+
+    prefix = "ld" + uuid.uuid4().hex[:5]
+    fixture = create_fixture(backend, args, prefix)
+    weights = [1 / (rank + 1) ** args.skew for rank in range(args.days)]
+    random.Random(args.seed).shuffle(weights)  # hot dates anywhere in the window, not just the first days
+    date_weights = [sum(weights[:i + 1]) for i in range(args.days)]
+
+    recorder = Recorder()
+    arrivals = queue.Queue()
+    stop = threading.Event()
+    deadline = None if args.duration is None else time.perf_counter() + args.duration
+    session_budget = None if args.duration is not None else args.sessions
+
+    def arrive():
+        # Open loop: scheduled start times, independent of how fast sessions complete
+        rng = random.Random(args.seed)
+        due = time.perf_counter()
+        count = 0
+        while not stop.is_set() and (session_budget is None or count < session_budget):
+            due += rng.expovariate(args.rate)
+            if deadline is not None and due > deadline:
+                break
+            time.sleep(max(0.0, due - time.perf_counter()))
+            arrivals.put(due)
+            count += 1
+        for _ in range(args.concurrency):
+            arrivals.put(None)
+
+    claimed = [0]
+    claim_lock = threading.Lock()
+
+    def next_start():
+        if args.rate:
+            return arrivals.get()
+        with claim_lock:
+            if (session_budget is not None and claimed[0] >= session_budget) or \
+                    (deadline is not None and time.perf_counter() >= deadline):
+                return None
+            claimed[0] += 1
+        return time.perf_counter()
+
+    def worker(worker_no):
+        rng = random.Random(args.seed * 1000 + worker_no)
+        while True:
+            scheduled = next_start()
+            if scheduled is None:
+                return
+            with recorder.lock:
+                recorder.start_lags.append(time.perf_counter() - scheduled)
+            try:
+                run_session(backend, recorder, rng, fixture, date_weights)
+            except Exception as e:
+                with recorder.lock:
+                    recorder.statuses["session"][type(e).__name__] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.concurrency)]
+    if args.rate:
+        threads.append(threading.Thread(target=arrive))
+    began = time.perf_counter()
+    try:
+        with redirect_stdout(StringIO()):  # the routes print on every request
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - began
+        model_doubles, driver_doubles, rents = verify(backend, fixture)
+    finally:
+        stop.set()
+        remove_fixture(backend, fixture, prefix)
+
+    # --- Report ---
+    sessions = len(recorder.start_lags)
+    requests = sum(sum(counts.values()) for counts in recorder.statuses.values())
+    booked = sum(recorder.statuses[step][201] for step in ("book", "book best-driver"))
+    attempts = sum(sum(recorder.statuses[step].values()) for step in ("book", "book best-driver"))
+    conflicts = sum(recorder.statuses[step][409] for step in ("book", "book best-driver"))
+    server_errors = sum(count for counts in recorder.statuses.values()
+                        for status, count in counts.items() if not isinstance(status, int) or status >= 500)
+
+    mode = f"open loop, {args.rate:g} sessions/s" if args.rate else "closed loop"
+    print(f"concurrency: {args.concurrency}   {mode}   models: {args.models}   drivers: {args.drivers}   "
+          f"dates: {args.days} (skew {args.skew:g})")
+    print(f"sessions: {sessions} in {elapsed:.1f}s   sessions/s: {sessions / elapsed:.1f}   "
+          f"requests/s: {requests / elapsed:.1f}   bookings/s: {booked / elapsed:.1f}")
+    print(f"bookings: {booked} booked, {conflicts} conflicts (409, {conflicts / max(attempts, 1):.1%} of attempts), "
+          f"{recorder.sold_out} sessions found nothing free   5xx/exceptions: {server_errors}")
+    print(f"{'step':<18} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'mean ms':>8}  status")
+    for step in STEPS:
+        latencies = recorder.latencies.get(step)
+        if not latencies:
+            continue
+        print(f"{step:<18} {len(latencies):>8} {percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 95) * 1000:>8.1f} "
+              f"{percentile(latencies, 99) * 1000:>8.1f} {statistics.mean(latencies) * 1000:>8.1f}  "
+              f"{dict(sorted(recorder.statuses[step].items()))}")
+    if recorder.statuses.get("session"):
+        print(f"session exceptions: {dict(recorder.statuses['session'])}")
+    if args.rate and recorder.start_lags:
+        print(f"start lag ms: p50={percentile(recorder.start_lags, 50) * 1000:.1f}  "
+              f"p99={percentile(recorder.start_lags, 99) * 1000:.1f}")
+    print(f"rents stored: {rents} (expected {booked})   double bookings: model={model_doubles} driver={driver_doubles}")
+
+    ok = rents == booked and model_doubles == 0 and driver_doubles == 0 and server_errors == 0
+    print("PASS" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,430 @@
+"""
+Endpoint benchmark suite.
+
+Runs every route of app.py through the Flask test client against the
+database configured in .env, at one or more data scales, and records per
+endpoint: p50/p95/p99/mean latency, rows returned, time spent in the
+database (execute/fetch/copy calls) and status codes.
+
+For each scale in --scales the schema is refilled with
+tools/generate_data.py (so the database must be migrated and disposable);
+--no-generate benchmarks the data already there instead. Write routes run
+against fixture rows created under a unique prefix and removed afterwards.
+
+The report is JSON (--output). With --baseline, p95 latencies are compared
+with a stored report and the run fails if any endpoint got slower than
+--tolerance (and --min-delta-ms, to ignore noise on fast endpoints).
+
+    cd Backend
+    python benchmarks/endpoints.py --scales 10000,1000000 --output bench.json
+    python benchmarks/endpoints.py --no-generate --baseline bench.json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import redirect_stdout
+from datetime import date, datetime, timedelta, timezone
+from io import StringIO
+
+import psycopg2
+import psycopg2.extensions
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark every route at several data scales")
+    parser.add_argument("--scales", default="10000,1000000,10000000", help="comma-separated RENT row counts")
+    parser.add_argument("--no-generate", action="store_true", help="benchmark the current data, do not regenerate")
+    parser.add_argument("--seed", type=int, default=42, help="seed for data generation and request parameters")
+    parser.add_argument("--requests", type=int, default=30, help="measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=3, help="unmeasured requests per endpoint first")
+    parser.add_argument("--only", help="only endpoints whose name contains this text")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="JSON report to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="ignore slowdowns smaller than this")
+    return parser.parse_args()
+
+
+# --- DB time accounting ---
+# Every connection the app opens gets cursors whose execute/fetch/copy calls add
+# their duration to a per-thread counter, read around each request.
+
+_db_time = threading.local()
+_TIMED_METHODS = ("execute", "executemany", "fetchone", "fetchmany", "fetchall", "copy_expert", "copy_from")
+_timed_classes = {}
+
+
+def _timed_method(name):
+    def method(self, *args, **kwargs):
+        began = time.perf_counter()
+        try:
+            return getattr(super(type(self), self), name)(*args, **kwargs)
+        finally:
+            _db_time.seconds = getattr(_db_time, "seconds", 0.0) + time.perf_counter() - began
+    method.__name__ = name
+    return method
+
+
+def _timed_iter(self):
+    # Iteration fetches in C without going through fetchmany; route it through the timed method
+    while True:
+        rows = self.fetchmany(self.itersize)
+        if not rows:
+            return
+        yield from rows
+
+
+def timed_cursor_class(base):
+    if base not in _timed_classes:
+        methods = {name: _timed_method(name) for name in _TIMED_METHODS}
+        methods["__iter__"] = _timed_iter
+        _timed_classes[base] = type("Timed" + base.__name__, (base,), methods)
+    return _timed_classes[base]
+
+
+class TimedConnection(psycopg2.extensions.connection):
+    def cursor(self, *args, **kwargs):
+        base = kwargs.get("cursor_factory") or self.cursor_factory or psycopg2.extensions.cursor
+        kwargs["cursor_factory"] = timed_cursor_class(base)
+        return super().cursor(*args, **kwargs)
+
+
+# --- Helpers ---
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def rows_returned(response):
+    """Length of the first list in a JSON body, or lines of a streamed export."""
+    if response.mimetype in ("text/csv", "application/x-ndjson"):
+        return response.get_data().count(b"\n")
+    body = response.get_json(silent=True)
+    if isinstance(body, dict):
+        for value in body.values():
+            if isinstance(value, list):
+                return len(value)
+            if isinstance(value, dict):
+                for inner in value.values():
+                    if isinstance(inner, list):
+                        return len(inner)
+    return len(body) if isinstance(body, list) else 0
+
+
+class Context:
+    """Sampled request parameters and fixture rows for one scale."""
+
+    def __init__(self, backend, seed):
+        from flask_jwt_extended import create_access_token
+
+        self.rng = random.Random(seed)
+        self.tag = "bx" + uuid.uuid4().hex[:5]
+        self.car_ids = [self.tag.upper() + "A", self.tag.upper() + "B"]
+        self.model_ids = [self.tag + "-m1", self.tag + "-m2"]
+        self.drivers = [f"{self.tag}-driver-{i}" for i in range(3)]
+        self.client = f"{self.tag}-client@example.com"
+        self.future = date.today() + timedelta(days=3650)
+        self.imported_car_ids = []
+
+        with backend.db_pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT setseed(%s)", (seed % 1000 / 1000,))
+            cur.execute("SELECT MODELID, CARID FROM MODEL ORDER BY random() LIMIT 200")
+            self.sample_models = cur.fetchall()
+            cur.execute("SELECT EMAIL FROM CLIENT ORDER BY random() LIMIT 200")
+            self.sample_clients = [r[0] for r in cur.fetchall()]
+            cur.execute("SELECT NAME FROM DRIVER ORDER BY random() LIMIT 200")
+            self.sample_drivers = [r[0] for r in cur.fetchall()]
+            cur.execute("SELECT CITY FROM LIVES GROUP BY CITY ORDER BY COUNT(*) DESC LIMIT 10")
+            self.cities = [r[0] for r in cur.fetchall()] or ["Chicago"]
+            cur.execute("SELECT MIN(DATE), MAX(DATE), COUNT(*) FROM RENT")
+            first, last, self.rents = cur.fetchone()
+            self.first_date, self.last_date = first or date.today(), last or date.today()
+
+            # Fixtures for the write routes
+            cur.execute("INSERT INTO ADDRESS (ROADNAME, NUMBER, CITY, ZIPCODE) VALUES (%s, '1', 'Chicago', '60601')", (self.tag,))
+            cur.execute("INSERT INTO CLIENT (EMAIL, NAME) VALUES (%s, 'Bench Client')", (self.client,))
+            for car_id, model_id in zip(self.car_ids, self.model_ids):
+                cur.execute("INSERT INTO CAR (CARID, MAKE, MODEL, YEAR) VALUES (%s, %s, %s, 2024)", (car_id, self.tag, car_id))
+                cur.execute("INSERT INTO MODEL (MODELID, CARID) VALUES (%s, %s)", (model_id, car_id))
+            for name in self.drivers:
+                cur.execute("INSERT INTO DRIVER (NAME, ROADNAME, NUMBER, CITY) VALUES (%s, %s, '1', 'Chicago')", (name, self.tag))
+                for car_id, model_id in zip(self.car_ids, self.model_ids):
+                    cur.execute("INSERT INTO DRIVES (NAME, MODELID, CARID) VALUES (%s, %s, %s)", (name, model_id, car_id))
+            # One past rent so the review route has something to review
+            cur.execute("INSERT INTO RENT (DATE, NAME, EMAIL, CARID, MODELID) VALUES (%s, %s, %s, %s, %s)",
+                        (self.future - timedelta(days=1), self.drivers[0], self.client, self.car_ids[0], self.model_ids[0]))
+            conn.commit()
+            cur.close()
+
+        with backend.app.app_context():
+            self.manager_token = create_access_token(identity="bench-manager")
+            self.client_token = create_access_token(identity=self.client)
+            self.driver_token = create_access_token(identity=self.drivers[1])
+            self.sample_client_tokens = [create_access_token(identity=email) for email in self.sample_clients[:20]]
+
+    def cleanup(self, backend):
+        like = self.tag + "%"
+        with backend.db_pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM REVIEW WHERE EMAIL LIKE %s OR NAME LIKE %s", (like, like))
+            cur.execute("DELETE FROM RENT WHERE EMAIL LIKE %s OR NAME LIKE %s OR CARID = ANY(%s)", (like, like, self.car_ids))
+            cur.execute("DELETE FROM DRIVES WHERE NAME LIKE %s OR CARID IN (SELECT CARID FROM CAR WHERE MAKE = %s)", (like, self.tag))
+            cur.execute("DELETE FROM MODEL WHERE CARID IN (SELECT CARID FROM CAR WHERE MAKE = %s)", (self.tag,))
+            cur.execute("DELETE FROM CAR WHERE MAKE = %s", (self.tag,))
+            cur.execute("DELETE FROM DRIVER WHERE NAME LIKE %s", (like,))
+            cur.execute("DELETE FROM CREDITCARD WHERE EMAIL LIKE %s", (like,))
+            cur.execute("DELETE FROM LIVES WHERE EMAIL LIKE %s", (like,))
+            cur.execute("DELETE FROM CLIENT WHERE EMAIL LIKE %s", (like,))
+            cur.execute("DELETE FROM MANAGER WHERE EMAIL LIKE %s", (like,))
+            cur.execute("DELETE FROM ADDRESS WHERE ROADNAME LIKE %s", (like,))
+            conn.commit()
+            cur.close()
+        backend.availability_index.invalidate()
+
+    # Request parameters
+    def manager(self):
+        return {"Authorization": f"Bearer {self.manager_token}"}
+
+    def client_auth(self):
+        return {"Authorization": f"Bearer {self.client_token}"}
+
+    def driver_auth(self):
+        return {"Authorization": f"Bearer {self.driver_token}"}
+
+    def sample_client_auth(self):
+        return {"Authorization": f"Bearer {self.rng.choice(self.sample_client_tokens)}"} if self.sample_client_tokens else self.client_auth()
+
+    def some_date(self):
+        span = max(0, (self.last_date - self.first_date).days)
+        return (self.first_date + timedelta(days=self.rng.randint(0, span))).isoformat()
+
+    def some_window(self, days):
+        start = date.fromisoformat(self.some_date())
+        return start.isoformat(), (start + timedelta(days=days - 1)).isoformat()
+
+    def some_car_ids(self, n):
+        return [car_id for _, car_id in self.rng.sample(self.sample_models, min(n, len(self.sample_models)))]
+
+    def import_rows(self, i, n):
+        return [{"make": self.tag, "model": f"imp{i}-{j}", "year": 2020, "color": "Red", "auto": True} for j in range(n)]
+
+    def registration(self, email, n=1):
+        return {"name": "Bench", "email": email,
+                "addresses": [{"street": self.tag, "number": str(k), "city": "Chicago", "zip": "60601"} for k in range(n)],
+                "creditCards": [{"number": uuid.uuid4().hex[:20], "expiry": "12/30", "cvv": "123", "billingAddress": "0"}
+                                for k in range(n)]}
+
+
+def record_imported(ctx, response):
+    ctx.imported_car_ids.append([car["carId"] for car in (response.get_json(silent=True) or {}).get("cars", [])])
+
+
+# (name, method, url rule, request builder(ctx, i) -> (url, kwargs), optional response hook)
+# Order matters: write routes that remove rows run after the routes that create them.
+ENDPOINTS = [
+    ("home", "GET", "/", lambda c, i: ("/", {})),
+    ("manager register", "POST", "/api/managers/register", lambda c, i: ("/api/managers/register", {"json": {
+        "name": "Bench", "ssn": f"{c.tag[2:]}{i:04d}", "email": f"{c.tag}-m{i}@example.com", "pincode": "1234"}})),
+    ("manager login", "POST", "/api/managers/login", lambda c, i: ("/api/managers/login", {"json": {"ssn": f"{c.tag[2:]}{i:04d}"}})),
+    ("car add", "POST", "/api/managers/cars", lambda c, i: ("/api/managers/cars", {
+        "json": {"make": c.tag, "model": f"add{i}", "year": 2020}, "headers": c.manager()})),
+    ("car remove", "POST", "/api/managers/cars/remove", lambda c, i: ("/api/managers/cars/remove", {
+        "json": {"make": c.tag, "model": f"add{i}", "year": 2020}, "headers": c.manager()})),
+    ("car import (100 rows)", "POST", "/api/managers/cars/import", lambda c, i: ("/api/managers/cars/import", {
+        "json": {"cars": c.import_rows(i, 100)}, "headers": c.manager()}), record_imported),
+    ("car bulk remove (100)", "POST", "/api/managers/cars/bulk-remove", lambda c, i: ("/api/managers/cars/bulk-remove", {
+        "json": {"cars": c.imported_car_ids[i % len(c.imported_car_ids)] or ["none"]}, "headers": c.manager()})),
+    ("car models", "GET", "/api/cars/models", lambda c, i: ("/api/cars/models", {"headers": c.manager()})),
+    ("driver add", "POST", "/api/managers/drivers", lambda c, i: ("/api/managers/drivers", {
+        "json": {"name": f"{c.tag}-add{i}", "roadname": c.tag, "number": "1", "city": "Chicago", "zipcode": "60601"},
+        "headers": c.manager()})),
+    ("driver remove", "POST", "/api/managers/drivers/remove", lambda c, i: ("/api/managers/drivers/remove", {
+        "json": {"name": f"{c.tag}-add{i}"}, "headers": c.manager()})),
+    ("driver import (100 rows)", "POST", "/api/managers/drivers/import", lambda c, i: ("/api/managers/drivers/import", {
+        "json": {"drivers": [{"name": f"{c.tag}-imp{i}-{j}", "roadname": c.tag, "number": str(j), "city": "Chicago"}
+                             for j in range(100)]}, "headers": c.manager()})),
+    ("driver bulk remove (100)", "POST", "/api/managers/drivers/bulk-remove", lambda c, i: ("/api/managers/drivers/bulk-remove", {
+        "json": {"names": [f"{c.tag}-imp{i}-{j}" for j in range(100)]}, "headers": c.manager()})),
+    ("driver login", "POST", "/api/drivers/login", lambda c, i: ("/api/drivers/login", {"json": {"name": c.rng.choice(c.sample_drivers or c.drivers)}})),
+    ("driver address update", "PUT", "/api/drivers/address", lambda c, i: ("/api/drivers/address", {
+        "json": {"roadname": c.tag, "number": str(i % 2), "city": "Chicago", "zipcode": "60601"}, "headers": c.driver_auth()})),
+    ("drivable model declare", "POST", "/api/drivers/drivable-models", lambda c, i: ("/api/drivers/drivable-models", {
+        "json": {"car_id": c.sample_models[i % len(c.sample_models)][1]}, "headers": c.driver_auth()})),
+    ("drivable models list", "GET", "/api/drivers/me/drivable-models", lambda c, i: ("/api/drivers/me/drivable-models", {"headers": c.driver_auth()})),
+    ("drivable model remove", "DELETE", "/api/drivers/me/drivable-models/<string:car_id_to_remove>", lambda c, i: (
+        f"/api/drivers/me/drivable-models/{c.sample_models[i % len(c.sample_models)][1]}", {"headers": c.driver_auth()})),
+    ("drivable models bulk declare (20)", "POST", "/api/drivers/me/drivable-models/bulk", lambda c, i: (
+        "/api/drivers/me/drivable-models/bulk", {"json": {"car_ids": c.some_car_ids(20)}, "headers": c.driver_auth()})),
+    ("drivable models bulk remove (20)", "POST", "/api/drivers/me/drivable-models/bulk-remove", lambda c, i: (
+        "/api/drivers/me/drivable-models/bulk-remove", {"json": {"car_ids": c.some_car_ids(20)}, "headers": c.driver_auth()})),
+    ("client register", "POST", "/api/clients/register", lambda c, i: ("/api/clients/register", {
+        "json": c.registration(f"{c.tag}-c{i}@example.com", 2)})),
+    ("client import (100 clients)", "POST", "/api/managers/clients/import", lambda c, i: ("/api/managers/clients/import", {
+        "json": {"clients": [c.registration(f"{c.tag}-i{i}-{j}@example.com") for j in range(100)]}, "headers": c.manager()})),
+    ("client login", "POST", "/api/clients/login", lambda c, i: ("/api/clients/login", {"json": {"email": c.rng.choice(c.sample_clients or [c.client])}})),
+    ("cars available", "GET", "/api/cars/available", lambda c, i: (f"/api/cars/available?date={c.some_date()}", {})),
+    ("availability calendar (30 days)", "GET", "/api/cars/availability-calendar", lambda c, i: (
+        "/api/cars/availability-calendar?start={0}&end={1}".format(*c.some_window(30)), {})),
+    ("book rent", "POST", "/api/clients/rents", lambda c, i: ("/api/clients/rents", {
+        "json": {"modelid": c.model_ids[0], "date": (c.future + timedelta(days=i)).isoformat()}, "headers": c.client_auth()})),
+    ("book rent best driver", "POST", "/api/clients/rents/best-driver", lambda c, i: ("/api/clients/rents/best-driver", {
+        "json": {"modelid": c.model_ids[1], "date": (c.future + timedelta(days=1000 + i)).isoformat()}, "headers": c.client_auth()})),
+    ("client rents", "GET", "/api/clients/rents", lambda c, i: ("/api/clients/rents", {"headers": c.sample_client_auth()})),
+    ("review submit", "POST", "/api/clients/reviews", lambda c, i: ("/api/clients/reviews", {
+        "json": {"driverName": c.drivers[0], "rating": 1 + i % 5, "comment": "bench"}, "headers": c.client_auth()})),
+    ("report top clients", "GET", "/api/managers/reports/top-clients", lambda c, i: ("/api/managers/reports/top-clients?k=10", {"headers": c.manager()})),
+    ("report model rents", "GET", "/api/managers/reports/model-rents", lambda c, i: ("/api/managers/reports/model-rents", {"headers": c.manager()})),
+    ("report clients by city", "GET", "/api/managers/reports/clients-by-city-criteria", lambda c, i: (
+        f"/api/managers/reports/clients-by-city-criteria?city1={c.rng.choice(c.cities)}&city2={c.rng.choice(c.cities)}",
+        {"headers": c.manager()})),
+    ("report clients by city matrix (3x3)", "GET", "/api/managers/reports/clients-by-city-matrix", lambda c, i: (
+        "/api/managers/reports/clients-by-city-matrix?client_cities={0}&driver_cities={0}".format(",".join(c.cities[:3])),
+        {"headers": c.manager()})),
+    ("report problematic drivers", "GET", "/api/managers/reports/problematic-drivers", lambda c, i: (
+        "/api/managers/reports/problematic-drivers", {"headers": c.manager()})),
+    ("report brand stats", "GET", "/api/managers/reports/brand-stats", lambda c, i: ("/api/managers/reports/brand-stats", {"headers": c.manager()})),
+    ("report driver stats", "GET", "/api/managers/reports/driver-stats", lambda c, i: ("/api/managers/reports/driver-stats", {"headers": c.manager()})),
+    ("rent export (30 days, csv)", "GET", "/api/managers/rents/export", lambda c, i: (
+        f"/api/managers/rents/export?format=csv&from={c.first_date}&to={c.first_date + timedelta(days=29)}", {"headers": c.manager()})),
+    ("availability index rebuild", "POST", "/api/managers/availability-index/rebuild", lambda c, i: (
+        "/api/managers/availability-index/rebuild", {"headers": c.manager()})),
+    ("debug availability details", "GET", "/api/debug/availability-details", lambda c, i: (f"/api/debug/availability-details?date={c.some_date()}", {})),
+    ("debug pool stats", "GET", "/api/debug/pool-stats", lambda c, i: ("/api/debug/pool-stats", {})),
+]
+
+
+def uncovered_routes(backend):
+    covered = {(method, rule) for _, method, rule, *_ in ENDPOINTS}
+    missing = []
+    for rule in backend.app.url_map.iter_rules():
+        if rule.endpoint == "static":
+            continue
+        for method in sorted(rule.methods - {"HEAD", "OPTIONS"}):
+            if (method, rule.rule) not in covered:
+                missing.append(f"{method} {rule.rule}")
+    return missing
+
+
+def run_endpoint(backend, ctx, spec, args):
+    name, method, _, build, *hook = spec
+    client = backend.app.test_client()
+    latencies, db_times, rows, statuses = [], [], [], Counter()
+    for i in range(args.warmup + args.requests):
+        url, kwargs = build(ctx, i)
+        _db_time.seconds = 0.0
+        began = time.perf_counter()
+        with redirect_stdout(StringIO()):  # the routes print on every request
+            response = client.open(url, method=method, **kwargs)
+            body_rows = rows_returned(response)  # consumes streamed bodies inside the timing
+        elapsed = time.perf_counter() - began
+        if hook:
+            hook[0](ctx, response)
+        if i < args.warmup:
+            continue
+        latencies.append(elapsed * 1000)
+        db_times.append(_db_time.seconds * 1000)
+        rows.append(body_rows)
+        statuses[response.status_code] += 1
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(statistics.mean(latencies), 3),
+        "db_p50_ms": round(percentile(db_times, 50), 3),
+        "rows_p50": percentile(rows, 50),
+        "status": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+def generate(rents, seed):
+    print(f"\n=== Generating {rents:,} rents ===")
+    subprocess.run([sys.executable, os.path.join(BACKEND_DIR, "tools", "generate_data.py"),
+                    "--rents", str(rents), "--seed", str(seed), "--truncate"], check=True)
+
+
+def compare(report, baseline, args):
+    regressions = []
+    for scale, result in report["scales"].items():
+        base = baseline.get("scales", {}).get(scale)
+        if not base:
+            continue
+        for name, stats in result["endpoints"].items():
+            old = base["endpoints"].get(name)
+            if not old:
+                continue
+            delta = stats["p95_ms"] - old["p95_ms"]
+            if stats["p95_ms"] > old["p95_ms"] * (1 + args.tolerance) and delta > args.min_delta_ms:
+                regressions.append((scale, name, old["p95_ms"], stats["p95_ms"]))
+    return regressions
+
+
+def main():
+    args = parse_args()
+    scales = [None] if args.no_generate else [int(s) for s in args.scales.split(",") if s.strip()]
+
+    import app as backend
+    # Every pooled connection is opened with the timing cursor factory
+    backend.DB_CONFIG["connection_factory"] = TimedConnection
+
+    selected = [spec for spec in ENDPOINTS if not args.only or args.only.lower() in spec[0].lower()]
+    missing = uncovered_routes(backend)
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "settings": {"requests": args.requests, "warmup": args.warmup, "seed": args.seed},
+        "uncovered_routes": missing,
+        "scales": {},
+    }
+
+    for scale in scales:
+        if scale is not None:
+            generate(scale, args.seed)
+        backend.availability_index.invalidate()
+        ctx = Context(backend, args.seed)
+        label = str(scale if scale is not None else ctx.rents)
+        print(f"\n=== Scale {label} rents ===")
+        print(f"{'endpoint (ms)':<36} {'p50':>9} {'p95':>9} {'p99':>9} {'db p50':>9} {'rows':>7}  status")
+        results = {}
+        try:
+            for spec in selected:
+                stats = run_endpoint(backend, ctx, spec, args)
+                results[spec[0]] = stats
+                print(f"{spec[0]:<36} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f} "
+                      f"{stats['db_p50_ms']:>9.1f} {stats['rows_p50']:>7}  {stats['status']}")
+        finally:
+            ctx.cleanup(backend)
+        report["scales"][label] = {"rents": ctx.rents, "endpoints": results}
+
+    if missing:
+        print(f"\nRoutes without a benchmark: {', '.join(missing)}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args)
+        for scale, name, old, new in regressions:
+            print(f"REGRESSION  scale {scale}  {name}: p95 {old:.1f}ms -> {new:.1f}ms")
+        print("FAIL" if regressions else f"\nNo p95 regressions beyond {args.tolerance:.0%} vs {args.baseline}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Problematic drivers report plan benchmark.
+
+Runs EXPLAIN (ANALYZE, BUFFERS) on a problematic-drivers query of app.py
+(taken from the source, so the benchmark always measures the shipped SQL)
+for a sweep of cities and rating thresholds against the database configured
+in .env, and fails if the median execution time of any combination exceeds
+the budget. --path view (default) measures the query served by default, on
+REPORT_DRIVER_LOCAL_RENTS (migration 0010); --path live the one behind
+?freshness=live, on RENT (index of migration 0009). Use a database of
+production size (tools/generate_data.py --rents 10000000) with the
+migrations applied and the report views refreshed.
+
+    cd Backend
+    python benchmarks/problematic_drivers.py --budget-ms 100
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+
+import psycopg2
+from dotenv import load_dotenv
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "tools"))
+
+from verify_query_plans import extract_queries  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE the problematic-drivers report over a parameter sweep")
+    parser.add_argument("--path", choices=["view", "live"], default="view", help="query to measure")
+    parser.add_argument("--cities", help="comma-separated cities (default: the --top-cities with most drivers)")
+    parser.add_argument("--top-cities", type=int, default=5, help="cities to sweep when --cities is not given")
+    parser.add_argument("--thresholds", default="2.5,3.5,4.5", help="comma-separated rating thresholds")
+    parser.add_argument("--min-rents", type=int, default=2)
+    parser.add_argument("--min-clients", type=int, default=2)
+    parser.add_argument("--runs", type=int, default=3, help="EXPLAIN ANALYZE runs per combination (median is kept)")
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="fail if a median execution time exceeds this")
+    parser.add_argument("--verbose", action="store_true", help="print the plan of the slowest combination")
+    return parser.parse_args()
+
+
+def report_query(path):
+    """The view or live query of problematic_drivers_report, told apart by the relation they read."""
+    marker = "REPORT_DRIVER_LOCAL_RENTS" if path == "view" else "JOIN RENT"
+    queries = [sql for func, _, sql in extract_queries(os.path.join(BACKEND_DIR, "app.py"))
+               if func == "problematic_drivers_report" and marker in sql]
+    if len(queries) != 1:
+        raise SystemExit(f"Expected one {path} query in problematic_drivers_report, found {len(queries)}")
+    return queries[0].strip().rstrip(";")
+
+
+def buffers(plan):
+    return plan.get("Shared Hit Blocks", 0), plan.get("Shared Read Blocks", 0)
+
+
+def main():
+    args = parse_args()
+    load_dotenv(os.path.join(BACKEND_DIR, ".env"))
+    conn = psycopg2.connect(
+        dbname=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        host=os.getenv("DB_HOST"),
+        port=os.getenv("DB_PORT"),
+    )
+    conn.autocommit = True
+    cur = conn.cursor()
+    query = report_query(args.path)
+
+    cur.execute("SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE relname = 'rent'")
+    print(f"RENT: ~{cur.fetchone()[0]:,} rows")
+    if args.cities:
+        cities = [city.strip() for city in args.cities.split(",") if city.strip()]
+    else:
+        cur.execute("SELECT CITY FROM DRIVER GROUP BY CITY ORDER BY COUNT(*) DESC, CITY LIMIT %s", (args.top_cities,))
+        cities = [row[0] for row in cur.fetchall()]
+    thresholds = [float(t) for t in args.thresholds.split(",")]
+
+    print(f"{'city':<20} {'threshold':>9} {'drivers':>8} {'plan ms':>8} {'exec ms':>8} {'hit':>9} {'read':>9}")
+    over_budget = 0
+    slowest = (0.0, None)
+    for city in cities:
+        for threshold in thresholds:
+            if args.path == "view":
+                params = (city, threshold, args.min_rents, args.min_clients)
+            else:
+                params = (city, threshold, city, args.min_rents, args.min_clients)
+            runs = []
+            for _ in range(args.runs):
+                cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+                result = cur.fetchone()[0]
+                runs.append(json.loads(result)[0] if isinstance(result, str) else result[0])
+            execution = statistics.median(run["Execution Time"] for run in runs)
+            planning = statistics.median(run["Planning Time"] for run in runs)
+            last = runs[-1]["Plan"]
+            hit, read = buffers(last)
+            flag = ""
+            if execution > args.budget_ms:
+                over_budget += 1
+                flag = "  OVER BUDGET"
+            if execution > slowest[0]:
+                slowest = (execution, params)
+            print(f"{city[:20]:<20} {threshold:>9.2f} {last['Actual Rows']:>8} {planning:>8.2f} {execution:>8.2f} "
+                  f"{hit:>9} {read:>9}{flag}")
+
+    if args.verbose and slowest[1] is not None:
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + query, slowest[1])
+        print(f"\nSlowest combination {slowest[1][:2]}:")
+        for (row,) in cur.fetchall():
+            print("  " + row)
+
+    cur.close()
+    conn.close()
+    print(f"\n{over_budget} combination(s) over the {args.budget_ms:g} ms budget")
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+
+# Connections inherited from a parent process are parked here instead of being
+# closed: psycopg2 sends a Terminate message on close, which would kill the
+# parent's session that shares the same socket.
+_inherited_connections = []
+_all_pools = weakref.WeakSet()
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out within the acquire timeout."""
+
+
+class ConnectionPool:
+    """
+    Process-wide pool of psycopg2 connections.
+
+    Connections are created lazily up to max_size (min_size are opened on first
+    use), health-checked on checkout and evicted when found broken. After a
+    fork the child starts with an empty pool and never touches the parent's
+    sockets.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, acquire_timeout=5.0, health_check_interval=30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Invalid pool size (need 0 <= min_size <= max_size, max_size >= 1)")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+        self._init_state()
+        _all_pools.add(self)
+
+    def _init_state(self):
+        self._pid = os.getpid()
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = []          # list of (connection, last_used_monotonic)
+        self._size = 0           # idle + checked out + being opened
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,      # successful acquisitions
+            "waits": 0,          # acquisitions that had to block for a free slot
+            "timeouts": 0,       # acquisitions that gave up after acquire_timeout
+            "connects": 0,       # new physical connections opened
+            "connect_failures": 0,
+            "evictions": 0,      # broken connections discarded
+        }
+
+    def _after_fork_in_child(self):
+        for conn, _ in self._idle:
+            _inherited_connections.append(conn)
+        self._init_state()
+
+    def _check_pid(self):
+        if os.getpid() != self._pid:
+            self._after_fork_in_child()
+
+    # --- Physical connection handling ---
+
+    def _open(self):
+        try:
+            conn = self._connect()
+        except Exception:
+            conn = None
+        with self._cond:
+            if conn is None:
+                self._size -= 1
+                self._stats["connect_failures"] += 1
+                self._cond.notify()
+            else:
+                self._stats["connects"] += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats["evictions"] += 1
+            self._cond.notify()
+
+    def _is_healthy(self, conn, last_used):
+        if conn.closed:
+            return False
+        if conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if time.monotonic() - last_used < self.health_check_interval:
+            return True
+        # Idle for a while: ping the server, the socket may have been dropped
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _fill_to_min(self):
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            conn = self._open()
+            if conn is None:
+                return
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    # --- Public API ---
+
+    def getconn(self, timeout=None):
+        """Check out a healthy connection, blocking up to `timeout` seconds for a free slot."""
+        self._check_pid()
+        if self._size < self.min_size:
+            self._fill_to_min()
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeout("Connection pool is closed")
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(f"No database connection available within {timeout}s")
+                    if not waited:
+                        waited = True
+                        self._stats["waits"] += 1
+                    self._cond.wait(remaining)
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                else:
+                    conn, last_used = None, None
+                    self._size += 1  # reserve the slot before connecting outside the lock
+
+            if conn is None:
+                conn = self._open()
+                if conn is None:
+                    raise psycopg2.OperationalError("Could not open a new database connection")
+            elif not self._is_healthy(conn, last_used):
+                self._discard(conn)
+                continue
+
+            with self._cond:
+                self._stats["checkouts"] += 1
+            return conn
+
+    def putconn(self, conn):
+        """Return a connection to the pool, rolling back any open transaction."""
+        if os.getpid() != self._pid:
+            # Checked out before a fork; it belongs to the parent's session.
+            _inherited_connections.append(conn)
+            return
+        if not conn.closed and conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+        if conn.closed or conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            self._discard(conn)
+            return
+        with self._cond:
+            if self._closed:
+                self._size -= 1
+                conn.close()
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager yielding a pooled connection, returned to the pool on exit."""
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            })
+        return stats
+
+    def close(self):
+        """Close all idle connections; checked-out connections are closed when returned."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+def _reinit_pools_after_fork():
+    for pool in list(_all_pools):
+        pool._after_fork_in_child()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reinit_pools_after_fork)
@@ -0,0 +1,306 @@
+"""
+Versioned schema migrations.
+
+Migrations are the files in migrations/ named NNNN_description.sql and are
+applied in version order. Every applied version is recorded in the
+schema_version table together with a checksum of the file, so `status`
+can show pending migrations and files edited after they were applied.
+
+A migration normally runs in a single transaction with its schema_version
+row. Files that contain CREATE INDEX CONCURRENTLY (or the line
+`-- migrate:no-transaction`) cannot run inside a transaction block: their
+statements are executed one by one in autocommit mode and the version is
+recorded once all of them succeeded. Such files must be idempotent
+(IF NOT EXISTS); an index left INVALID by an interrupted concurrent build
+is dropped and rebuilt on the next run.
+
+A session advisory lock keeps two runners (e.g. two deploys) from applying
+migrations at the same time.
+
+    cd Backend
+    python migrate.py status
+    python migrate.py apply [--to VERSION] [--dry-run]
+    python migrate.py baseline VERSION   # mark migrations applied by hand as done
+"""
+import argparse
+import hashlib
+import os
+import re
+import sys
+import time
+
+import psycopg2
+from dotenv import load_dotenv
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+MIGRATIONS_DIR = os.path.join(BACKEND_DIR, "migrations")
+MIGRATION_FILE = re.compile(r"^(\d{4})_(\w+)\.sql$")
+NO_TRANSACTION = re.compile(r"^\s*--\s*migrate:no-transaction\s*$|\bCONCURRENTLY\b", re.IGNORECASE | re.MULTILINE)
+CONCURRENT_INDEX = re.compile(
+    r"^\s*CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", re.IGNORECASE)
+ADVISORY_LOCK_KEY = 7_320_451_001  # arbitrary, shared by every runner of this app
+
+
+class MigrationError(Exception):
+    pass
+
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+        with open(path, encoding="utf-8") as f:
+            self.sql = f.read()
+        self.checksum = hashlib.sha256(self.sql.encode("utf-8")).hexdigest()
+        self.transactional = not NO_TRANSACTION.search(strip_comments(self.sql, keep_directives=True))
+
+    def __repr__(self):
+        return f"{self.version:04d}_{self.name}"
+
+
+def discover(directory=MIGRATIONS_DIR):
+    """Return the migration files in version order; duplicate versions are an error."""
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise MigrationError(f"duplicate migration version {version:04d}: {filename}")
+        migrations[version] = Migration(version, match.group(2), os.path.join(directory, filename))
+    return [migrations[v] for v in sorted(migrations)]
+
+
+# --- SQL splitting (no-transaction migrations only) ---
+
+def strip_comments(sql, keep_directives=False):
+    """Remove -- and /* */ comments outside string literals."""
+    return "".join(part for kind, part in _tokens(sql)
+                   if kind != "comment" or (keep_directives and part.lstrip("- ").startswith("migrate:")))
+
+
+def split_statements(sql):
+    """Split a script on top-level semicolons, honouring quotes, dollar quotes and comments."""
+    statements, current = [], []
+    for kind, part in _tokens(sql):
+        if kind == "comment":
+            continue
+        if kind == "semicolon":
+            statement = "".join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+        else:
+            current.append(part)
+    statement = "".join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+_TOKEN = re.compile(r"""
+    (?P<comment>--[^\n]*|/\*.*?\*/)
+  | (?P<dollar>\$(?:[A-Za-z_]\w*)?\$)
+  | (?P<quote>'(?:[^']|'')*'|"(?:[^"]|"")*")
+  | (?P<semicolon>;)
+""", re.VERBOSE | re.DOTALL)
+
+
+def _tokens(sql):
+    pos = 0
+    while pos < len(sql):
+        match = _TOKEN.search(sql, pos)
+        if not match:
+            yield "text", sql[pos:]
+            return
+        if match.start() > pos:
+            yield "text", sql[pos:match.start()]
+        kind, part = match.lastgroup, match.group(0)
+        if kind == "dollar":
+            end = sql.find(part, match.end())
+            if end < 0:
+                raise MigrationError(f"unterminated dollar quote {part}")
+            part = sql[match.start():end + len(part)]
+            kind = "text"
+        elif kind == "quote":
+            kind = "text"
+        yield kind, part
+        pos = match.start() + len(part)
+
+
+# --- Database side ---
+
+def connect():
+    load_dotenv(os.path.join(BACKEND_DIR, ".env"))
+    return psycopg2.connect(
+        dbname=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        host=os.getenv("DB_HOST"),
+        port=os.getenv("DB_PORT"),
+    )
+
+
+def ensure_version_table(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                VERSION INT PRIMARY KEY,
+                NAME VARCHAR(100) NOT NULL,
+                CHECKSUM CHAR(64),
+                APPLIED_AT TIMESTAMPTZ NOT NULL DEFAULT now(),
+                EXECUTION_MS INT
+            )
+        """)
+    conn.commit()
+
+
+def applied_versions(conn):
+    """version -> (name, checksum, applied_at)"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT VERSION, NAME, CHECKSUM, APPLIED_AT FROM schema_version ORDER BY VERSION")
+        rows = cur.fetchall()
+    conn.commit()
+    return {version: (name, checksum, applied_at) for version, name, checksum, applied_at in rows}
+
+
+def record(cur, migration, elapsed_ms):
+    cur.execute(
+        "INSERT INTO schema_version (VERSION, NAME, CHECKSUM, EXECUTION_MS) VALUES (%s, %s, %s, %s)",
+        (migration.version, migration.name, migration.checksum, elapsed_ms),
+    )
+
+
+def drop_invalid_index(cur, index_name):
+    """An interrupted CREATE INDEX CONCURRENTLY leaves an INVALID index that IF NOT EXISTS would keep."""
+    cur.execute("""
+        SELECT 1 FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relname = lower(%s) AND n.nspname = current_schema() AND NOT i.indisvalid
+    """, (index_name,))
+    if cur.fetchone():
+        print(f"    dropping invalid index {index_name} left by an interrupted build")
+        cur.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{index_name.lower()}"')
+
+
+def run(conn, migration):
+    began = time.perf_counter()
+    if migration.transactional:
+        try:
+            with conn.cursor() as cur:
+                cur.execute(migration.sql)
+                record(cur, migration, int((time.perf_counter() - began) * 1000))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return
+
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            for statement in split_statements(migration.sql):
+                index = CONCURRENT_INDEX.match(statement)
+                if index:
+                    drop_invalid_index(cur, index.group(1))
+                cur.execute(statement)
+            record(cur, migration, int((time.perf_counter() - began) * 1000))
+    finally:
+        conn.autocommit = False
+
+
+# --- Commands ---
+
+def cmd_status(conn, migrations, args):
+    applied = applied_versions(conn)
+    known = {m.version for m in migrations}
+    for m in migrations:
+        if m.version in applied:
+            _, checksum, applied_at = applied[m.version]
+            state = f"applied {applied_at:%Y-%m-%d %H:%M}"
+            if checksum and checksum != m.checksum:
+                state += "  (file modified since)"
+        else:
+            state = "pending"
+        mode = "" if m.transactional else "  [no transaction]"
+        print(f"{m!r:<45} {state}{mode}")
+    for version in sorted(set(applied) - known):
+        print(f"{version:04d}_{applied[version][0]:<40} applied, file missing")
+    pending = [m for m in migrations if m.version not in applied]
+    print(f"\n{len(applied)} applied, {len(pending)} pending")
+    return 0
+
+
+def cmd_apply(conn, migrations, args):
+    applied = applied_versions(conn)
+    pending = [m for m in migrations if m.version not in applied and (args.to is None or m.version <= args.to)]
+    if not pending:
+        print("Schema is up to date")
+        return 0
+    for m in pending:
+        mode = "" if m.transactional else " (no transaction)"
+        if args.dry_run:
+            print(f"would apply {m!r}{mode}")
+            continue
+        print(f"applying {m!r}{mode} ...")
+        began = time.perf_counter()
+        try:
+            run(conn, m)
+        except psycopg2.Error as e:
+            print(f"FAILED {m!r}: {str(e).strip()}")
+            return 1
+        print(f"    done in {time.perf_counter() - began:.2f}s")
+    return 0
+
+
+def cmd_baseline(conn, migrations, args):
+    applied = applied_versions(conn)
+    with conn.cursor() as cur:
+        for m in migrations:
+            if m.version <= args.version and m.version not in applied:
+                record(cur, m, None)
+                print(f"marked {m!r} as applied")
+    conn.commit()
+    return 0
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Apply the SQL migrations in migrations/ in order")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="list applied and pending migrations")
+    apply = commands.add_parser("apply", help="apply pending migrations")
+    apply.add_argument("--to", type=int, help="stop after this version")
+    apply.add_argument("--dry-run", action="store_true", help="only list what would be applied")
+    baseline = commands.add_parser("baseline", help="record migrations up to VERSION as applied without running them")
+    baseline.add_argument("version", type=int)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    try:
+        migrations = discover()
+    except MigrationError as e:
+        print(e)
+        return 1
+
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_lock(%s)", (ADVISORY_LOCK_KEY,))
+            if not cur.fetchone()[0]:
+                print("Another migration run holds the lock; try again later")
+                return 1
+        conn.commit()
+        ensure_version_table(conn)
+        command = {"status": cmd_status, "apply": cmd_apply, "baseline": cmd_baseline}[args.command]
+        return command(conn, migrations, args)
+    finally:
+        conn.close()  # also releases the advisory lock
+
+
+if __name__ == "__main__":
+    sys.exit(main())
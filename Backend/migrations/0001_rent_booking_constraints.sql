@@ -0,0 +1,6 @@
+-- A car model and a driver can each be booked at most once per day.
+-- Booking relies on these constraints (INSERT ... ON CONFLICT) instead of
+-- check-then-insert, so concurrent requests can never double-book.
+-- Remove any existing duplicate rents before applying.
+ALTER TABLE RENT ADD CONSTRAINT rent_model_date_key UNIQUE (MODELID, DATE);
+ALTER TABLE RENT ADD CONSTRAINT rent_driver_date_key UNIQUE (NAME, DATE);
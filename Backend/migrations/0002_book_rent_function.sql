@@ -0,0 +1,85 @@
+-- Whole booking decision in one server-side call (one network round trip):
+-- verify the model, check it is free, pick a driver, insert the rent.
+-- Relies on the RENT unique constraints from 0001: if the picked driver is
+-- booked concurrently the insert is skipped and the next eligible driver is tried.
+CREATE TYPE booking_status AS ENUM ('booked', 'invalid_model', 'model_booked', 'no_driver', 'contention');
+
+CREATE OR REPLACE FUNCTION book_rent(
+    p_model_id VARCHAR,
+    p_date DATE,
+    p_email VARCHAR,
+    p_best_driver BOOLEAN DEFAULT FALSE,  -- pick the free driver with the highest average rating
+    p_max_attempts INT DEFAULT 3
+)
+RETURNS TABLE (status booking_status, rent_id INT, driver_name VARCHAR, driver_rating NUMERIC)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+    v_car_id VARCHAR;
+    v_driver VARCHAR;
+    v_rating NUMERIC;
+    v_rent_id INT;
+    v_excluded VARCHAR[] := '{}';
+BEGIN
+    SELECT m.CARID INTO v_car_id FROM MODEL m WHERE m.MODELID = p_model_id LIMIT 1;
+    IF NOT FOUND THEN
+        RETURN QUERY SELECT 'invalid_model'::booking_status, NULL::INT, NULL::VARCHAR, NULL::NUMERIC;
+        RETURN;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM RENT r WHERE r.MODELID = p_model_id AND r.DATE = p_date) THEN
+        RETURN QUERY SELECT 'model_booked'::booking_status, NULL::INT, NULL::VARCHAR, NULL::NUMERIC;
+        RETURN;
+    END IF;
+
+    FOR attempt IN 1..p_max_attempts LOOP
+        IF p_best_driver THEN
+            SELECT dr.NAME, COALESCE(AVG(rev.RATING), 0.0) INTO v_driver, v_rating
+            FROM DRIVER dr
+            JOIN DRIVES d ON dr.NAME = d.NAME
+            LEFT JOIN REVIEW rev ON dr.NAME = rev.NAME
+            WHERE d.MODELID = p_model_id
+              AND d.CARID = v_car_id
+              AND dr.NAME NOT IN (SELECT r.NAME FROM RENT r WHERE r.DATE = p_date)
+              AND dr.NAME <> ALL(v_excluded)
+            GROUP BY dr.NAME
+            ORDER BY 2 DESC, dr.NAME
+            LIMIT 1;
+        ELSE
+            SELECT dr.NAME, NULL INTO v_driver, v_rating
+            FROM DRIVER dr
+            JOIN DRIVES d ON dr.NAME = d.NAME
+            WHERE d.MODELID = p_model_id
+              AND d.CARID = v_car_id
+              AND dr.NAME NOT IN (SELECT r.NAME FROM RENT r WHERE r.DATE = p_date)
+              AND dr.NAME <> ALL(v_excluded)
+            LIMIT 1;
+        END IF;
+
+        IF NOT FOUND THEN
+            RETURN QUERY SELECT 'no_driver'::booking_status, NULL::INT, NULL::VARCHAR, NULL::NUMERIC;
+            RETURN;
+        END IF;
+
+        INSERT INTO RENT (DATE, NAME, EMAIL, CARID, MODELID)
+        VALUES (p_date, v_driver, p_email, v_car_id, p_model_id)
+        ON CONFLICT DO NOTHING
+        RETURNING RENTID INTO v_rent_id;
+
+        IF v_rent_id IS NOT NULL THEN
+            RETURN QUERY SELECT 'booked'::booking_status, v_rent_id, v_driver, v_rating;
+            RETURN;
+        END IF;
+
+        -- Lost a race: either the model or the driver got booked for this date meanwhile
+        IF EXISTS (SELECT 1 FROM RENT r WHERE r.MODELID = p_model_id AND r.DATE = p_date) THEN
+            RETURN QUERY SELECT 'model_booked'::booking_status, NULL::INT, NULL::VARCHAR, NULL::NUMERIC;
+            RETURN;
+        END IF;
+        v_excluded := v_excluded || v_driver;
+    END LOOP;
+
+    RETURN QUERY SELECT 'contention'::booking_status, NULL::INT, NULL::VARCHAR, NULL::NUMERIC;
+END;
+$$;
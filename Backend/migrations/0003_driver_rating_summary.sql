@@ -0,0 +1,149 @@
+-- Per-driver rating summary (sum, count, avg) kept in sync with REVIEW by triggers,
+-- so best-driver booking and the rating reports read one row per driver instead of
+-- re-aggregating the whole REVIEW table. NULL ratings are ignored, like AVG().
+CREATE TABLE DRIVER_RATING (
+    NAME VARCHAR(100),
+    RATING_SUM BIGINT NOT NULL DEFAULT 0,
+    RATING_COUNT INT NOT NULL DEFAULT 0,
+    AVG_RATING NUMERIC GENERATED ALWAYS AS (RATING_SUM::NUMERIC / NULLIF(RATING_COUNT, 0)) STORED,
+    PRIMARY KEY (NAME),
+    FOREIGN KEY (NAME) REFERENCES DRIVER(NAME) ON DELETE CASCADE
+);
+
+CREATE OR REPLACE FUNCTION driver_rating_apply(p_name VARCHAR, p_rating INT, p_sign INT)
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF p_name IS NULL OR p_rating IS NULL THEN
+        RETURN;
+    END IF;
+    INSERT INTO DRIVER_RATING (NAME, RATING_SUM, RATING_COUNT)
+    VALUES (p_name, p_sign * p_rating, p_sign)
+    ON CONFLICT (NAME) DO UPDATE
+    SET RATING_SUM = DRIVER_RATING.RATING_SUM + EXCLUDED.RATING_SUM,
+        RATING_COUNT = DRIVER_RATING.RATING_COUNT + EXCLUDED.RATING_COUNT;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION review_maintain_driver_rating()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM driver_rating_apply(OLD.NAME, OLD.RATING, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM driver_rating_apply(NEW.NAME, NEW.RATING, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION review_truncate_driver_rating()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM DRIVER_RATING;
+    RETURN NULL;
+END;
+$$;
+
+-- Block review writes while backfilling so no review is counted twice or missed
+LOCK TABLE REVIEW IN SHARE MODE;
+
+CREATE TRIGGER review_driver_rating
+AFTER INSERT OR UPDATE OF RATING, NAME OR DELETE ON REVIEW
+FOR EACH ROW EXECUTE FUNCTION review_maintain_driver_rating();
+
+CREATE TRIGGER review_truncate_driver_rating
+AFTER TRUNCATE ON REVIEW
+FOR EACH STATEMENT EXECUTE FUNCTION review_truncate_driver_rating();
+
+INSERT INTO DRIVER_RATING (NAME, RATING_SUM, RATING_COUNT)
+SELECT NAME, COALESCE(SUM(RATING), 0), COUNT(RATING)
+FROM REVIEW
+WHERE NAME IS NOT NULL
+GROUP BY NAME;
+
+-- Best-driver booking now ranks candidates by DRIVER_RATING.AVG_RATING
+CREATE OR REPLACE FUNCTION book_rent(
+    p_model_id VARCHAR,
+    p_date DATE,
+    p_email VARCHAR,
+    p_best_driver BOOLEAN DEFAULT FALSE,  -- pick the free driver with the highest average rating
+    p_max_attempts INT DEFAULT 3
+)
+RETURNS TABLE (status booking_status, rent_id INT, driver_name VARCHAR, driver_rating NUMERIC)
+LANGUAGE plpgsql
+AS $$
+#variable_conflict use_column
+DECLARE
+    v_car_id VARCHAR;
+    v_driver VARCHAR;
+    v_rating NUMERIC;
+    v_rent_id INT;
+    v_excluded VARCHAR[] := '{}';
+BEGIN
+    SELECT m.CARID INTO v_car_id FROM MODEL m WHERE m.MODELID = p_model_id LIMIT 1;
+    IF NOT FOUND THEN
+        RETURN QUERY SELECT 'invalid_model'::booking_status, NULL::INT, NULL::VARCHAR, NULL::NUMERIC;
+        RETURN;
+    END IF;
+
+    IF EXISTS (SELECT 1 FROM RENT r WHERE r.MODELID = p_model_id AND r.DATE = p_date) THEN
+        RETURN QUERY SELECT 'model_booked'::booking_status, NULL::INT, NULL::VARCHAR, NULL::NUMERIC;
+        RETURN;
+    END IF;
+
+    FOR attempt IN 1..p_max_attempts LOOP
+        IF p_best_driver THEN
+            SELECT dr.NAME, COALESCE(dra.AVG_RATING, 0.0) INTO v_driver, v_rating
+            FROM DRIVER dr
+            JOIN DRIVES d ON dr.NAME = d.NAME
+            LEFT JOIN DRIVER_RATING dra ON dr.NAME = dra.NAME
+            WHERE d.MODELID = p_model_id
+              AND d.CARID = v_car_id
+              AND dr.NAME NOT IN (SELECT r.NAME FROM RENT r WHERE r.DATE = p_date)
+              AND dr.NAME <> ALL(v_excluded)
+            ORDER BY 2 DESC, dr.NAME
+            LIMIT 1;
+        ELSE
+            SELECT dr.NAME, NULL INTO v_driver, v_rating
+            FROM DRIVER dr
+            JOIN DRIVES d ON dr.NAME = d.NAME
+            WHERE d.MODELID = p_model_id
+              AND d.CARID = v_car_id
+              AND dr.NAME NOT IN (SELECT r.NAME FROM RENT r WHERE r.DATE = p_date)
+              AND dr.NAME <> ALL(v_excluded)
+            LIMIT 1;
+        END IF;
+
+        IF NOT FOUND THEN
+            RETURN QUERY SELECT 'no_driver'::booking_status, NULL::INT, NULL::VARCHAR, NULL::NUMERIC;
+            RETURN;
+        END IF;
+
+        INSERT INTO RENT (DATE, NAME, EMAIL, CARID, MODELID)
+        VALUES (p_date, v_driver, p_email, v_car_id, p_model_id)
+        ON CONFLICT DO NOTHING
+        RETURNING RENTID INTO v_rent_id;
+
+        IF v_rent_id IS NOT NULL THEN
+            RETURN QUERY SELECT 'booked'::booking_status, v_rent_id, v_driver, v_rating;
+            RETURN;
+        END IF;
+
+        -- Lost a race: either the model or the driver got booked for this date meanwhile
+        IF EXISTS (SELECT 1 FROM RENT r WHERE r.MODELID = p_model_id AND r.DATE = p_date) THEN
+            RETURN QUERY SELECT 'model_booked'::booking_status, NULL::INT, NULL::VARCHAR, NULL::NUMERIC;
+            RETURN;
+        END IF;
+        v_excluded := v_excluded || v_driver;
+    END LOOP;
+
+    RETURN QUERY SELECT 'contention'::booking_status, NULL::INT, NULL::VARCHAR, NULL::NUMERIC;
+END;
+$$;
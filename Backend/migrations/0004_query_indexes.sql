@@ -0,0 +1,32 @@
+-- Secondary indexes for the join and filter columns used by the routes in app.py.
+-- The schema only defines primary keys; RENT (MODELID, DATE) and RENT (NAME, DATE)
+-- are already indexed by the unique constraints from 0001, and MODEL lookups by
+-- MODELID alone use the leading column of MODEL's primary key.
+-- CONCURRENTLY keeps the tables writable while building; it cannot run inside a
+-- transaction block, so every statement here runs on its own.
+-- Check plans with: python tools/verify_query_plans.py
+
+-- Availability by date (index rebuild, calendar window, per-date busy sets)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS rent_date_idx ON RENT (DATE) INCLUDE (MODELID, NAME);
+
+-- A client's rent history (ORDER BY DATE DESC), review eligibility and top-K clients
+CREATE INDEX CONCURRENTLY IF NOT EXISTS rent_email_date_idx ON RENT (EMAIL, DATE DESC);
+
+-- RENT -> MODEL/CAR joins and the car removal dependency check (by CARID)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS rent_carid_modelid_idx ON RENT (CARID, MODELID);
+
+-- Ratings per driver (stats reports, driver removal dependency check)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS review_name_idx ON REVIEW (NAME) INCLUDE (RATING);
+
+-- Drivers able to drive a model, and DRIVES cleanup by CARID
+CREATE INDEX CONCURRENTLY IF NOT EXISTS drives_carid_modelid_idx ON DRIVES (CARID, MODELID) INCLUDE (NAME);
+
+-- MODEL rows of a car (declare drivable model, car removal, CAR joins)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS model_carid_idx ON MODEL (CARID);
+
+-- City filters of the clients-by-city and problematic-drivers reports
+CREATE INDEX CONCURRENTLY IF NOT EXISTS lives_city_email_idx ON LIVES (CITY, EMAIL);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS driver_city_idx ON DRIVER (CITY);
+
+-- Car lookup by make/model/year (car removal, calendar filters, ordered listings)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS car_make_model_year_idx ON CAR (MAKE, MODEL, YEAR);
@@ -0,0 +1,46 @@
+-- RENTID and REVIEWID become identity columns backed by a cached sequence, so
+-- book_rent() and submit_review can insert without an id and read it back with
+-- RETURNING, without MAX()+1 or any other coordination between writers.
+--
+-- Transition for existing databases:
+--   * Schema/FinalProjectSchema.sql declares plain INT columns with no default;
+--     External sources/FinalProjectSchema.sql declares SERIAL. A SERIAL default and
+--     its owned sequence are dropped first so exactly one generator remains.
+--   * Existing rows keep their ids; the identity starts after the current MAX, so
+--     new ids never collide with rows inserted before this migration.
+--   * Adding an identity to an existing column only changes the catalog (no table
+--     rewrite); the ACCESS EXCLUSIVE lock is held for the length of this transaction.
+-- GENERATED BY DEFAULT still accepts explicit ids (imports, restores); after such a
+-- load run: SELECT setval(pg_get_serial_sequence('rent', 'rentid'), MAX(RENTID)) FROM RENT;
+-- CACHE hands each session a block of ids, so ids are unique and increasing per
+-- session but may have gaps and interleave across sessions.
+DO $$
+DECLARE
+    v_target RECORD;
+    v_sequence TEXT;
+    v_start BIGINT;
+BEGIN
+    FOR v_target IN SELECT * FROM (VALUES ('rent', 'rentid'), ('review', 'reviewid')) t(tbl, col) LOOP
+        IF EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = v_target.tbl
+              AND column_name = v_target.col AND is_identity = 'YES'
+        ) THEN
+            CONTINUE;
+        END IF;
+
+        EXECUTE format('LOCK TABLE %I IN ACCESS EXCLUSIVE MODE', v_target.tbl);
+
+        -- SERIAL: drop the default and the sequence it owns
+        v_sequence := pg_get_serial_sequence(v_target.tbl, v_target.col);
+        EXECUTE format('ALTER TABLE %I ALTER COLUMN %I DROP DEFAULT', v_target.tbl, v_target.col);
+        IF v_sequence IS NOT NULL THEN
+            EXECUTE format('DROP SEQUENCE %s', v_sequence);
+        END IF;
+
+        EXECUTE format('SELECT COALESCE(MAX(%I), 0) + 1 FROM %I', v_target.col, v_target.tbl) INTO v_start;
+        EXECUTE format('ALTER TABLE %I ALTER COLUMN %I ADD GENERATED BY DEFAULT AS IDENTITY (START WITH %s CACHE 50)',
+                       v_target.tbl, v_target.col, v_start);
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,41 @@
+-- Server-side generators for CAR.CARID (VARCHAR(10)) and MODEL.MODELID, replacing
+-- the random uuid + "SELECT ... WHERE CARID = %s" probe loop in add_car.
+-- Ids are a sequence value in base 36, zero-padded to 9 digits, behind a 'G'
+-- prefix: unique by construction, and 'G' is outside the hex alphabet of the
+-- uuid-based ids already stored, so new ids cannot collide with old ones.
+-- 36^9 ids per table; the sequences are cached like the identity columns (0005).
+CREATE SEQUENCE IF NOT EXISTS car_id_seq CACHE 20;
+CREATE SEQUENCE IF NOT EXISTS model_id_seq CACHE 20;
+
+CREATE OR REPLACE FUNCTION encode_base36(p_value BIGINT, p_width INT)
+RETURNS VARCHAR
+LANGUAGE plpgsql IMMUTABLE STRICT
+AS $$
+DECLARE
+    v_digits CONSTANT TEXT := '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ';
+    v_result TEXT := '';
+BEGIN
+    IF p_value < 0 THEN
+        RAISE EXCEPTION 'encode_base36: negative value %', p_value;
+    END IF;
+    LOOP
+        v_result := substr(v_digits, (p_value % 36)::INT + 1, 1) || v_result;
+        p_value := p_value / 36;
+        EXIT WHEN p_value = 0;
+    END LOOP;
+    IF length(v_result) > p_width THEN
+        RAISE EXCEPTION 'encode_base36: % does not fit in % digits', v_result, p_width;
+    END IF;
+    RETURN lpad(v_result, p_width, '0');
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION next_car_id()
+RETURNS VARCHAR
+LANGUAGE sql
+AS $$ SELECT 'G' || encode_base36(nextval('car_id_seq'), 9) $$;
+
+CREATE OR REPLACE FUNCTION next_model_id()
+RETURNS VARCHAR
+LANGUAGE sql
+AS $$ SELECT 'G' || encode_base36(nextval('model_id_seq'), 9) $$;
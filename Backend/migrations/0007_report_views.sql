@@ -0,0 +1,79 @@
+-- Materialized copies of the driver-stats, model-rents and brand-stats reports,
+-- so dashboard loads read a few hundred precomputed rows instead of re-aggregating
+-- RENT, DRIVES and REVIEW. The queries match the live ones in app.py.
+--
+-- Each view has a unique index so it can be refreshed with
+-- REFRESH MATERIALIZED VIEW CONCURRENTLY (readers are never blocked); the
+-- refresher in report_views.py does that on a schedule and records the time of
+-- every refresh in REPORT_VIEW_REFRESH, which the endpoints return as freshness.
+CREATE MATERIALIZED VIEW REPORT_DRIVER_STATS AS
+SELECT
+    d.NAME AS name,
+    COALESCE(rc.total_rents, 0) AS total_rents,
+    COALESCE(dra.AVG_RATING, 0.0) AS average_rating
+FROM DRIVER d
+LEFT JOIN (
+    SELECT NAME, COUNT(*) AS total_rents
+    FROM RENT
+    GROUP BY NAME
+) rc ON d.NAME = rc.NAME
+LEFT JOIN DRIVER_RATING dra ON d.NAME = dra.NAME;
+
+CREATE UNIQUE INDEX report_driver_stats_name_idx ON REPORT_DRIVER_STATS (name);
+
+CREATE MATERIALIZED VIEW REPORT_MODEL_RENTS AS
+SELECT
+    c.MAKE AS make,
+    c.MODEL AS model,
+    c.YEAR AS year,
+    COUNT(r.RENTID) AS rent_count
+FROM CAR c
+LEFT JOIN RENT r ON c.CARID = r.CARID
+GROUP BY c.MAKE, c.MODEL, c.YEAR;
+
+CREATE UNIQUE INDEX report_model_rents_key_idx ON REPORT_MODEL_RENTS (make, model, year);
+
+CREATE MATERIALIZED VIEW REPORT_BRAND_STATS AS
+WITH BrandDriverNames AS (
+    SELECT DISTINCT c.MAKE AS brand, d.NAME AS driver_name
+    FROM CAR c
+    JOIN MODEL m ON c.CARID = m.CARID
+    JOIN DRIVES dr ON m.MODELID = dr.MODELID AND m.CARID = dr.CARID
+    JOIN DRIVER d ON dr.NAME = d.NAME
+),
+BrandAvgDriverRating AS (
+    SELECT
+        bdn.brand,
+        SUM(dra.RATING_SUM)::NUMERIC / NULLIF(SUM(dra.RATING_COUNT), 0) AS avg_rating
+    FROM BrandDriverNames bdn
+    JOIN DRIVER_RATING dra ON bdn.driver_name = dra.NAME
+    GROUP BY bdn.brand
+),
+BrandRentCount AS (
+    SELECT c.MAKE AS brand, COUNT(r.RENTID) AS rent_count
+    FROM CAR c
+    JOIN MODEL m ON c.CARID = m.CARID
+    JOIN RENT r ON m.MODELID = r.MODELID AND m.CARID = r.CARID
+    GROUP BY c.MAKE
+)
+SELECT
+    all_brands.brand,
+    COALESCE(badr.avg_rating, 0.0) AS average_driver_rating,
+    COALESCE(brc.rent_count, 0) AS total_rents
+FROM (SELECT DISTINCT MAKE AS brand FROM CAR) AS all_brands
+LEFT JOIN BrandAvgDriverRating badr ON all_brands.brand = badr.brand
+LEFT JOIN BrandRentCount brc ON all_brands.brand = brc.brand;
+
+CREATE UNIQUE INDEX report_brand_stats_brand_idx ON REPORT_BRAND_STATS (brand);
+
+-- Last refresh per view; the row is locked while a refresh runs, so concurrent
+-- refreshers (several worker processes) skip a view another one is refreshing.
+CREATE TABLE REPORT_VIEW_REFRESH (
+    VIEW_NAME VARCHAR(63),
+    REFRESHED_AT TIMESTAMPTZ NOT NULL,
+    DURATION_MS INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (VIEW_NAME)
+);
+
+INSERT INTO REPORT_VIEW_REFRESH (VIEW_NAME, REFRESHED_AT)
+VALUES ('report_driver_stats', now()), ('report_model_rents', now()), ('report_brand_stats', now());
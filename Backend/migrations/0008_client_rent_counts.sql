@@ -0,0 +1,145 @@
+-- Per-client rent counters kept in sync with RENT by triggers, so the top-clients
+-- report reads the first k entries of an index instead of grouping all of RENT.
+-- CLIENT_DAILY_RENT_COUNT holds the same counts per rent date and answers the
+-- report's optional from/to window.
+--
+-- The triggers are statement-level with transition tables: a multi-row INSERT,
+-- COPY or DELETE updates each counter once, not once per rent. Counter rows are
+-- upserted in EMAIL order so concurrent bookings lock them in the same order, and
+-- rows that drop to zero are deleted (a client without rents is not a top client).
+CREATE TABLE CLIENT_RENT_COUNT (
+    EMAIL VARCHAR(100),
+    RENT_COUNT BIGINT NOT NULL,
+    PRIMARY KEY (EMAIL),
+    FOREIGN KEY (EMAIL) REFERENCES CLIENT(EMAIL) ON DELETE CASCADE
+);
+
+-- Top-k is an index-only scan of the first k entries
+CREATE INDEX client_rent_count_top_idx ON CLIENT_RENT_COUNT (RENT_COUNT DESC, EMAIL);
+
+CREATE TABLE CLIENT_DAILY_RENT_COUNT (
+    EMAIL VARCHAR(100),
+    DATE DATE,
+    RENT_COUNT INT NOT NULL,
+    PRIMARY KEY (EMAIL, DATE),
+    FOREIGN KEY (EMAIL) REFERENCES CLIENT(EMAIL) ON DELETE CASCADE
+);
+
+-- Date windows read only the counters of the days in the window
+CREATE INDEX client_daily_rent_count_date_idx ON CLIENT_DAILY_RENT_COUNT (DATE) INCLUDE (EMAIL, RENT_COUNT);
+
+CREATE OR REPLACE FUNCTION client_rent_count_apply(p_emails VARCHAR[], p_dates DATE[], p_counts INT[])
+RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- p_counts are signed deltas per (email, date)
+    INSERT INTO CLIENT_DAILY_RENT_COUNT (EMAIL, DATE, RENT_COUNT)
+    SELECT email, rent_date, delta
+    FROM unnest(p_emails, p_dates, p_counts) AS d(email, rent_date, delta)
+    WHERE rent_date IS NOT NULL
+    ORDER BY email, rent_date
+    ON CONFLICT (EMAIL, DATE) DO UPDATE
+    SET RENT_COUNT = CLIENT_DAILY_RENT_COUNT.RENT_COUNT + EXCLUDED.RENT_COUNT;
+
+    INSERT INTO CLIENT_RENT_COUNT (EMAIL, RENT_COUNT)
+    SELECT email, SUM(delta)
+    FROM unnest(p_emails, p_counts) AS d(email, delta)
+    GROUP BY email
+    ORDER BY email
+    ON CONFLICT (EMAIL) DO UPDATE
+    SET RENT_COUNT = CLIENT_RENT_COUNT.RENT_COUNT + EXCLUDED.RENT_COUNT;
+
+    IF EXISTS (SELECT 1 FROM unnest(p_counts) AS d(delta) WHERE delta < 0) THEN
+        DELETE FROM CLIENT_DAILY_RENT_COUNT
+        WHERE EMAIL = ANY(p_emails) AND DATE = ANY(p_dates) AND RENT_COUNT <= 0;
+        DELETE FROM CLIENT_RENT_COUNT
+        WHERE EMAIL = ANY(p_emails) AND RENT_COUNT <= 0;
+    END IF;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION rent_maintain_client_rent_count()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_emails VARCHAR[];
+    v_dates DATE[];
+    v_counts INT[];
+BEGIN
+    -- Only the transition tables of the firing event exist, hence one query per event
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(EMAIL), array_agg(DATE), array_agg(n)
+        INTO v_emails, v_dates, v_counts
+        FROM (SELECT EMAIL, DATE, COUNT(*)::INT AS n FROM new_rents GROUP BY EMAIL, DATE) d;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(EMAIL), array_agg(DATE), array_agg(n)
+        INTO v_emails, v_dates, v_counts
+        FROM (SELECT EMAIL, DATE, -COUNT(*)::INT AS n FROM old_rents GROUP BY EMAIL, DATE) d;
+    ELSE
+        SELECT array_agg(EMAIL), array_agg(DATE), array_agg(n)
+        INTO v_emails, v_dates, v_counts
+        FROM (
+            SELECT EMAIL, DATE, SUM(delta)::INT AS n
+            FROM (
+                SELECT EMAIL, DATE, 1 AS delta FROM new_rents
+                UNION ALL
+                SELECT EMAIL, DATE, -1 FROM old_rents
+            ) changes
+            GROUP BY EMAIL, DATE
+            HAVING SUM(delta) <> 0
+        ) d;
+    END IF;
+
+    IF v_emails IS NOT NULL THEN
+        PERFORM client_rent_count_apply(v_emails, v_dates, v_counts);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION rent_truncate_client_rent_count()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM CLIENT_DAILY_RENT_COUNT;
+    DELETE FROM CLIENT_RENT_COUNT;
+    RETURN NULL;
+END;
+$$;
+
+-- Block rent writes while backfilling so no rent is counted twice or missed
+LOCK TABLE RENT IN SHARE MODE;
+
+-- Transition tables allow a single event per trigger
+CREATE TRIGGER rent_client_rent_count_insert
+AFTER INSERT ON RENT
+REFERENCING NEW TABLE AS new_rents
+FOR EACH STATEMENT EXECUTE FUNCTION rent_maintain_client_rent_count();
+
+CREATE TRIGGER rent_client_rent_count_delete
+AFTER DELETE ON RENT
+REFERENCING OLD TABLE AS old_rents
+FOR EACH STATEMENT EXECUTE FUNCTION rent_maintain_client_rent_count();
+
+CREATE TRIGGER rent_client_rent_count_update
+AFTER UPDATE ON RENT
+REFERENCING OLD TABLE AS old_rents NEW TABLE AS new_rents
+FOR EACH STATEMENT EXECUTE FUNCTION rent_maintain_client_rent_count();
+
+CREATE TRIGGER rent_truncate_client_rent_count
+AFTER TRUNCATE ON RENT
+FOR EACH STATEMENT EXECUTE FUNCTION rent_truncate_client_rent_count();
+
+INSERT INTO CLIENT_DAILY_RENT_COUNT (EMAIL, DATE, RENT_COUNT)
+SELECT EMAIL, DATE, COUNT(*)
+FROM RENT
+WHERE DATE IS NOT NULL
+GROUP BY EMAIL, DATE;
+
+INSERT INTO CLIENT_RENT_COUNT (EMAIL, RENT_COUNT)
+SELECT EMAIL, COUNT(*)
+FROM RENT
+GROUP BY EMAIL;
@@ -0,0 +1,4 @@
+-- Covering index for the problematic-drivers report: the rents of a driver, with the
+-- renting client, read with an index-only scan (no RENT heap visits) and already
+-- ordered by client for COUNT(DISTINCT EMAIL).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS rent_name_email_idx ON RENT (NAME, EMAIL);
@@ -0,0 +1,22 @@
+-- Per-driver rent and client counts restricted to clients living in the driver's
+-- own city, so the problematic-drivers report reads one precomputed row per
+-- driver of the city instead of every rent of those drivers. A client with
+-- several addresses in the city counts once.
+--
+-- Refreshed with the other report views by report_views.py (see 0007).
+CREATE MATERIALIZED VIEW REPORT_DRIVER_LOCAL_RENTS AS
+SELECT
+    r.NAME AS name,
+    d.CITY AS city,
+    COUNT(*) AS rent_count,
+    COUNT(DISTINCT r.EMAIL) AS client_count
+FROM RENT r
+JOIN DRIVER d ON d.NAME = r.NAME
+WHERE EXISTS (SELECT 1 FROM LIVES l WHERE l.EMAIL = r.EMAIL AND l.CITY = d.CITY)
+GROUP BY r.NAME, d.CITY;
+
+-- One city's drivers are an index-only range scan
+CREATE UNIQUE INDEX report_driver_local_rents_key_idx
+    ON REPORT_DRIVER_LOCAL_RENTS (city, name) INCLUDE (rent_count, client_count);
+
+INSERT INTO REPORT_VIEW_REFRESH (VIEW_NAME, REFRESHED_AT) VALUES ('report_driver_local_rents', now());
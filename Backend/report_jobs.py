@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobRejected(Exception):
+    """Raised when a job cannot be queued; status is the HTTP status to answer with."""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+class ReportJobQueue:
+    """
+    Runs reports in the background so the request that asks for one returns at once.
+
+    Jobs run on a bounded thread pool (workers); at most max_pending jobs wait or
+    run at any time, and each owner (manager) may have at most per_owner of them.
+    Finished jobs, with their result or error, are kept for ttl seconds after they
+    finish. Submitting a report with the same parameters as a job of the same owner
+    that is still pending or kept returns that job instead of running the report
+    again. A job can only be read by its owner; to anyone else it does not exist.
+
+    Jobs live in this process only: with several worker processes a job must be
+    polled through the process that accepted it (or use a single worker).
+    """
+
+    def __init__(self, runner, workers=2, per_owner=2, max_pending=50, ttl=600.0):
+        self._runner = runner          # runner(report, params) -> JSON-serialisable result
+        self.workers = workers
+        self.per_owner = per_owner
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._cond = threading.Condition()
+        self._jobs = {}                # job id -> job dict
+        self._by_key = {}              # (owner, report, params key) -> job id
+        self._executor = None
+        self._pid = None
+
+    # --- Submitting ---
+
+    def submit(self, owner, report, params, key):
+        """Queue a report run; returns (job snapshot, created). key identifies equal parameters."""
+        with self._cond:
+            self._expire()
+            existing = self._jobs.get(self._by_key.get((owner, report, key)))
+            if existing is not None and existing["status"] != "failed":
+                return self._snapshot(existing), False
+
+            pending = [job for job in self._jobs.values() if job["status"] in ("queued", "running")]
+            if len(pending) >= self.max_pending:
+                raise JobRejected("Too many report jobs pending, try again later", 503)
+            if sum(1 for job in pending if job["owner"] == owner) >= self.per_owner:
+                raise JobRejected(f"At most {self.per_owner} report jobs may be pending per manager", 429)
+
+            job = {
+                "id": uuid.uuid4().hex,
+                "key": (owner, report, key),
+                "owner": owner,
+                "report": report,
+                "params": params,
+                "status": "queued",
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+            }
+            self._jobs[job["id"]] = job
+            self._by_key[job["key"]] = job["id"]
+            self._pool().submit(self._run, job)
+            return self._snapshot(job), True
+
+    def _pool(self):
+        # Worker threads do not survive a fork; a forked child starts its own pool
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="report-job")
+            self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, job):
+        with self._cond:
+            job["status"] = "running"
+            job["started_at"] = time.time()
+        try:
+            result, error = self._runner(job["report"], job["params"]), None
+        except Exception as e:
+            result, error = None, str(e)
+        with self._cond:
+            job["result"], job["error"] = result, error
+            job["status"] = "failed" if error is not None else "done"
+            job["finished_at"] = time.time()
+            self._cond.notify_all()
+
+    # --- Reading ---
+
+    def get(self, owner, job_id, wait=0.0):
+        """Snapshot of a job, waiting up to wait seconds for it to finish; None if unknown, expired or not owner's."""
+        deadline = time.monotonic() + wait
+        with self._cond:
+            self._expire()
+            job = self._owned(owner, job_id)
+            while job is not None and job["status"] in ("queued", "running"):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return None if job is None else self._snapshot(job)
+
+    def result(self, owner, job_id):
+        """(snapshot, result) of a job; result is None until the job is done."""
+        with self._cond:
+            self._expire()
+            job = self._owned(owner, job_id)
+            if job is None:
+                return None, None
+            return self._snapshot(job), job["result"]
+
+    # --- Internals (callers hold self._cond) ---
+
+    def _owned(self, owner, job_id):
+        job = self._jobs.get(job_id)
+        return job if job is not None and job["owner"] == owner else None
+
+    def _expire(self):
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job["finished_at"] is not None and now - job["finished_at"] > self.ttl:
+                del self._jobs[job_id]
+                if self._by_key.get(job["key"]) == job_id:
+                    del self._by_key[job["key"]]
+
+    def _snapshot(self, job):
+        def iso(timestamp):
+            return None if timestamp is None else time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp))
+
+        snapshot = {
+            "job_id": job["id"],
+            "report": job["report"],
+            "status": job["status"],
+            "submitted_at": iso(job["submitted_at"]),
+            "started_at": iso(job["started_at"]),
+            "finished_at": iso(job["finished_at"]),
+        }
+        if job["error"] is not None:
+            snapshot["error"] = job["error"]
+        if job["finished_at"] is not None:
+            snapshot["expires_at"] = iso(job["finished_at"] + self.ttl)
+        return snapshot
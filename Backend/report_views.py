@@ -0,0 +1,98 @@
+import threading
+import time
+
+
+class ReportViewRefresher:
+    """
+    Keeps the materialized report views of migrations 0007 and 0010 up to date.
+
+    A daemon thread wakes up five times per interval and refreshes each view
+    whose REPORT_VIEW_REFRESH.REFRESHED_AT is older than the interval, with
+    REFRESH MATERIALIZED VIEW CONCURRENTLY so report reads are never blocked.
+    The refresh time lives in the database, so several worker processes share
+    one schedule: the view's REPORT_VIEW_REFRESH row is locked for the length
+    of the refresh and the other processes skip it.
+    """
+
+    VIEWS = ("report_driver_stats", "report_model_rents", "report_brand_stats", "report_driver_local_rents")
+
+    def __init__(self, connection_factory, interval=300.0):
+        self._connection_factory = connection_factory
+        self.interval = interval
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    # --- Refreshing ---
+
+    def refresh(self, view, force=False):
+        """Refresh one view unless it is fresh enough or being refreshed elsewhere; returns True if refreshed."""
+        if view not in self.VIEWS:
+            raise ValueError(f"Unknown report view '{view}'")
+        with self._connection_factory() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute("""
+                    SELECT EXTRACT(EPOCH FROM now() - REFRESHED_AT)
+                    FROM REPORT_VIEW_REFRESH WHERE VIEW_NAME = %s
+                    FOR UPDATE SKIP LOCKED
+                """, (view,))
+                row = cur.fetchone()
+                if row is None or (not force and row[0] < self.interval):
+                    conn.rollback()
+                    return False
+                began = time.monotonic()
+                cur.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}")
+                cur.execute(
+                    "UPDATE REPORT_VIEW_REFRESH SET REFRESHED_AT = now(), DURATION_MS = %s WHERE VIEW_NAME = %s",
+                    (int((time.monotonic() - began) * 1000), view),
+                )
+                conn.commit()
+                return True
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cur.close()
+
+    def refresh_all(self, force=False):
+        """Refresh every stale view; returns the names of the views refreshed."""
+        return [view for view in self.VIEWS if self.refresh(view, force)]
+
+    def status(self):
+        """Last refresh time (ISO 8601) and duration of every view."""
+        with self._connection_factory() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT VIEW_NAME, REFRESHED_AT, DURATION_MS FROM REPORT_VIEW_REFRESH ORDER BY VIEW_NAME")
+                rows = cur.fetchall()
+                conn.commit()
+            finally:
+                cur.close()
+        return {name: {"refreshed_at": refreshed_at.isoformat(), "duration_ms": duration_ms}
+                for name, refreshed_at, duration_ms in rows}
+
+    # --- Scheduler ---
+
+    def start(self):
+        """Start the background refresh thread (no-op if running or interval is 0).
+
+        Safe to call on every request: after a fork the child sees the thread as
+        dead and starts its own.
+        """
+        with self._lock:
+            if not self.interval or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="report-view-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(max(1.0, self.interval / 5)):
+            try:
+                self.refresh_all()
+            except Exception as e:
+                print(f"Error refreshing report views: {e}")
@@ -0,0 +1,153 @@
+import unittest
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from availability_index import AvailabilityIndex
+
+TODAY = date(2030, 6, 15)
+
+
+class FakeDatabase:
+    """Answers the few queries AvailabilityIndex sends, from in-memory rows."""
+
+    def __init__(self, drives, rents):
+        self.drives = drives    # (modelid, carid, make, model, year, driver or None)
+        self.rents = rents      # (date, modelid, driver)
+        self.queries = []
+
+    @contextmanager
+    def connection(self):
+        yield FakeConnection(self)
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        self.db.queries.append(sql)
+        if "FROM MODEL m" in sql:
+            self.rows = list(self.db.drives)
+        elif "DATE >= CURRENT_DATE" in sql:
+            self.rows = [rent for rent in self.db.rents if rent[0] >= TODAY]
+        elif "SELECT CURRENT_DATE" in sql:
+            self.rows = [(TODAY,)]
+        elif "WHERE DATE = %s" in sql:
+            self.rows = [(model_id, driver) for rent_date, model_id, driver in self.db.rents if rent_date == params[0]]
+        else:
+            raise AssertionError(f"unexpected query: {sql}")
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class AvailabilityIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.db = FakeDatabase(
+            drives=[
+                ("M1", "C1", "Ford", "Focus", 2020, "alice"),
+                ("M1", "C1", "Ford", "Focus", 2020, "bob"),
+                ("M2", "C2", "Audi", "A3", 2021, "bob"),
+                ("M3", "C3", "Kia", "Rio", 2019, None),  # nobody drives it
+            ],
+            rents=[
+                (TODAY, "M1", "alice"),
+                (TODAY - timedelta(days=10), "M2", "bob"),
+            ],
+        )
+        self.index = AvailabilityIndex(self.db.connection, max_age=0, max_past_dates=2)
+
+    def pairs(self, target_date):
+        return [(row["modelid"], row["driver_name"]) for row in self.index.available(target_date)]
+
+    def past_lookups(self):
+        return sum("WHERE DATE = %s" in sql for sql in self.db.queries)
+
+    def test_available_excludes_rented_models_and_busy_drivers(self):
+        self.assertEqual(self.pairs(TODAY), [("M2", "bob")])
+        self.assertEqual(self.pairs(TODAY + timedelta(days=1)), [("M2", "bob"), ("M1", "alice"), ("M1", "bob")])
+
+    def test_rows_carry_car_details(self):
+        row = self.index.available(TODAY)[0]
+        self.assertEqual(row, {"id": "C2", "make": "Audi", "model_name": "A3", "year": 2021,
+                               "modelid": "M2", "driver_name": "bob"})
+
+    def test_record_rent_updates_loaded_dates(self):
+        tomorrow = TODAY + timedelta(days=1)
+        self.index.available(tomorrow)
+        self.index.record_rent(tomorrow, "M2", "bob")
+        self.assertEqual(self.pairs(tomorrow), [("M1", "alice")])
+
+    def test_record_rent_before_build_is_ignored(self):
+        self.index.record_rent(TODAY, "M2", "bob")
+        self.assertEqual(self.db.queries, [])
+
+    def test_past_date_is_loaded_once(self):
+        past = TODAY - timedelta(days=10)
+        self.assertEqual(self.pairs(past), [("M1", "alice")])  # bob drives the rented M2
+        self.pairs(past)
+        self.assertEqual(self.past_lookups(), 1)
+
+    def test_past_dates_are_evicted_least_recently_used_first(self):
+        days = [TODAY - timedelta(days=n) for n in (1, 2, 3)]
+        self.pairs(days[0])
+        self.pairs(days[1])
+        self.pairs(days[0])          # days[1] is now the least recently used
+        self.pairs(days[2])          # evicts days[1]
+        self.assertEqual(self.index.stats()["dates_loaded"], 1 + 2)  # today + two past dates
+        self.pairs(days[0])
+        self.assertEqual(self.past_lookups(), 3)
+        self.pairs(days[1])
+        self.assertEqual(self.past_lookups(), 4)
+
+    def test_record_rent_on_unloaded_past_date_is_left_to_the_database(self):
+        past = TODAY - timedelta(days=3)
+        self.index.available(TODAY)
+        self.index.record_rent(past, "M1", "alice")
+        self.assertEqual(self.index.stats()["dates_loaded"], 1)
+
+    def test_add_and_remove_drives(self):
+        self.index.available(TODAY)
+        self.index.add_drives("carol", "M3", "C3", "Kia", "Rio", 2019)
+        self.assertIn(("M3", "carol"), self.pairs(TODAY))
+        self.index.remove_drives("carol", "C3")
+        self.assertNotIn(("M3", "carol"), self.pairs(TODAY))
+
+    def test_remove_car(self):
+        self.index.available(TODAY)
+        self.index.remove_car("C2")
+        self.assertEqual(self.pairs(TODAY), [])
+        self.assertEqual(self.index.stats()["models"], 2)
+
+    def test_invalidate_rebuilds_on_next_lookup(self):
+        self.index.available(TODAY)
+        self.db.rents.append((TODAY, "M2", "bob"))
+        self.assertEqual(self.pairs(TODAY), [("M2", "bob")])  # still the old snapshot
+        self.index.invalidate()
+        self.assertEqual(self.pairs(TODAY), [])
+        self.assertEqual(sum("FROM MODEL m" in sql for sql in self.db.queries), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
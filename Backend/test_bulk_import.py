@@ -0,0 +1,73 @@
+import os
+import unittest
+
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key-for-unit-tests-only")
+
+from app import app, parse_optional_bool, read_bulk_rows  # noqa: E402
+
+
+class ReadBulkRowsTest(unittest.TestCase):
+    def rows(self, body, content_type=None, query_string=None):
+        with app.test_request_context("/", method="POST", data=body, content_type=content_type,
+                                      query_string=query_string):
+            return read_bulk_rows("cars")
+
+    def test_csv_keys_are_lowercased_and_values_stripped(self):
+        body = "Make , MODEL,Year\n Ford , Focus ,2020\nKia,Rio,\n"
+        self.assertEqual(self.rows(body, "text/csv"), [
+            {"make": "Ford", "model": "Focus", "year": "2020"},
+            {"make": "Kia", "model": "Rio", "year": ""},
+        ])
+
+    def test_csv_short_row_gives_none_values(self):
+        self.assertEqual(self.rows("make,model\nFord\n", "text/csv"), [{"make": "Ford", "model": None}])
+
+    def test_csv_without_header_is_an_error(self):
+        with self.assertRaises(ValueError):
+            self.rows("", "text/csv")
+
+    def test_unreadable_csv_is_an_error(self):
+        with self.assertRaisesRegex(ValueError, "Invalid CSV"):
+            self.rows("make\n" + "x" * 200000 + "\n", "text/csv")  # over csv.field_size_limit()
+
+    def test_invalid_utf8_is_an_error(self):
+        for content_type in ("text/csv", "application/x-ndjson"):
+            with self.assertRaisesRegex(ValueError, "UTF-8"):
+                self.rows(b"make\n\xff\xfe\n", content_type)
+
+    def test_format_parameter_overrides_content_type(self):
+        self.assertEqual(self.rows("make\nFord\n", "application/json", {"format": "csv"}), [{"make": "Ford"}])
+
+    def test_ndjson_bad_lines_become_none(self):
+        body = '{"Make": "Ford"}\n\nnot json\n[1, 2]\n{"make": "Kia"}\n'
+        self.assertEqual(self.rows(body, "application/x-ndjson"), [{"make": "Ford"}, None, None, {"make": "Kia"}])
+
+    def test_json_list_or_object_holding_it(self):
+        expected = [{"make": "Ford"}, None]
+        self.assertEqual(self.rows('[{"MAKE": "Ford"}, 3]', "application/json"), expected)
+        self.assertEqual(self.rows('{"cars": [{"MAKE": "Ford"}, 3]}', "application/json"), expected)
+
+    def test_json_that_is_not_a_list_is_an_error(self):
+        for body in ('{"drivers": []}', '"cars"', "not json"):
+            with self.assertRaises(ValueError):
+                self.rows(body, "application/json")
+
+
+class ParseOptionalBoolTest(unittest.TestCase):
+    def test_missing_values_are_none(self):
+        self.assertIsNone(parse_optional_bool(None, "auto"))
+        self.assertIsNone(parse_optional_bool("", "auto"))
+
+    def test_accepted_spellings(self):
+        for value in (True, "true", "T", " yes ", "y", "1", 1):
+            self.assertIs(parse_optional_bool(value, "auto"), True, value)
+        for value in (False, "false", "F", "No", "n", "0", 0):
+            self.assertIs(parse_optional_bool(value, "auto"), False, value)
+
+    def test_anything_else_is_an_error(self):
+        with self.assertRaisesRegex(ValueError, "manual"):
+            parse_optional_bool("maybe", "manual")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import threading
+import unittest
+
+import psycopg2
+import psycopg2.extensions
+
+import db_pool
+from db_pool import ConnectionPool, PoolTimeout
+
+
+class FakeInfo:
+    def __init__(self):
+        self.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeConnection:
+    """The part of a psycopg2 connection the pool touches."""
+
+    def __init__(self):
+        self.closed = 0
+        self.info = FakeInfo()
+        self.rollbacks = 0
+
+    def begin(self):
+        self.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+    def cursor(self):
+        raise AssertionError("health checks should not ping a recently used connection")
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.opened = []
+
+    def connect(self):
+        conn = FakeConnection()
+        self.opened.append(conn)
+        return conn
+
+    def pool(self, **kwargs):
+        kwargs.setdefault("min_size", 0)
+        kwargs.setdefault("max_size", 2)
+        return ConnectionPool(self.connect, **kwargs)
+
+    def test_invalid_sizes_are_rejected(self):
+        for min_size, max_size in ((-1, 1), (0, 0), (3, 2)):
+            with self.assertRaises(ValueError):
+                ConnectionPool(self.connect, min_size=min_size, max_size=max_size)
+
+    def test_returned_connection_is_reused(self):
+        pool = self.pool()
+        conn = pool.getconn()
+        pool.putconn(conn)
+        self.assertIs(pool.getconn(), conn)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_min_size_is_opened_on_first_use(self):
+        pool = self.pool(min_size=2, max_size=3)
+        pool.putconn(pool.getconn())
+        self.assertEqual(pool.stats()["size"], 2)
+
+    def test_getconn_times_out_when_exhausted(self):
+        pool = self.pool(max_size=1)
+        pool.getconn()
+        with self.assertRaises(PoolTimeout):
+            pool.getconn(timeout=0.05)
+        with self.assertRaises(PoolTimeout):
+            pool.getconn(timeout=0)
+        self.assertEqual(pool.stats()["timeouts"], 2)
+
+    def test_waiter_gets_connection_when_returned(self):
+        pool = self.pool(max_size=1)
+        conn = pool.getconn()
+        threading.Timer(0.05, pool.putconn, (conn,)).start()
+        self.assertIs(pool.getconn(timeout=2), conn)
+        self.assertEqual(pool.stats()["waits"], 1)
+
+    def test_putconn_rolls_back_open_transaction(self):
+        pool = self.pool()
+        conn = pool.getconn()
+        conn.begin()
+        pool.putconn(conn)
+        self.assertEqual(conn.rollbacks, 1)
+        self.assertEqual(pool.stats()["idle"], 1)
+
+    def test_closed_connection_is_evicted_on_checkout(self):
+        pool = self.pool()
+        broken = pool.getconn()
+        pool.putconn(broken)
+        broken.closed = 2
+        conn = pool.getconn()
+        self.assertIsNot(conn, broken)
+        self.assertEqual(pool.stats()["evictions"], 1)
+        self.assertEqual(pool.stats()["size"], 1)
+
+    def test_connect_failure_frees_the_slot(self):
+        def failing_connect():
+            raise psycopg2.OperationalError("down")
+
+        pool = ConnectionPool(failing_connect, min_size=0, max_size=1)
+        with self.assertRaises(psycopg2.OperationalError):
+            pool.getconn()
+        stats = pool.stats()
+        self.assertEqual((stats["size"], stats["connect_failures"]), (0, 1))
+
+    def test_putconn_after_close_closes_connection(self):
+        pool = self.pool()
+        idle, in_use = pool.getconn(), pool.getconn()
+        pool.putconn(idle)
+        pool.close()
+        self.assertTrue(idle.closed)
+        pool.putconn(in_use)
+        self.assertTrue(in_use.closed)
+        self.assertEqual(pool.stats()["size"], 0)
+        with self.assertRaises(PoolTimeout):
+            pool.getconn()
+
+    def test_fork_child_starts_empty_and_parks_parent_connections(self):
+        pool = self.pool()
+        idle, in_use = pool.getconn(), pool.getconn()
+        pool.putconn(idle)
+        pool._pid = -1  # as seen from a forked child
+        inherited_before = len(db_pool._inherited_connections)
+
+        conn = pool.getconn()
+        self.assertNotIn(conn, (idle, in_use))
+        self.assertFalse(idle.closed)  # closing would end the parent's session
+        self.assertIn(idle, db_pool._inherited_connections)
+        self.assertEqual(pool.stats()["size"], 1)
+
+        pool._pid = -2  # a connection checked out before the fork comes back
+        pool.putconn(in_use)
+        self.assertFalse(in_use.closed)
+        self.assertIn(in_use, db_pool._inherited_connections)
+        del db_pool._inherited_connections[inherited_before:]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import tempfile
+import unittest
+
+from migrate import MigrationError, discover, split_statements, strip_comments
+
+
+class SplitStatementsTest(unittest.TestCase):
+    def test_splits_on_top_level_semicolons(self):
+        sql = "CREATE TABLE a (x int);\n\nINSERT INTO a VALUES (1);\nSELECT 1"
+        self.assertEqual(split_statements(sql), ["CREATE TABLE a (x int)", "INSERT INTO a VALUES (1)", "SELECT 1"])
+
+    def test_empty_statements_are_dropped(self):
+        self.assertEqual(split_statements(";;  SELECT 1;\n;"), ["SELECT 1"])
+
+    def test_semicolons_inside_quotes_are_kept(self):
+        sql = "INSERT INTO a VALUES ('x;y', 'it''s;');SELECT \"odd;name\" FROM a"
+        self.assertEqual(split_statements(sql), ["INSERT INTO a VALUES ('x;y', 'it''s;')", 'SELECT "odd;name" FROM a'])
+
+    def test_dollar_quoted_bodies_are_kept_whole(self):
+        body = "$$ BEGIN UPDATE a SET x = 1; RETURN NEW; END; $$"
+        tagged = "$fn$ SELECT ';'; $$ not the end $$; $fn$"
+        sql = f"CREATE FUNCTION f() RETURNS trigger AS {body} LANGUAGE plpgsql;\nDO {tagged};\nSELECT 2;"
+        self.assertEqual(split_statements(sql), [
+            f"CREATE FUNCTION f() RETURNS trigger AS {body} LANGUAGE plpgsql",
+            f"DO {tagged}",
+            "SELECT 2",
+        ])
+
+    def test_unterminated_dollar_quote_is_an_error(self):
+        with self.assertRaises(MigrationError):
+            split_statements("DO $$ BEGIN NULL; END;")
+
+    def test_comments_are_dropped(self):
+        sql = "-- leading; comment\nSELECT 1; /* block;\n comment */ SELECT 2 -- trailing;\n;"
+        self.assertEqual(split_statements(sql), ["SELECT 1", "SELECT 2"])
+
+    def test_comment_markers_inside_strings_are_text(self):
+        sql = "SELECT '-- not a comment;', '/* nor; this */';SELECT 3"
+        self.assertEqual(split_statements(sql), ["SELECT '-- not a comment;', '/* nor; this */'", "SELECT 3"])
+
+
+class StripCommentsTest(unittest.TestCase):
+    def test_removes_line_and_block_comments(self):
+        self.assertEqual(strip_comments("SELECT 1 -- one\n/* two */SELECT 2"), "SELECT 1 \nSELECT 2")
+
+    def test_keeps_directives_only_when_asked(self):
+        sql = "-- migrate:no-transaction\n-- CONCURRENTLY in a comment\nSELECT 1"
+        self.assertEqual(strip_comments(sql), "\n\nSELECT 1")
+        self.assertEqual(strip_comments(sql, keep_directives=True), "-- migrate:no-transaction\n\nSELECT 1")
+
+    def test_dollar_quoted_text_is_untouched(self):
+        sql = "DO $$ BEGIN -- inside\nNULL; END $$"
+        self.assertEqual(strip_comments(sql), sql)
+
+
+class DiscoverTest(unittest.TestCase):
+    def write(self, directory, name, sql):
+        with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+            f.write(sql)
+
+    def test_transactional_unless_concurrent_or_directive(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.write(directory, "0002_index.sql", "CREATE INDEX CONCURRENTLY IF NOT EXISTS i ON a (x);")
+            self.write(directory, "0001_table.sql", "-- not CONCURRENTLY\nCREATE TABLE a (x int);")
+            self.write(directory, "0003_directive.sql", "-- migrate:no-transaction\nVACUUM a;")
+            self.write(directory, "README.txt", "ignored")
+            migrations = discover(directory)
+        self.assertEqual([repr(m) for m in migrations], ["0001_table", "0002_index", "0003_directive"])
+        self.assertEqual([m.transactional for m in migrations], [True, False, False])
+
+    def test_duplicate_versions_are_an_error(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.write(directory, "0001_a.sql", "SELECT 1;")
+            self.write(directory, "0001_b.sql", "SELECT 2;")
+            with self.assertRaises(MigrationError):
+                discover(directory)
+
+
+if __name__ == "__main__":
+    unittest.main()
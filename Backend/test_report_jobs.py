@@ -0,0 +1,112 @@
+import threading
+import time
+import unittest
+
+from report_jobs import JobRejected, ReportJobQueue
+
+
+class ReportJobQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.calls = []
+
+    def tearDown(self):
+        self.release.set()  # let blocked workers finish
+
+    def runner(self, report, params):
+        self.calls.append((report, params))
+        if not self.release.wait(5):
+            raise RuntimeError("test never released the job")
+        if params.get("fail"):
+            raise ValueError("bad report")
+        return {"report": report, "params": params}
+
+    def queue(self, **kwargs):
+        kwargs.setdefault("workers", 4)
+        return ReportJobQueue(self.runner, **kwargs)
+
+    def test_job_runs_and_keeps_its_result(self):
+        queue = self.queue()
+        job, created = queue.submit("alice", "brand-stats", {"x": 1}, "k1")
+        self.assertTrue(created)
+        self.assertEqual(queue.result("alice", job["job_id"])[1], None)
+        self.release.set()
+        done = queue.get("alice", job["job_id"], wait=2)
+        self.assertEqual(done["status"], "done")
+        self.assertIn("expires_at", done)
+        self.assertEqual(queue.result("alice", job["job_id"])[1], {"report": "brand-stats", "params": {"x": 1}})
+
+    def test_failed_job_reports_its_error(self):
+        queue = self.queue()
+        job, _ = queue.submit("alice", "brand-stats", {"fail": True}, "k1")
+        self.release.set()
+        failed = queue.get("alice", job["job_id"], wait=2)
+        self.assertEqual((failed["status"], failed["error"]), ("failed", "bad report"))
+
+    def test_same_parameters_share_a_job_per_owner(self):
+        queue = self.queue()
+        first, _ = queue.submit("alice", "brand-stats", {}, "k1")
+        again, created = queue.submit("alice", "brand-stats", {}, "k1")
+        self.assertFalse(created)
+        self.assertEqual(again["job_id"], first["job_id"])
+        other, created = queue.submit("bob", "brand-stats", {}, "k1")
+        self.assertTrue(created)
+        self.assertNotEqual(other["job_id"], first["job_id"])
+
+    def test_failed_job_is_not_reused(self):
+        queue = self.queue()
+        job, _ = queue.submit("alice", "brand-stats", {"fail": True}, "k1")
+        self.release.set()
+        queue.get("alice", job["job_id"], wait=2)
+        retry, created = queue.submit("alice", "brand-stats", {"fail": True}, "k1")
+        self.assertTrue(created)
+        self.assertNotEqual(retry["job_id"], job["job_id"])
+
+    def test_jobs_are_invisible_to_other_owners(self):
+        queue = self.queue()
+        job, _ = queue.submit("alice", "brand-stats", {}, "k1")
+        self.release.set()
+        self.assertIsNone(queue.get("bob", job["job_id"], wait=2))
+        self.assertEqual(queue.result("bob", job["job_id"]), (None, None))
+        self.assertEqual(queue.get("alice", job["job_id"], wait=2)["status"], "done")
+
+    def test_rejected_beyond_per_owner_limit(self):
+        queue = self.queue(per_owner=2)
+        queue.submit("alice", "brand-stats", {}, "k1")
+        queue.submit("alice", "brand-stats", {}, "k2")
+        with self.assertRaises(JobRejected) as raised:
+            queue.submit("alice", "brand-stats", {}, "k3")
+        self.assertEqual(raised.exception.status, 429)
+        queue.submit("bob", "brand-stats", {}, "k3")
+
+    def test_rejected_when_queue_is_full(self):
+        queue = self.queue(per_owner=5, max_pending=2)
+        queue.submit("alice", "brand-stats", {}, "k1")
+        queue.submit("bob", "brand-stats", {}, "k1")
+        with self.assertRaises(JobRejected) as raised:
+            queue.submit("carol", "brand-stats", {}, "k1")
+        self.assertEqual(raised.exception.status, 503)
+
+    def test_finished_jobs_expire_after_ttl(self):
+        queue = self.queue(ttl=0.05)
+        job, _ = queue.submit("alice", "brand-stats", {}, "k1")
+        self.release.set()
+        self.assertEqual(queue.get("alice", job["job_id"], wait=2)["status"], "done")
+        time.sleep(0.1)
+        self.assertIsNone(queue.get("alice", job["job_id"]))
+        self.assertEqual(queue.result("alice", job["job_id"]), (None, None))
+        rerun, created = queue.submit("alice", "brand-stats", {}, "k1")
+        self.assertTrue(created)
+        queue.get("alice", rerun["job_id"], wait=2)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_wait_returns_unfinished_job_after_timeout(self):
+        queue = self.queue()
+        job, _ = queue.submit("alice", "brand-stats", {}, "k1")
+        began = time.monotonic()
+        self.assertIn(queue.get("alice", job["job_id"], wait=0.05)["status"], ("queued", "running"))
+        self.assertGreaterEqual(time.monotonic() - began, 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
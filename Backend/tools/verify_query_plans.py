@@ -0,0 +1,235 @@
+"""
+Query plan verification.
+
+Extracts every SQL statement passed to cur.execute() in app.py, runs
+EXPLAIN (GENERIC_PLAN) on it and fails if any plan contains a sequential
+scan on a large table. Reports that intentionally aggregate a whole table
+are listed in FULL_SCAN_ALLOWED.
+
+A seq scan whose filter keeps only a small fraction of the table
+(--selectivity) means a selective predicate has no usable index: FAIL.
+A seq scan feeding a join, or with a low-selectivity filter, is a full
+read the planner chose on cost for this dataset: WARN. --strict turns
+warnings into failures.
+
+Run it against a database with the migrations applied and realistic data
+volumes; --seed first fills an EMPTY schema with tools/generate_data.py.
+Needs PostgreSQL 16+ (EXPLAIN GENERIC_PLAN).
+
+    cd Backend
+    python tools/verify_query_plans.py --seed --rents 500000
+"""
+import argparse
+import ast
+import json
+import os
+import re
+import subprocess
+import sys
+
+import psycopg2
+from dotenv import load_dotenv
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# route function -> tables it may scan in full (whole-table reports and listings)
+FULL_SCAN_ALLOWED = {
+    "get_all_car_models": {"car"},
+    "top_clients_report": {"rent", "client"},
+    "model_rents_report": {"car", "rent"},
+    "brand_stats_report": {"car", "model", "rent", "drives", "driver", "driver_rating"},
+    "driver_stats_report": {"driver", "rent", "driver_rating"},
+    "debug_availability_details": {"car", "model", "drives"},
+    "get_clients_by_city_matrix": {"rent", "driver", "lives", "client"},
+    "matrix_query": {"rent", "driver", "lives", "client"},
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="EXPLAIN every query in app.py and fail on sequential scans")
+    parser.add_argument("--source", default=os.path.join(BACKEND_DIR, "app.py"), help="module to scan for queries")
+    parser.add_argument("--min-rows", type=int, default=10000,
+                        help="only tables with at least this many rows count as large")
+    parser.add_argument("--seed", action="store_true", help="fill an empty schema with synthetic data first")
+    parser.add_argument("--rents", type=int, default=500000, help="RENT rows to generate with --seed")
+    parser.add_argument("--selectivity", type=float, default=0.01,
+                        help="a filtered seq scan keeping less than this fraction of the table fails")
+    parser.add_argument("--strict", action="store_true", help="also fail on full reads chosen on cost")
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    return parser.parse_args()
+
+
+# --- Query extraction ---
+
+def _string_value(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    return None
+
+
+# Only these statements have plans; SET, SAVEPOINT, DDL and the like are skipped
+EXPLAINABLE = ("select", "with", "insert", "update", "delete")
+
+
+def extract_queries(path):
+    """Return (function_name, line, sql) for every literal DML string given to .execute().
+
+    Statements on temporary tables created in the same function are skipped:
+    the tables do not exist outside the request that creates them.
+    """
+    tree = ast.parse(open(path, encoding="utf-8").read(), filename=path)
+    queries = []
+    for func in ast.walk(tree):
+        if not isinstance(func, ast.FunctionDef):
+            continue
+        # Local string variables (query = """...""") keyed by name
+        assigned = {}
+        for node in ast.walk(func):
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                value = _string_value(node.value)
+                if value is not None:
+                    assigned[node.targets[0].id] = value
+        temp_tables = set()
+        for node in ast.walk(func):
+            value = _string_value(node)
+            if value is not None:
+                temp_tables.update(t.lower() for t in re.findall(r"CREATE\s+TEMP(?:ORARY)?\s+TABLE\s+(\w+)", value, re.I))
+        for node in ast.walk(func):
+            if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                    and node.func.attr == "execute" and node.args):
+                continue
+            arg = node.args[0]
+            sql = _string_value(arg)
+            if sql is None and isinstance(arg, ast.Name):
+                sql = assigned.get(arg.id)
+            if sql is None or not sql.strip() or sql.split(None, 1)[0].lower() not in EXPLAINABLE:
+                continue
+            if any(re.search(rf"\b{table}\b", sql, re.I) for table in temp_tables):
+                continue
+            queries.append((func.name, node.lineno, sql))
+    return queries
+
+
+def to_positional(sql):
+    """Rewrite psycopg2 placeholders (%s, %(name)s) as $n parameters for EXPLAIN (GENERIC_PLAN)."""
+    names = {}
+    counter = [0]
+
+    def replace(match):
+        token = match.group(0)
+        if token == "%%":
+            return "%"
+        name = match.group(1)
+        if name is None:
+            counter[0] += 1
+            return f"${counter[0]}"
+        if name not in names:
+            counter[0] += 1
+            names[name] = counter[0]
+        return f"${names[name]}"
+
+    return re.sub(r"%%|%\((\w+)\)s|%s", replace, sql).strip().rstrip(";")
+
+
+# --- Plan inspection ---
+
+def seq_scans(plan, found=None, workers=0):
+    """Return (relation, estimated output rows, has filter) for every Seq Scan node."""
+    found = [] if found is None else found
+    workers = plan.get("Workers Planned", workers)
+    if plan.get("Node Type") == "Seq Scan":
+        rows = plan.get("Plan Rows", 0)
+        if plan.get("Parallel Aware"):
+            rows *= workers + 1  # parallel nodes estimate rows per process
+        found.append((plan.get("Relation Name"), rows, "Filter" in plan))
+    for child in plan.get("Plans", []):
+        seq_scans(child, found, workers)
+    return found
+
+
+def explain(cur, sql):
+    cur.execute("EXPLAIN (GENERIC_PLAN, FORMAT JSON) " + to_positional(sql))
+    plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def table_sizes(cur):
+    cur.execute("""
+        SELECT c.relname, GREATEST(c.reltuples, 0)::bigint
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind = 'r' AND n.nspname = current_schema()
+    """)
+    return dict(cur.fetchall())
+
+
+# --- Synthetic dataset ---
+
+def seed(rents):
+    """Fill the empty schema with tools/generate_data.py (it refuses tables that already have rows)."""
+    command = [sys.executable, os.path.join(BACKEND_DIR, "tools", "generate_data.py"), "--rents", str(rents)]
+    if subprocess.run(command).returncode:
+        raise SystemExit("--seed failed: tools/generate_data.py needs a migrated schema with empty tables")
+
+
+def main():
+    args = parse_args()
+    load_dotenv(os.path.join(BACKEND_DIR, ".env"))
+    conn = psycopg2.connect(
+        dbname=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        host=os.getenv("DB_HOST"),
+        port=os.getenv("DB_PORT"),
+    )
+    conn.autocommit = True
+    cur = conn.cursor()
+    if args.seed:
+        seed(args.rents)
+
+    sizes = table_sizes(cur)
+    failures = warnings = 0
+    for func_name, line, sql in extract_queries(args.source):
+        try:
+            plan = explain(cur, sql)
+        except psycopg2.Error as e:
+            failures += 1
+            print(f"ERROR  {func_name}:{line}  {str(e).strip().splitlines()[0]}")
+            continue
+
+        allowed = FULL_SCAN_ALLOWED.get(func_name, set())
+        selective, full_reads = set(), set()
+        for table, rows, filtered in seq_scans(plan):
+            if table in allowed or sizes.get(table, 0) < args.min_rows:
+                continue
+            if filtered and rows < sizes[table] * args.selectivity:
+                selective.add(table)
+            else:
+                full_reads.add(table)
+        flagged = selective | full_reads
+
+        if selective:
+            status, note = "FAIL", f"  seq scan on {', '.join(sorted(selective))} (selective filter, no usable index)"
+            failures += 1
+        elif full_reads:
+            status, note = ("FAIL" if args.strict else "WARN"), f"  full read of {', '.join(sorted(full_reads))} (chosen on cost)"
+            failures += args.strict
+            warnings += not args.strict
+        else:
+            status, note = "ok", ""
+        print(f"{status:<6} {func_name}:{line}{note}")
+        if args.verbose or flagged:
+            cur.execute("EXPLAIN (GENERIC_PLAN) " + to_positional(sql))
+            for (row,) in cur.fetchall():
+                print("         " + row)
+
+    cur.close()
+    conn.close()
+    print(f"\n{failures} quer{'y' if failures == 1 else 'ies'} failed, {warnings} warning(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())